@@ -0,0 +1,46 @@
+"""
+Throughput of the parallel bulk engine against worker count.
+    python benchmarks/bench_parallel.py [points] [chunk_size]
+Reports points per second and speedup over a single worker for
+forward and inverse MGA conversions.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from vicmap import bulk
+from vicmap.grids import MGA20
+
+
+def timed(engine, func, *arrays, **kwargs):
+    start = time.perf_counter()
+    engine.map(func, *arrays, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(points=2000000, chunk_size=100000):
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-39, -28, points)
+    lngs = rng.uniform(138.5, 155.5, points)
+    zone, E, N, _, _ = bulk.to_mga(lats, lngs, grid=MGA20)
+
+    counts = sorted({1, 2, 4, 8, os.cpu_count()} & set(range(1, os.cpu_count() + 1)))
+    print(f"{points} points, chunks of {chunk_size}, {os.cpu_count()} cpus")
+    print(f"{'workers':>8} {'to_mga pts/s':>14} {'speedup':>8} {'from_mga pts/s':>16} {'speedup':>8}")
+
+    base = None
+    for workers in counts:
+        with bulk.ParallelEngine(workers=workers, chunk_size=chunk_size) as engine:
+            fwd = timed(engine, bulk.to_mga, lats, lngs, grid=MGA20)
+            inv = timed(engine, bulk.from_mga, zone, E, N, grid=MGA20)
+        base = base or (fwd, inv)
+        print(
+            f"{workers:>8} {points / fwd:>14,.0f} {base[0] / fwd:>8.2f}"
+            f" {points / inv:>16,.0f} {base[1] / inv:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
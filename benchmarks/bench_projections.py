@@ -0,0 +1,80 @@
+"""
+Throughput of the MGA projections.
+    python benchmarks/bench_projections.py [points]
+Reports the Krueger series evaluated term by term against Clenshaw
+summation, the scalar and array forward & inverse projections, then
+array throughput and worst case error (vs order 8) for each series order.
+"""
+import sys
+import time
+
+import numpy as np
+
+from vicmap.datums import GDA20
+from vicmap.grids import MGA20
+from vicmap.projections import utm, utm_array, utm_inverse
+from vicmap.utils import SERIES_ORDERS, krueger_coefficients, krueger_series
+
+
+def term_sums(α, ε, Nu):
+    """ the series as eight separate sin, cos, sinh & cosh terms """
+    r = np.arange(1, 9).reshape((8,) + (1,) * np.ndim(ε))
+    c = np.array([α[2 * i] for i in range(1, 9)]).reshape(r.shape)
+    return (
+        ε + np.sum(c * np.sin(2 * r * ε) * np.cosh(2 * r * Nu), axis=0),
+        Nu + np.sum(c * np.cos(2 * r * ε) * np.sinh(2 * r * Nu), axis=0),
+        -np.sum(2 * r * c * np.sin(2 * r * ε) * np.sinh(2 * r * Nu), axis=0),
+        1 + np.sum(2 * r * c * np.cos(2 * r * ε) * np.cosh(2 * r * Nu), axis=0),
+    )
+
+
+def rate(func, *args, repeat=1, **kwargs):
+    """ calls per second """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args, **kwargs)
+    return repeat / (time.perf_counter() - start)
+
+
+def main(points=1000000):
+    ellipsoid = GDA20.ellipsoid
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-39, -28, points)
+    lngs = rng.uniform(138.5, 155.5, points)
+    zone, E, N, _, _ = utm_array(lats, lngs, ellipsoid, MGA20)
+
+    α = krueger_coefficients(ellipsoid.n)
+    ε, Nu = rng.uniform(-0.7, -0.4, points), rng.uniform(-0.01, 0.01, points)
+    terms = points * rate(term_sums, α, ε, Nu)
+    clenshaw = points * rate(krueger_series, α, ε, Nu)
+    terms_1 = rate(term_sums, α, -0.5, 0.005, repeat=20000)
+    clenshaw_1 = rate(krueger_series, α, -0.5, 0.005, repeat=20000)
+
+    print(f"{'krueger series':<24} {'term sums':>14} {'clenshaw':>14} {'speedup':>8}")
+    print(f"{'  scalar /s':<24} {terms_1:>14,.0f} {clenshaw_1:>14,.0f} {clenshaw_1 / terms_1:>8.2f}")
+    print(f"{'  arrays pts/s':<24} {terms:>14,.0f} {clenshaw:>14,.0f} {clenshaw / terms:>8.2f}")
+
+    n = 5000
+    print(f"\n{'projection':<24} {'pts/s':>14}")
+    fwd = n * rate(lambda: [utm(lats[i], lngs[i], ellipsoid, MGA20) for i in range(n)])
+    inv = n * rate(lambda: [utm_inverse(zone[i], E[i], N[i], ellipsoid, MGA20) for i in range(n)])
+    print(f"{'  utm':<24} {fwd:>14,.0f}")
+    print(f"{'  utm_inverse':<24} {inv:>14,.0f}")
+    print(f"{'  utm_array':<24} {points * rate(utm_array, lats, lngs, ellipsoid, MGA20):>14,.0f}")
+    print(f"{'  utm_inverse (arrays)':<24} {points * rate(utm_inverse, zone, E, N, ellipsoid, MGA20):>14,.0f}")
+
+    print(f"\n{'order':<8} {'forward pts/s':>14} {'error (m)':>10} {'inverse pts/s':>14} {'error (m)':>10}")
+    lat_8, lng_8, _, _ = utm_inverse(zone, E, N, ellipsoid, MGA20)
+    for order in SERIES_ORDERS:
+        _, E_o, N_o, _, _ = utm_array(lats, lngs, ellipsoid, MGA20, order=order)
+        lat_o, lng_o, _, _ = utm_inverse(zone, E, N, ellipsoid, MGA20, order=order)
+        fwd_error = np.max(np.hypot(E_o - E, N_o - N))
+        # degrees to metres, near enough for an error estimate
+        inv_error = 111320 * np.max(np.hypot(lat_o - lat_8, (lng_o - lng_8) * np.cos(np.radians(lats))))
+        fwd = points * rate(utm_array, lats, lngs, ellipsoid, MGA20, order=order)
+        inv = points * rate(utm_inverse, zone, E, N, ellipsoid, MGA20, order=order)
+        print(f"{order:<8} {fwd:>14,.0f} {fwd_error:>10.1e} {inv:>14,.0f} {inv_error:>10.1e}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,26 @@
+"""
+Conformance of the native projections with PROJ.
+    python benchmarks/conformance.py [spacing (degrees)]
+Reports the maximum and RMS differences of E, N, m & γ from PROJ for
+each grid sampled by vicmap.conformance, and points per second for each
+implementation.
+"""
+import sys
+
+from vicmap.conformance import CASES, compare
+
+
+def main(spacing=0.05):
+    units = {"E": "m", "N": "m", "m": "ppm", "γ": "sec"}
+    columns = [f"{name} {stat}" for name in units for stat in ("max", "rms")]
+    print(f"{'grid':<10} {'points':>8} " + " ".join(f"{c:>9}" for c in columns) + f" {'native pts/s':>13} {'proj pts/s':>13}")
+    print(f"{'':<10} {'':>8} " + " ".join(f"{units[c.split()[0]]:>9}" for c in columns))
+    for grid, zone in CASES:
+        report = compare(grid, zone, spacing)
+        name = grid.code if zone is None else f"{grid.code} {zone}"
+        cells = [f"{report[c]:>9.1e}" for c in columns] + [f"{report[c]:>13,.0f}" for c in ["native pts/s", "proj pts/s"]]
+        print(f"{name:<10} {report['points']:>8} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:]))
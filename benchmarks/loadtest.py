@@ -0,0 +1,92 @@
+"""
+Load test a running vicmap service.
+    python -m vicmap serve --port 8080 &
+    python benchmarks/loadtest.py [--endpoint /forward] [--concurrency 64] [--requests 20000]
+Each client holds a keep-alive connection and sends single point
+requests back to back. Reports throughput, latency percentiles and the
+micro-batching achieved by the server.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+BODIES = {
+    "/forward": lambda: {"lat": rng.uniform(-39, -28), "lng": rng.uniform(138.5, 155.5)},
+    "/inverse": lambda: {"zone": 55, "E": rng.uniform(2e5, 8e5), "N": rng.uniform(5.7e6, 6.3e6)},
+    "/mgrs/encode": lambda: {"zone": 55, "E": rng.uniform(2e5, 8e5), "N": rng.uniform(5.7e6, 6.3e6)},
+    "/mgrs/decode": lambda: {"mgrs": "55HCU%05d%05d" % tuple(rng.integers(0, 99999, 2))},
+    "/distance": lambda: {
+        "lat1": rng.uniform(-39, -28), "lng1": rng.uniform(138.5, 155.5),
+        "lat2": rng.uniform(-39, -28), "lng2": rng.uniform(138.5, 155.5),
+    },
+    "/declination": lambda: {"lat": rng.uniform(-39, -28), "lng": rng.uniform(138.5, 155.5)},
+}
+
+
+async def request(reader, writer, host, path, body):
+    payload = json.dumps(body).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+        + payload
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, path, bodies, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    for body in bodies:
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, host, path, body)
+        latencies.append(time.perf_counter() - start)
+        errors += [status] if status != 200 else []
+    writer.close()
+
+
+async def main(host, port, path, concurrency, requests):
+    bodies = [BODIES[path]() for _ in range(requests)]
+    latencies, errors = [], []
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(host, port, path, bodies[i::concurrency], latencies, errors) for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, host, "/stats", {})
+    writer.close()
+
+    ms = np.array(latencies) * 1000
+    print(f"{path}: {requests} requests, {concurrency} connections, {errors and len(errors) or 0} errors")
+    print(f"throughput   {requests / elapsed:,.0f} req/s")
+    for q in [50, 90, 99, 99.9]:
+        print(f"p{q:<11} {np.percentile(ms, q):.2f} ms")
+    print(f"max          {ms.max():.2f} ms")
+    print(f"mean batch   {stats['mean_batch']:.1f} (max {stats['max_batch']}, wait {stats['max_wait'] * 1000:g} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--endpoint", default="/forward", choices=list(BODIES))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.endpoint, args.concurrency, args.requests))
@@ -0,0 +1,258 @@
+import numpy as np
+import pytest
+from vicmap import bulk
+from vicmap.datums import GDA20, GDA94
+from vicmap.grids import MGA20, MGA94, MGRS, VICGRID94
+from vicmap.points import GeoPoint, MGRSPoint
+from vicmap.projections import lambert_conformal_conic_inverse, utm
+from vicmap.transformers import get_transformer
+
+rng = np.random.default_rng(42)
+lats = rng.uniform(-39, -28, 500)
+lngs = rng.uniform(138.5, 155.5, 500)
+
+
+def test_to_mga_matches_utm():
+
+    zone, E, N, m, γ = bulk.to_mga(lats, lngs, grid=MGA20)
+    for i in range(0, 500, 50):
+        z, e, n, _m, _γ = utm(lats[i], lngs[i], ellipsoid=GDA20.ellipsoid, grid=MGA20)
+        assert zone[i] == z
+        assert abs(E[i] - e) < 1e-6 and abs(N[i] - n) < 1e-6
+        assert abs(m[i] - _m) < 1e-12 and abs(γ[i] - _γ) < 1e-10
+
+
+def test_to_mga_forced_zone():
+
+    zone, E, _, _, _ = bulk.to_mga([-37, -37], [146.9, 147.1], zone=55)
+    assert list(zone) == [55, 55]
+    assert E[0] < 500000 < E[1]
+
+
+def test_from_mga_round_trip():
+
+    zone, E, N, _, _ = bulk.to_mga(lats, lngs, grid=MGA94)
+    dLat, dLng, _, _ = bulk.from_mga(zone, E, N, grid=MGA94)
+    assert np.max(np.abs(dLat - lats)) < 1e-9
+    assert np.max(np.abs(dLng - lngs)) < 1e-9
+
+
+@pytest.mark.parametrize("order, tolerance", [(4, 1e-7), (6, 1e-8), (8, 0)])
+def test_series_order_error(order, tolerance):
+
+    zone, E, N, _, _ = bulk.to_mga(lats, lngs)
+    _, E_o, N_o, _, _ = bulk.to_mga(lats, lngs, order=order)
+    assert np.max(np.hypot(E_o - E, N_o - N)) <= tolerance
+
+    dLat, dLng, _, _ = bulk.from_mga(zone, E, N)
+    dLat_o, dLng_o, _, _ = bulk.from_mga(zone, E, N, order=order)
+    # a degree is at least 80 km at these latitudes
+    assert np.max(np.abs(dLat_o - dLat)) <= tolerance / 8e4
+    assert np.max(np.abs(dLng_o - dLng)) <= tolerance / 8e4
+
+
+@pytest.mark.parametrize("length, tolerance", [(100, 1e-5), (5000, 1e-5), (20000, 1e-4)])
+def test_grid_distance_line_scale(length, tolerance):
+
+    E1, N1 = rng.uniform(2e5, 8e5, 200), rng.uniform(5.7e6, 6.2e6, 200)
+    bearing = rng.uniform(0, 2 * np.pi, 200)
+    E2, N2 = E1 + length * np.sin(bearing), N1 + length * np.cos(bearing)
+
+    lat1, lng1, _, _ = bulk.from_mga(55, E1, N1)
+    lat2, lng2, _, _ = bulk.from_mga(55, E2, N2)
+    ellipsoidal = bulk.distance(lat1, lng1, lat2, lng2)
+
+    s = bulk.grid_distance(E1, N1, E2, N2, zone=55)
+    assert np.max(np.abs(s - ellipsoidal)) < tolerance
+    plane = bulk.grid_distance(E1, N1, E2, N2, zone=55, line_scale=False)
+    assert np.allclose(plane, length)
+
+
+def test_grid_distance_vicgrid():
+
+    E1, N1 = rng.uniform(2.2e6, 2.9e6, 200), rng.uniform(2.3e6, 2.8e6, 200)
+    E2, N2 = E1 + rng.uniform(-3000, 3000, 200), N1 + rng.uniform(-3000, 3000, 200)
+    ellipsoid = VICGRID94.datum.ellipsoid
+    lat1, lng1, _, _ = lambert_conformal_conic_inverse(E1, N1, ellipsoid, VICGRID94)
+    lat2, lng2, _, _ = lambert_conformal_conic_inverse(E2, N2, ellipsoid, VICGRID94)
+
+    s = bulk.grid_distance(E1, N1, E2, N2, grid=VICGRID94)
+    assert np.max(np.abs(s - bulk.distance(lat1, lng1, lat2, lng2, datum=GDA94))) < 1e-5
+
+
+@pytest.mark.parametrize("grid, zone, to_zone", [(MGA20, 55, 54), (MGA20, 55, 56), (MGA94, 54, 55)])
+def test_rezone_matches_proj(grid, zone, to_zone):
+
+    E = rng.uniform(1.5e5, 8.5e5, 500)
+    N = rng.uniform(5.6e6, 6.4e6, 500)
+    x, y = get_transformer(grid.crs(zone), grid.crs(to_zone)).transform(E, N)
+
+    E2, N2 = bulk.rezone(zone, E, N, to_zone, grid=grid)
+    assert np.max(np.abs(E2 - x)) < 1e-7 and np.max(np.abs(N2 - y)) < 1e-7
+    E3, N3 = bulk.transform(E, N, grid, grid, source_zone=zone, destination_zone=to_zone)
+    assert np.array_equal(E2, E3) and np.array_equal(N2, N3)
+
+
+def test_rezone_round_trip():
+
+    zone = np.where(lngs < 144, 54, 55)
+    _, E, N, _, _ = bulk.to_mga(lats, lngs, zone=zone)
+    E1, N1 = bulk.rezone(zone, E, N, zone + 1)
+    E2, N2 = bulk.rezone(zone + 1, E1, N1, zone)
+    assert np.max(np.abs(E2 - E)) < 1e-8 and np.max(np.abs(N2 - N)) < 1e-8
+
+
+def test_transform_matches_points():
+
+    x, y = bulk.transform(lats[:5], lngs[:5], GDA94, VICGRID94)
+    for i in range(5):
+        E, N = GeoPoint(dLat=lats[i], dLng=lngs[i], datum=GDA94).transform_to(VICGRID94)
+        assert abs(x[i] - E) < 1e-6 and abs(y[i] - N) < 1e-6
+
+    dLat, dLng = bulk.transform([6200000], [700000], MGA94, GDA94, source_zone=55)
+    assert dLat.shape == (1,)
+
+
+@pytest.mark.parametrize("precision", [1, 3, 5])
+def test_mgrs_encode_matches_points(precision):
+
+    zone = np.array([54, 55, 55, 54, 56])
+    E = np.array([504000, 456700, 678997, 650000, 736152])
+    N = np.array([5850000, 6155600, 5851400, 6150000, 6845294])
+
+    codes = bulk.mgrs_encode(zone, E, N, lat_band="H", precision=precision)
+    for i in range(5):
+        z, band, usi, x, y = MGRSPoint.from_mga(zone[i], "H", E[i], N[i]).display_coords
+        assert codes[i] == f"{z}{band}{usi}{x[:precision]}{y[:precision]}"
+
+
+def test_mgrs_encode_lat_band():
+
+    o = GeoPoint(dLat=-37, dLng=145, datum=GDA94)
+    zone, lat_band, E, N = o.transform_to(MGA20)
+    assert bulk.mgrs_encode(zone, E, N) == "".join(str(c) for c in o.transform_to(MGRS))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_engine_map(workers):
+
+    expected = bulk.to_mga(lats, lngs, grid=MGA94)
+    with bulk.ParallelEngine(workers=workers, chunk_size=64) as engine:
+        result = engine.map(bulk.to_mga, lats, lngs, grid=MGA94)
+        codes = engine.map(bulk.mgrs_encode, expected[0], expected[1], expected[2])
+
+    for a, b in zip(result, expected):
+        assert np.array_equal(a, b)
+    assert np.array_equal(codes, bulk.mgrs_encode(*expected[:3]))
+
+
+def test_parallel_engine_csv(tmp_path):
+
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    np.savetxt(src, np.column_stack([lats, lngs]), delimiter=",", header="lat,lng", comments="")
+
+    engine = bulk.ParallelEngine(workers=2, chunk_size=100)
+    engine.map_csv(bulk.to_mga, src, dst, skiprows=1, fmt="%.4f", grid=MGA20)
+
+    out = np.loadtxt(dst, delimiter=",")
+    zone, E, N, _, _ = bulk.to_mga(lats, lngs, grid=MGA20)
+    assert out.shape == (500, 5)
+    assert np.array_equal(out[:, 0], zone)
+    assert np.max(np.abs(out[:, 1] - E)) < 1e-4
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_engine_npy(tmp_path, workers):
+
+    src, dst = tmp_path / "in.npy", tmp_path / "out.npy"
+    np.save(src, np.column_stack([lats, lngs, np.zeros_like(lats)]))
+
+    engine = bulk.ParallelEngine(workers=workers, chunk_size=64)
+    names = ["zone", "E", "N", "m", "gamma"]
+    engine.map_npy(bulk.to_mga, src, dst, usecols=(0, 1), names=names, grid=MGA20)
+
+    out = np.load(dst)
+    assert out.dtype.names == tuple(names) and len(out) == 500
+    for name, expected in zip(names, bulk.to_mga(lats, lngs, grid=MGA20)):
+        assert out[name].dtype == expected.dtype
+        assert np.array_equal(out[name], expected)
+
+
+def test_parallel_engine_raw_records(tmp_path):
+
+    src, dst = tmp_path / "in.dat", tmp_path / "out.dat"
+    zone, E, N, _, _ = bulk.to_mga(lats, lngs, grid=MGA20)
+    records = np.zeros(500, dtype=[("zone", "<i8"), ("E", "<f8"), ("N", "<f8")])
+    records["zone"], records["E"], records["N"] = zone, E, N
+    records.tofile(src)
+
+    engine = bulk.ParallelEngine(workers=1, chunk_size=64)
+    out = engine.map_npy(bulk.from_mga, src, dst, dtype=records.dtype, usecols=("zone", "E", "N"), grid=MGA20)
+    codes = engine.map_npy(bulk.mgrs_encode, src, tmp_path / "codes.npy", dtype=records.dtype)
+
+    dLat, dLng, _, _ = bulk.from_mga(zone, E, N, grid=MGA20)
+    assert np.array_equal(np.memmap(dst, dtype=out.dtype, mode="r")["f0"], dLat)
+    assert np.array_equal(out["f1"], dLng)
+    assert np.array_equal(np.load(tmp_path / "codes.npy")["f0"], bulk.mgrs_encode(zone, E, N))
+
+
+def test_read_columns(tmp_path):
+
+    path = tmp_path / "records.npy"
+    np.save(path, np.zeros(3, dtype=[("lat", "<f8"), ("lng", "<f8")]))
+    lat, lng = bulk.read_columns(path)
+    assert isinstance(lat, np.memmap) and len(lng) == 3
+    (lng,) = bulk.read_columns(path, usecols=[1])
+    assert np.array_equal(lng, bulk.read_columns(path, usecols=["lng"])[0])
+
+
+def test_mgrs_decode_round_trip():
+
+    zone, E, N, _, _ = bulk.to_mga(lats[:100], lngs[:100], grid=MGRS)
+    keep = np.isin(zone, [54, 55, 56]) & (lats[:100] < -32)
+    zone, E, N = zone[keep], np.round(E[keep]), np.round(N[keep])
+
+    refs = bulk.mgrs_encode(zone, E, N)
+    z, band, e, n = bulk.mgrs_decode(refs)
+    assert np.array_equal(z, zone) and np.all(band == "H")
+    assert np.array_equal(e, E) and np.array_equal(n, N)
+
+    _, _, e, n = bulk.mgrs_decode(["55HCU220032", "55 H CU 2 3"])
+    assert list(e) == [322000, 320000] and list(n) == [5803200, 5830000]
+
+    with pytest.raises(AssertionError):
+        bulk.mgrs_decode(["55HCU2203"[:-1]])
+
+
+def test_distance_matches_points():
+
+    s = bulk.distance(lats[:-1], lngs[:-1], lats[1:], lngs[1:], datum=GDA20)
+    for i in range(0, 499, 50):
+        a = GeoPoint(dLat=lats[i], dLng=lngs[i], datum=GDA20)
+        b = GeoPoint(dLat=lats[i + 1], dLng=lngs[i + 1], datum=GDA20)
+        assert abs(s[i] - a.distance_to(b)) < 1e-4
+
+    assert bulk.distance(-37, 145, -37, 145) == 0
+
+
+def test_declination_arrays():
+
+    from datetime import date
+
+    from vicmap.magnetic import model_declination
+
+    d = date(2020, 6, 1)
+    decl = bulk.declination(lats[:10], lngs[:10], date=d)
+    assert np.allclose(decl, model_declination(lats[:10], lngs[:10], 0, d), atol=1e-12)
+
+    dates = np.array([date(2016, 1, 1), date(2019, 1, 1)], dtype=object)
+    decl = bulk.declination([-37, -37], [145, 145], date=dates)
+    assert decl[0] != decl[1]
+
+
+def test_distance_matches_pyproj():
+
+    from pyproj import Geod
+
+    _, _, s = Geod(ellps="GRS80").inv(lngs[:-1], lats[:-1], lngs[1:], lats[1:])
+    assert np.max(np.abs(bulk.distance(lats[:-1], lngs[:-1], lats[1:], lngs[1:]) - s)) < 1e-4
@@ -1,3 +1,4 @@
+import numpy as np
 from vicmap.ellipsoids import ANS, CLARKE, GRS67, GRS80, WGS84Ell
 
 
@@ -55,3 +56,41 @@ def test_clarke():
     assert ellipsoid.b == 6356674.970095943
     assert abs(ellipsoid.e2 - 0.006785162) < 1e-8
     assert abs(ellipsoid.e - 0.082372092) < 1e-8
+
+
+def test_geocentric_known_values():
+
+    assert np.allclose(GRS80.to_geocentric(0, 0, 0), (GRS80.a, 0, 0), rtol=0, atol=1e-9)
+    assert np.allclose(GRS80.to_geocentric(0, 90, 10), (0, GRS80.a + 10, 0), rtol=0, atol=1e-9)
+    assert np.allclose(GRS80.to_geocentric(-90, 0, 0), (0, 0, -GRS80.b), rtol=0, atol=1e-9)
+
+    φ, λ, h = GRS80.from_geocentric(0, 0, GRS80.b + 10)
+    assert (φ, λ) == (90, 0) and abs(h - 10) < 1e-9
+
+
+def test_geocentric_round_trip():
+
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(-90, 90, 100000)
+    lngs = rng.uniform(-180, 180, 100000)
+
+    for ellipsoid in [GRS80, ANS, CLARKE]:
+        for hs, tol in [(rng.uniform(-1e4, 1e5, 100000), 1e-8), (rng.uniform(1e5, 4e7, 100000), 1e-7)]:
+            X, Y, Z = ellipsoid.to_geocentric(lats, lngs, hs)
+            φ, λ, h = ellipsoid.from_geocentric(X, Y, Z)
+            assert np.max(np.abs(h - hs)) < tol
+
+            X2, Y2, Z2 = ellipsoid.to_geocentric(φ, λ, h)
+            assert np.max(np.sqrt((X - X2) ** 2 + (Y - Y2) ** 2 + (Z - Z2) ** 2)) < tol
+
+
+def test_geocentric_matches_proj():
+
+    from pyproj import Transformer
+
+    to_ecef = Transformer.from_crs("EPSG:4979", "EPSG:4978")  # WGS84 3d -> geocentric
+    rng = np.random.default_rng(4)
+    lats, lngs, hs = rng.uniform(-90, 90, 1000), rng.uniform(-180, 180, 1000), rng.uniform(-100, 9000, 1000)
+
+    X, Y, Z = to_ecef.transform(lats, lngs, hs)
+    assert np.allclose(WGS84Ell.to_geocentric(lats, lngs, hs), (X, Y, Z), rtol=0, atol=1e-6)
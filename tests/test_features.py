@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+from vicmap import bulk
+from vicmap.datums import GDA20
+from vicmap.features import read_features, reproject, write_features
+from vicmap.grids import MGA20
+
+square = [[145.0, -37.8], [145.01, -37.8], [145.01, -37.81], [145.0, -37.81], [145.0, -37.8]]
+hole = [[145.002, -37.802], [145.004, -37.802], [145.004, -37.804], [145.002, -37.802]]
+
+geometries = [
+    {"type": "Point", "coordinates": [144.9631, -37.8136, 31.5]},
+    {"type": "MultiPoint", "coordinates": [[144.9, -37.7], [145.1, -37.9]]},
+    {"type": "LineString", "coordinates": [[144.9, -37.7], [145.1, -37.9], [145.2, -38.0]]},
+    {"type": "MultiLineString", "coordinates": [[[144.9, -37.7], [145.1, -37.9]], [[145.2, -38.0], [145.3, -38.1]]]},
+    {"type": "Polygon", "coordinates": [square, hole]},
+    {"type": "MultiPolygon", "coordinates": [[square], [hole]]},
+    {
+        "type": "GeometryCollection",
+        "geometries": [{"type": "Point", "coordinates": [145, -37]}, {"type": "LineString", "coordinates": square}],
+    },
+    None,
+]
+
+
+def collection():
+    return {
+        "type": "FeatureCollection",
+        "name": "test",
+        "bbox": [144.9, -38.1, 145.3, -37],
+        "features": [
+            {"type": "Feature", "id": i, "properties": {"n": i, "label": "ö"}, "geometry": g}
+            for i, g in enumerate(geometries)
+        ],
+        "crs": {"type": "name", "properties": {"name": "EPSG:7844"}},
+    }
+
+
+def walk(geometry):
+    """ (x, y) of every position in a geometry """
+    if geometry is None:
+        return []
+    if geometry["type"] == "GeometryCollection":
+        return [p for g in geometry["geometries"] for p in walk(g)]
+    coordinates = geometry["coordinates"]
+    if isinstance(coordinates[0], (int, float)):
+        coordinates = [coordinates]
+    while not isinstance(coordinates[0][0], (int, float)):
+        coordinates = [p for part in coordinates for p in part]
+    return [p[:2] for p in coordinates]
+
+
+@pytest.fixture
+def geojson_file(tmp_path):
+    path = tmp_path / "in.geojson"
+    path.write_text(json.dumps(collection(), indent=2), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1 << 20])
+def test_read_features(geojson_file, block_size):
+
+    members = {}
+    features = list(read_features(geojson_file, members, block_size=block_size))
+    expected = collection()
+    assert features == expected["features"]
+    assert members == {k: v for k, v in expected.items() if k != "features"}
+
+
+def test_read_empty(tmp_path):
+
+    path = tmp_path / "empty.geojson"
+    path.write_text('{"type": "FeatureCollection", "features": [ ]}')
+    assert list(read_features(path)) == []
+
+
+def test_write_features_round_trip(tmp_path, geojson_file):
+
+    members = {}
+    path = tmp_path / "out.geojson"
+    write_features(path, read_features(geojson_file, members), members)
+    assert json.loads(path.read_text(encoding="utf-8")) == collection()
+
+
+@pytest.mark.parametrize("batch_size", [1, 5, 65536])
+def test_reproject_to_mga(tmp_path, geojson_file, batch_size):
+
+    path = tmp_path / "mga.geojson"
+    reproject(geojson_file, path, GDA20, MGA20, destination_zone=55, batch_size=batch_size)
+    out = json.loads(path.read_text(encoding="utf-8"))
+
+    assert "bbox" not in out
+    assert out["crs"]["properties"]["name"] == "EPSG:7855"
+    assert out["name"] == "test"
+    for before, after in zip(collection()["features"], out["features"]):
+        assert after["properties"] == before["properties"] and after["id"] == before["id"]
+        assert (before["geometry"] is None) == (after["geometry"] is None)
+        if before["geometry"] is None:
+            continue
+        assert after["geometry"]["type"] == before["geometry"]["type"]
+        lngs, lats = np.array(walk(before["geometry"])).T
+        _, E, N, _, _ = bulk.to_mga(lats, lngs, grid=MGA20, zone=55)
+        assert np.allclose(walk(after["geometry"]), np.column_stack([E, N]), atol=1e-6)
+
+    # heights pass through
+    assert out["features"][0]["geometry"]["coordinates"][2] == 31.5
+
+
+def test_reproject_round_trip(tmp_path, geojson_file):
+
+    mga, back = tmp_path / "mga.geojson", tmp_path / "back.geojson"
+    reproject(geojson_file, mga, GDA20, MGA20, destination_zone=55, precision=4)
+    reproject(mga, back, MGA20, GDA20, source_zone=55)
+    out = json.loads(back.read_text(encoding="utf-8"))
+
+    assert out["crs"]["properties"]["name"] == "EPSG:7844"
+    for before, after in zip(collection()["features"], out["features"]):
+        if before["geometry"] is not None:
+            assert np.allclose(walk(after["geometry"]), walk(before["geometry"]), atol=1e-8)
@@ -0,0 +1,135 @@
+import pickle
+
+import numpy as np
+import pytest
+from mock import patch
+from vicmap.datums import GDA20
+from vicmap.geoid import GeoidGrid, use_geoid
+from vicmap.grids import MGA20
+from vicmap.magnetic import declination_cache
+from vicmap.points import GeoPoint, MGAPoint
+
+from tests.test_ntv2 import write_gsb
+
+
+def field(dLat, dLng):
+    """ a synthetic separation, linear so bilinear interpolation is exact """
+    return 5 + 0.5 * dLat + 0.25 * dLng
+
+
+@pytest.fixture
+def text(tmp_path):
+    lats, lngs = np.meshgrid(np.arange(-40, -33.9, 0.5), np.arange(140, 150.1, 0.5), indexing="ij")
+    rows = np.column_stack([lats.ravel(), lngs.ravel(), field(lats, lngs).ravel()])
+    path = tmp_path / "geoid.txt"
+    np.savetxt(path, np.random.default_rng(0).permutation(rows), header="lat lng N")
+    return path
+
+
+def test_from_text(text):
+
+    grid = GeoidGrid.from_text(text, skiprows=1)
+    assert grid.values.shape == (13, 21)
+    assert np.allclose(grid.bounds, (-40, -34, 140, 150))
+
+    rng = np.random.default_rng(1)
+    lats, lngs = rng.uniform(-40, -34, 1000), rng.uniform(140, 150, 1000)
+    assert np.max(np.abs(grid.separation(lats, lngs) - field(lats, lngs))) < 1e-5
+    assert abs(grid.separation(-37.3, 145.2) - field(-37.3, 145.2)) < 1e-5
+    assert grid.separation(lats.reshape(10, 100), lngs.reshape(10, 100)).shape == (10, 100)
+
+    with pytest.raises(AssertionError):
+        grid.separation(-30, 145)
+
+
+def test_from_gsb(tmp_path):
+
+    path = tmp_path / "geoid.gsb"
+    write_gsb(path, [("AUS", "NONE", -40 * 3600, -34 * 3600, -150 * 3600, -140 * 3600, 1800, 0)])
+    grid = GeoidGrid.from_gsb(path)
+
+    from tests.test_ntv2 import lat_shift
+
+    assert np.allclose(grid.bounds, (-40, -34, 140, 150))
+    for φ, λ in [(-37, 145), (-39.5, 140.5), (-34, 150)]:
+        assert abs(grid.separation(φ, λ) - lat_shift(φ * 3600, -λ * 3600)) < 1e-5
+
+
+def test_save_load_memory_mapped(text, tmp_path):
+
+    grid = GeoidGrid.from_text(text, skiprows=1)
+    grid.save(tmp_path / "ausgeoid")
+
+    loaded = GeoidGrid.load(tmp_path / "ausgeoid")
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded.separation(-37.3, 145.2) == grid.separation(-37.3, 145.2)
+
+    # workers re-map the file rather than receiving the raster
+    data = pickle.dumps(loaded)
+    assert len(data) < 1000
+    assert isinstance(pickle.loads(data).values, np.memmap)
+
+
+def test_point_heights(text):
+
+    grid = GeoidGrid.from_text(text, skiprows=1)
+    N = field(-37, 145)
+    use_geoid(grid)
+    try:
+        pt = GeoPoint(dLat=-37, dLng=145, datum=GDA20, h=100)
+        assert pt.ellipsoidal_height == 100
+        assert abs(pt.ahd_height - (100 - N)) < 1e-5
+
+        pt = MGAPoint(zone=55, lat_band="H", E=500000, N=5900000, grid=MGA20, H=50)
+        φ, λ = pt.geographic
+        assert abs(pt.ellipsoidal_height - (50 + field(φ, λ))) < 1e-5
+        assert pt.ahd_height == 50
+    finally:
+        use_geoid(None)
+
+    pt = GeoPoint(dLat=-37, dLng=145, datum=GDA20)
+    assert pt.ellipsoidal_height is None and pt.ahd_height is None
+    with pytest.raises(AssertionError):
+        GeoPoint(dLat=-37, dLng=145, datum=GDA20, H=50).ellipsoidal_height
+    with pytest.raises(AssertionError):
+        GeoPoint(dLat=-37, dLng=145, datum=GDA20, h=1, H=1)
+
+
+def test_declination_uses_height(text):
+
+    use_geoid(GeoidGrid.from_text(text, skiprows=1))
+    declination_cache.clear()
+    try:
+        pts = [
+            (GeoPoint(dLat=-37, dLng=145, datum=GDA20, h=1500), 1500),
+            (GeoPoint(dLat=-37, dLng=145, datum=GDA20, H=1500), 1500 + field(-37, 145)),
+            (GeoPoint(dLat=-37, dLng=145, datum=GDA20), 0),
+        ]
+        for pt, z in pts:
+            with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+                pt.magnetic_declination
+                assert abs(decl.call_args[0][2] - z) <= 0.5  # cache rounds to the metre
+    finally:
+        use_geoid(None)
+        declination_cache.clear()
+
+
+def test_declination_follows_height_changes(text):
+
+    declination_cache.clear()
+    pt = MGAPoint(zone=55, lat_band="H", E=320000, N=5810000, grid=MGA20)
+    sea_level, angle = pt.magnetic_declination, pt.grid_magnetic_angle
+
+    pt.set_heights(h=20000)
+    assert pt.magnetic_declination != sea_level
+    assert pt.grid_magnetic_angle != angle
+
+    # an AHD height only counts once a geoid is in use
+    pt.set_heights(H=20000)
+    assert pt.magnetic_declination == sea_level
+    use_geoid(GeoidGrid.from_text(text, skiprows=1))
+    try:
+        assert pt.magnetic_declination != sea_level
+    finally:
+        use_geoid(None)
+        declination_cache.clear()
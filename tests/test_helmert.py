@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from mock import patch
+from pyproj import Transformer
+from vicmap import bulk
+from vicmap.datums import AGD66, GDA20, GDA94
+from vicmap.ellipsoids import GRS80
+from vicmap.grids import MGA20, MGA94, MGRS, VICGRID94
+from vicmap.helmert import (GDA94_TO_GDA20, ITRF2014_TO_GDA20, datum_shift,
+                            helmert_supported)
+from vicmap.points import GeoPoint, MGAPoint, VICPoint
+
+rng = np.random.default_rng(7)
+lats = rng.uniform(-44, -10, 1000)
+lngs = rng.uniform(112, 154, 1000)
+
+
+def test_matches_proj():
+
+    dLat, dLng = Transformer.from_crs(GDA94.crs, GDA20.crs).transform(lats, lngs)
+    φ, λ, _ = datum_shift(lats, lngs, GDA94, GDA20)
+    assert np.max(np.abs(φ - dLat)) < 1e-10
+    assert np.max(np.abs(λ - dLng)) < 1e-10
+
+    dLat, dLng = Transformer.from_crs(GDA20.crs, GDA94.crs).transform(lats, lngs)
+    φ, λ, _ = datum_shift(lats, lngs, GDA20, GDA94)
+    assert np.max(np.abs(φ - dLat)) < 1e-10
+    assert np.max(np.abs(λ - dLng)) < 1e-10
+
+
+def test_inverse_is_exact():
+
+    X, Y, Z = GRS80.to_geocentric(lats, lngs, 100)
+    X2, Y2, Z2 = GDA94_TO_GDA20.transform(
+        *GDA94_TO_GDA20.transform(X, Y, Z), inverse=True
+    )
+    assert max(np.max(np.abs(a - b)) for a, b in [(X, X2), (Y, Y2), (Z, Z2)]) < 1e-8
+
+
+def test_shift_magnitude():
+
+    # GDA94 -> GDA2020 is ~1.5m north east across Australia
+    φ, λ, _ = datum_shift(lats, lngs, GDA94, GDA20)
+    dN = (φ - lats) * 111e3
+    dE = (λ - lngs) * 111e3 * np.cos(np.radians(lats))
+    assert np.all((1.3 < np.hypot(dN, dE)) & (np.hypot(dN, dE) < 1.9))
+    assert np.all(dN > 0) and np.all(dE > 0)
+
+
+def test_time_dependent():
+
+    X, Y, Z = GRS80.to_geocentric(-37, 145)
+    assert np.allclose(ITRF2014_TO_GDA20.transform(X, Y, Z, epoch=2020.0), (X, Y, Z), atol=1e-9)
+
+    # australian plate motion is ~6-7cm / year
+    X2, Y2, Z2 = ITRF2014_TO_GDA20.transform(X, Y, Z, epoch=2010.0)
+    assert 0.5 < np.sqrt((X2 - X) ** 2 + (Y2 - Y) ** 2 + (Z2 - Z) ** 2) < 0.8
+
+    with pytest.raises(AssertionError):
+        ITRF2014_TO_GDA20.transform(X, Y, Z)
+
+
+def test_supported():
+
+    assert helmert_supported(GDA94, GDA20) and helmert_supported(GDA20, GDA94)
+    assert not helmert_supported(GDA94, GDA94)
+    assert not helmert_supported(AGD66, GDA20)
+
+
+def test_transform_to_is_native():
+
+    pts = [
+        (GeoPoint(dLat=-37.5, dLng=145.1, datum=GDA94), [GDA20, MGA20, MGRS]),
+        (GeoPoint(dLat=-37.5, dLng=145.1, datum=GDA20), [GDA94, MGA94, VICGRID94]),
+        (MGAPoint(zone=55, lat_band="H", E=350000, N=5850000, grid=MGA94), [GDA20, MGA20]),
+        (MGAPoint(zone=55, lat_band="H", E=350000, N=5850000, grid=MGA20), [GDA94, MGA94, VICGRID94]),
+        (VICPoint(E=2.5e6, N=2.5e6, grid=VICGRID94), [GDA20, MGA20]),
+    ]
+    for pt, others in pts:
+        for other in others:
+            with patch("vicmap.points.get_transformer") as proj:
+                new = pt.transform_to(other)
+                assert not proj.called
+
+            crs = other.crs(new[0]) if callable(other.crs) else other.crs
+            x, y = Transformer.from_crs(pt.crs, crs).transform(*pt.proj_coords)
+            if other is MGRS:
+                assert new[:3] == (55, "H", "CU")
+                continue
+            tol = 1e-9 if other in [GDA94, GDA20] else 1e-4
+            assert abs(new[-2] - x) < tol and abs(new[-1] - y) < tol
+
+
+def test_bulk_transform_is_native():
+
+    E, N = bulk.transform(lats[:100], lngs[:100], GDA94, MGA20, destination_zone=50)
+    x, y = Transformer.from_crs(GDA94.crs, MGA20.crs(50)).transform(lats[:100], lngs[:100])
+    assert np.max(np.abs(E - x)) < 1e-4 and np.max(np.abs(N - y)) < 1e-4
+
+    dLat, dLng = bulk.transform(E, N, MGA20, GDA94, source_zone=50)
+    assert np.max(np.abs(dLat - lats[:100])) < 1e-9
+    assert np.max(np.abs(dLng - lngs[:100])) < 1e-9
@@ -0,0 +1,138 @@
+import json
+
+import numpy as np
+import pytest
+import vicmap
+from vicmap import bulk, instrumentation
+from vicmap.datums import GDA20
+from vicmap.grids import MGA20, VICGRID94
+from vicmap.points import GeoPoint
+from vicmap.projections import utm
+from vicmap.transformers import transformer_cache
+
+
+@pytest.fixture
+def collecting():
+    vicmap.reset_stats()
+    vicmap.enable_stats()
+    yield
+    vicmap.enable_stats(False)
+    vicmap.reset_stats()
+
+
+def test_disabled_by_default():
+
+    vicmap.reset_stats()
+    utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+    assert not instrumentation.enabled
+    assert vicmap.stats() == {}
+
+
+def test_counts_and_times_projections(collecting):
+
+    for _ in range(3):
+        utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+    bulk.to_mga([-37.5, -37.6], [145.1, 145.2])
+
+    stats = vicmap.stats()
+    assert stats["utm"]["count"] == 3 and stats["utm"]["time"] > 0
+    assert stats["utm_array"]["count"] == 1
+
+
+def test_transformer_cache_hits(collecting):
+
+    transformer_cache.clear()
+    pt = GeoPoint(-37.5, 145.1)
+    for _ in range(4):
+        pt.transform_to(VICGRID94)
+
+    stats = vicmap.stats()
+    assert stats["transform_to"]["count"] == 4
+    assert stats["transformer.construct"]["count"] == 1
+    assert stats["transformer.hit"]["count"] == 3
+    assert stats["transformer.hit"]["time"] == 0
+
+
+def test_vincenty_iterations(collecting):
+
+    GeoPoint(-37.5, 145.1).distance_to(GeoPoint(-33.9, 151.2))
+    bulk.distance(np.array([-37.5]), np.array([145.1]), np.array([-33.9]), np.array([151.2]))
+
+    stats = vicmap.stats()
+    assert stats["vincenty"]["count"] == 1 and stats["bulk.distance"]["count"] == 1
+    assert stats["vincenty.iterations"]["count"] >= 2
+
+
+def test_reset(collecting):
+
+    utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+    vicmap.reset_stats()
+    assert vicmap.stats() == {}
+
+
+@pytest.fixture
+def traced():
+    calls = []
+    tracer = lambda *call: calls.append(call)
+    vicmap.add_tracer(tracer)
+    yield calls
+    vicmap.remove_tracer(tracer)
+
+
+def test_tracer_receives_operations(traced):
+
+    utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+    bulk.to_mga(np.array([-37.5, -37.6, -37.7]), np.array([145.1, 145.2, 145.3]))
+    GeoPoint(-37.5, 145.1).distance_to(GeoPoint(-37.6, 145.2))
+
+    sizes = {name: size for name, size, _ in traced}
+    assert sizes["utm"] == 1
+    assert sizes["bulk.to_mga"] == 3 and sizes["utm_array"] == 3
+    assert sizes["distance_to"] == 1
+    assert all(seconds > 0 for _, _, seconds in traced)
+    assert vicmap.stats() == {}
+
+
+def test_tracer_removed():
+
+    calls = []
+    tracer = lambda *call: calls.append(call)
+    vicmap.add_tracer(tracer)
+    vicmap.remove_tracer(tracer)
+    utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+    assert calls == []
+    assert not instrumentation.active
+
+
+def test_histogram_percentiles():
+
+    histogram = instrumentation.LatencyHistogram(significant_figures=2)
+    latencies = np.arange(1, 10001) * 1e-6
+    histogram.record(latencies[:5000])
+    histogram.record(latencies[5000:], items=10)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 10000 and summary["items"] == 5000 + 50000
+    for q in [50, 90, 99]:
+        expected = np.percentile(latencies, q) * 1e9
+        assert abs(summary["percentiles_ns"][str(q)] - expected) / expected < 0.01
+    assert summary["min_ns"] <= 1000 and summary["max_ns"] >= 1e7 - 1
+    assert sum(n for _, n in summary["buckets"]) == 10000
+
+
+def test_histograms_dump(tmp_path):
+
+    histograms = vicmap.LatencyHistograms(flush_every=8)
+    vicmap.add_tracer(histograms)
+    try:
+        for _ in range(20):
+            utm(-37.5, 145.1, GDA20.ellipsoid, MGA20)
+        bulk.mgrs_encode(np.array([55, 55]), np.array([3e5, 4e5]), np.array([5.8e6, 5.9e6]))
+    finally:
+        vicmap.remove_tracer(histograms)
+
+    histograms.dump(tmp_path / "latency.json")
+    dumped = json.loads((tmp_path / "latency.json").read_text())
+    assert dumped["utm"]["count"] == 20
+    assert dumped["bulk.mgrs_encode"]["items"] == 2
+    assert dumped["utm"]["percentiles_ns"]["50"] <= dumped["utm"]["percentiles_ns"]["99.9"]
@@ -0,0 +1,151 @@
+from datetime import date
+
+import geomag
+import numpy as np
+from mock import patch
+from vicmap.datums import GDA20
+from vicmap.grids import MGA20
+from vicmap.magnetic import (DeclinationCache, DeclinationGrid,
+                             declination_cache, use_declination_grid)
+from vicmap.points import GeoPoint, MGAPoint
+
+
+def test_cache_reuses_quantized_positions():
+
+    cache = DeclinationCache(precision=3, maxsize=10)
+    d = date(2020, 6, 1)
+
+    with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+        assert cache.declination(-37.00001, 145.00001, 0, d) == 11.5
+        assert cache.declination(-37.00002, 145.00002, 0, d) == 11.5
+        assert decl.call_count == 1
+
+        cache.declination(-37.1, 145, 0, d)
+        assert decl.call_count == 2
+
+    hits, misses, size, maxsize = cache.info
+    assert (hits, misses, size, maxsize) == (1, 2, 2, 10)
+
+
+def test_cache_keyed_on_date_and_height():
+
+    cache = DeclinationCache()
+
+    with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+        cache.declination(-37, 145, 0, date(2020, 6, 1))
+        cache.declination(-37, 145, 0, date(2020, 6, 2))
+        cache.declination(-37, 145, 1000, date(2020, 6, 2))
+        assert decl.call_count == 3
+
+
+def test_cache_eviction():
+
+    cache = DeclinationCache(maxsize=2)
+    d = date(2020, 6, 1)
+
+    with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+        cache.declination(-37, 145, 0, d)
+        cache.declination(-36, 145, 0, d)
+        cache.declination(-37, 145, 0, d)  # refresh -37
+        cache.declination(-35, 145, 0, d)  # evicts -36
+        assert decl.call_count == 3
+
+        cache.declination(-37, 145, 0, d)
+        assert decl.call_count == 3
+        cache.declination(-36, 145, 0, d)
+        assert decl.call_count == 4
+
+    assert cache.info[2] == 2
+
+
+def test_cache_configure():
+
+    cache = DeclinationCache(precision=2, maxsize=4)
+    d = date(2020, 6, 1)
+
+    with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+        for lat in [-34, -35, -36, -37]:
+            cache.declination(lat, 145, 0, d)
+
+        cache.configure(maxsize=2)
+        assert cache.info[2] == 2
+
+        cache.configure(precision=5)
+        assert cache.info[2] == 0
+
+        cache.declination(-37.00001, 145, 0, d)
+        cache.declination(-37.00002, 145, 0, d)
+        assert decl.call_count == 6
+
+
+def test_declination_reused_across_point_properties():
+
+    declination_cache.clear()
+    pts = [
+        GeoPoint(dLat=-37, dLng=145, datum=GDA20),
+        MGAPoint(zone=55, lat_band="H", E=700000, N=6200000, grid=MGA20),
+    ]
+
+    for pt in pts:
+        with patch("vicmap.magnetic.model_declination", return_value=11.5) as decl:
+            assert pt.magnetic_declination == 11.5
+            assert pt.grid_magnetic_angle == 11.5 - pt.grid_convergence
+            assert pt.magnetic_declination == 11.5
+            assert decl.call_count == 1
+
+
+def test_declination_grid_nodes_and_arrays():
+
+    d = date(2020, 6, 1)
+    grid = DeclinationGrid.build(date=d, resolution=0.5, bounds=(-38, -36, 144, 146))
+
+    assert grid.values.shape == (5, 5)
+    assert abs(grid.interpolate(-37, 145) - geomag.declination(-37, 145, 0, d)) < 1e-9
+
+    lats = np.array([[-37.1, -36.2], [-37.9, -36.0]])
+    lngs = np.array([[145.3, 144.1], [145.9, 146.0]])
+    out = grid.interpolate(lats, lngs)
+    assert out.shape == (2, 2)
+    for φ, λ, val in zip(lats.flat, lngs.flat, out.flat):
+        assert abs(val - grid.interpolate(φ, λ)) < 1e-12
+
+
+def test_declination_grid_max_error():
+
+    d = date(2020, 6, 1)
+    grid = DeclinationGrid.build(date=d, resolution=0.25, bounds=(-39, -34, 141, 150))
+
+    err = grid.max_error()
+    assert 0 < err < 0.01
+
+    for φ, λ in [(-37.123, 145.456), (-34.9, 149.1), (-38.6, 141.2)]:
+        assert abs(grid.interpolate(φ, λ) - geomag.declination(φ, λ, 0, d)) <= err * 1.5
+
+
+def test_declination_grid_save_load(tmp_path):
+
+    grid = DeclinationGrid.build(date=date(2020, 6, 1), resolution=1, bounds=(-38, -36, 144, 146))
+    path = tmp_path / "decl.npz"
+    grid.save(path)
+
+    loaded = DeclinationGrid.load(path)
+    assert loaded.date == grid.date
+    assert np.array_equal(loaded.values, grid.values)
+    assert loaded.interpolate(-37.3, 145.2) == grid.interpolate(-37.3, 145.2)
+
+
+def test_points_use_declination_grid():
+
+    grid = DeclinationGrid(
+        lats=[-38, -36], lngs=[144, 146], values=[[10, 10], [12, 12]], date=date(2020, 6, 1)
+    )
+    declination_cache.clear()
+    use_declination_grid(grid)
+    try:
+        pt = GeoPoint(dLat=-37, dLng=145, datum=GDA20)
+        assert pt.magnetic_declination == 11
+        outside = GeoPoint(dLat=-30, dLng=150, datum=GDA20)
+        with patch("vicmap.magnetic.model_declination", return_value=9.5):
+            assert outside.magnetic_declination == 9.5
+    finally:
+        use_declination_grid(None)
@@ -0,0 +1,198 @@
+import struct
+
+import numpy as np
+import pytest
+from vicmap import bulk
+from vicmap.datums import AGD66, GDA20, GDA94
+from vicmap.grids import MGA94, VICGRID
+from vicmap.ntv2 import NTv2Grid, use_ntv2_grid
+from vicmap.points import GeoPoint, VICPoint
+from vicmap.transformers import get_transformer
+
+
+def lat_shift(lat, lng):
+    """ a smooth synthetic shift field (arc seconds, lng positive west) """
+    return 4 + lat / 3600 * 0.01 + lng / 3600 * 0.002
+
+
+def lng_shift(lat, lng):
+    return -4 + lat / 3600 * 0.003 - lng / 3600 * 0.001
+
+
+def write_gsb(path, subgrids, endian="<"):
+    """
+    write a synthetic NTv2 file.
+    subgrids: (name, parent, s_lat, n_lat, e_lng, w_lng, inc, offset) in
+        arc seconds (longitude positive west), offset is added to both shifts
+    """
+
+    def rec(name, value):
+        if isinstance(value, str):
+            packed = value.ljust(8).encode()
+        elif isinstance(value, int):
+            packed = struct.pack(f"{endian}i4x", value)
+        else:
+            packed = struct.pack(f"{endian}d", value)
+        return name.ljust(8).encode() + packed
+
+    out = [
+        rec("NUM_OREC", 11), rec("NUM_SREC", 11), rec("NUM_FILE", len(subgrids)),
+        rec("GS_TYPE", "SECONDS"), rec("VERSION", "NTv2.0"), rec("SYSTEM_F", "AGD66"),
+        rec("SYSTEM_T", "GDA94"), rec("MAJOR_F", 6378160.0), rec("MINOR_F", 6356774.719),
+        rec("MAJOR_T", 6378137.0), rec("MINOR_T", 6356752.314),
+    ]
+    for name, parent, s_lat, n_lat, e_lng, w_lng, inc, offset in subgrids:
+        lats = np.arange(s_lat, n_lat + inc / 2, inc)
+        lngs = np.arange(e_lng, w_lng + inc / 2, inc)
+        out += [
+            rec("SUB_NAME", name), rec("PARENT", parent), rec("CREATED", "20200101"),
+            rec("UPDATED", "20200101"), rec("S_LAT", float(s_lat)), rec("N_LAT", float(n_lat)),
+            rec("E_LONG", float(e_lng)), rec("W_LONG", float(w_lng)), rec("LAT_INC", float(inc)),
+            rec("LONG_INC", float(inc)), rec("GS_COUNT", len(lats) * len(lngs)),
+        ]
+        φ, λ = np.meshgrid(lats, lngs, indexing="ij")
+        nodes = np.stack(
+            [lat_shift(φ, λ) + offset, lng_shift(φ, λ) + offset, np.full_like(φ, 0.01), np.full_like(φ, 0.01)],
+            axis=-1,
+        )
+        out.append(nodes.astype(f"{endian}f4").tobytes())
+    out.append(b"END     " + bytes(8))
+    with open(path, "wb") as file:
+        file.write(b"".join(out))
+
+
+# VIC in arc seconds, longitude positive west
+PARENT = ("VIC", "NONE", -39 * 3600, -34 * 3600, -150 * 3600, -140 * 3600, 600, 0)
+CHILD = ("MELB", "VIC", -38.5 * 3600, -37.5 * 3600, -145.5 * 3600, -144.5 * 3600, 60, 1)
+
+
+@pytest.fixture
+def gsb(tmp_path):
+    path = tmp_path / "synthetic.gsb"
+    write_gsb(path, [PARENT, CHILD])
+    return path
+
+
+def expected(dLat, dLng, offset=0):
+    lat, lng = np.asarray(dLat) * 3600, -np.asarray(dLng) * 3600
+    # the field is linear within each cell, but nodes are stored as float32
+    return (
+        dLat + (lat_shift(lat, lng) + offset) / 3600,
+        dLng - (lng_shift(lat, lng) + offset) / 3600,
+    )
+
+
+def test_reads_headers(gsb):
+
+    grid = NTv2Grid(gsb)
+    assert isinstance(grid.data, np.memmap)
+    assert (grid.system_f, grid.system_t) == ("AGD66", "GDA94")
+    assert [s.name for s in grid.subgrids] == ["VIC", "MELB"]
+    assert grid.subgrids[1].parent == "VIC"
+    assert grid.subgrids[0].shifts.shape == (31, 61, 4)
+
+
+def test_big_endian(tmp_path):
+
+    little, big = tmp_path / "little.gsb", tmp_path / "big.gsb"
+    write_gsb(little, [PARENT, CHILD], endian="<")
+    write_gsb(big, [PARENT, CHILD], endian=">")
+    assert NTv2Grid(big).endian == ">"
+    lats, lngs = np.array([-36.3, -38.1]), np.array([147.2, 145.1])
+    assert np.array_equal(NTv2Grid(big).forward(lats, lngs), NTv2Grid(little).forward(lats, lngs))
+
+
+def test_interpolation_and_subgrid_selection(gsb):
+
+    grid = NTv2Grid(gsb)
+    rng = np.random.default_rng(5)
+    lats, lngs = rng.uniform(-39, -34, 10000), rng.uniform(140, 150, 10000)
+    φ, λ = grid.forward(lats, lngs)
+
+    in_child = (-38.5 <= lats) & (lats <= -37.5) & (144.5 <= lngs) & (lngs <= 145.5)
+    eφ, eλ = expected(lats, lngs, np.where(in_child, 1, 0))
+    # 1e-9 degrees ~ 0.1mm, float32 node storage
+    assert np.max(np.abs(φ - eφ)) < 1e-9
+    assert np.max(np.abs(λ - eλ)) < 1e-9
+
+    # scalars
+    φ, λ = grid.forward(-36, 147)
+    assert np.shape(φ) == () and abs(φ - expected(-36, 147)[0]) < 1e-9
+
+    with pytest.raises(AssertionError):
+        grid.forward(-30, 147)
+
+
+def test_inverse_round_trip(gsb):
+
+    grid = NTv2Grid(gsb)
+    rng = np.random.default_rng(6)
+    lats, lngs = rng.uniform(-38.9, -34.1, 1000), rng.uniform(140.1, 149.9, 1000)
+    φ, λ = grid.inverse(*grid.forward(lats, lngs))
+    assert np.max(np.abs(φ - lats)) < 1e-11 and np.max(np.abs(λ - lngs)) < 1e-11
+
+
+def test_transform_to_and_bulk(gsb):
+
+    use_ntv2_grid(gsb, AGD66, GDA94)
+    try:
+        pt = GeoPoint(dLat=-37.8, dLng=144.9, datum=AGD66)
+        φ, λ = pt.transform_to(GDA94)
+        eφ, eλ = expected(-37.8, 144.9, 1)
+        assert abs(φ - eφ) < 1e-9 and abs(λ - eλ) < 1e-9
+
+        # chained with the GDA94 -> GDA2020 helmert transformation
+        assert GeoPoint(dLat=φ, dLng=λ, datum=GDA94).transform_to(GDA20) == pt.transform_to(GDA20)
+
+        # and back
+        back = GeoPoint(dLat=φ, dLng=λ, datum=GDA94).transform_to(AGD66)
+        assert abs(back[0] + 37.8) < 1e-11 and abs(back[1] - 144.9) < 1e-11
+
+        # from the AGD66 VICGRID plane to MGA94
+        vic = VICPoint(E=2.5e6, N=4.5e6, grid=VICGRID)
+        zone, _, E, N = vic.transform_to(MGA94)
+        assert not (-38.5 <= vic.geographic[0] <= -37.5)  # outside the child grid
+        φ, λ = expected(*vic.geographic)
+        assert np.allclose(bulk.to_mga(φ, λ, grid=MGA94)[1:3], (E, N), rtol=0, atol=1e-4)
+
+        lats, lngs = np.array([-36.3, -38.1]), np.array([147.2, 145.1])
+        φ, λ = bulk.transform(lats, lngs, AGD66, GDA94)
+        assert np.allclose(φ, expected(lats, lngs, [0, 1])[0], rtol=0, atol=1e-9)
+    finally:
+        use_ntv2_grid(None, AGD66, GDA94)
+
+    # PROJ once the grid is no longer in use
+    assert abs(GeoPoint(dLat=-37.8, dLng=144.9, datum=AGD66).transform_to(GDA94)[0] - eφ) > 1e-6
+
+
+def test_outside_of_grid_falls_back_to_proj(gsb):
+
+    # just north of the synthetic grid
+    lat, lng = -33.99, 147.0
+    proj = get_transformer(AGD66.crs, GDA94.crs).transform(lat, lng)
+    use_ntv2_grid(gsb, AGD66, GDA94)
+    try:
+        with pytest.raises(AssertionError):
+            NTv2Grid(gsb).shift(lat, lng)
+
+        pt = GeoPoint(dLat=lat, dLng=lng, datum=AGD66)
+        assert np.allclose(pt.transform_to(GDA94), proj, rtol=0, atol=1e-12)
+        zone, _, E, N = pt.transform_to(MGA94)
+        assert np.allclose((E, N), np.ravel(bulk.transform([lat], [lng], AGD66, MGA94, destination_zone=zone)), rtol=0, atol=1e-6)
+        # chained with the helmert transformation
+        assert np.allclose(
+            pt.transform_to(GDA20), get_transformer(AGD66.crs, GDA20.crs).transform(lat, lng), rtol=0, atol=1e-12
+        )
+
+        # native inside, PROJ outside
+        lats, lngs = np.array([-37.8, lat]), np.array([144.9, lng])
+        φ, λ = bulk.transform(lats, lngs, AGD66, GDA94)
+        eφ, eλ = expected(-37.8, 144.9, 1)
+        assert abs(φ[0] - eφ) < 1e-9 and abs(λ[0] - eλ) < 1e-9
+        assert np.allclose((φ[1], λ[1]), proj, rtol=0, atol=1e-12)
+
+        # and back to AGD66 through the inverse
+        back = GeoPoint(dLat=proj[0], dLng=proj[1], datum=GDA94).transform_to(AGD66)
+        assert np.allclose(back, get_transformer(GDA94.crs, AGD66.crs).transform(*proj), rtol=0, atol=1e-12)
+    finally:
+        use_ntv2_grid(None, AGD66, GDA94)
@@ -1,12 +1,14 @@
 import math
 from datetime import date
 
-import geomag
 import pytest
 from mock import patch
 from vicmap.datums import AGD66, GDA20, GDA94, __all_datums__
 from vicmap.grids import MGA20, MGA94, MGRS, VICGRID, VICGRID94, __all_grids__
 from vicmap.points import GeoPoint, MGAPoint, MGRSPoint, VICPoint
+from vicmap.projections import lambert_conformal_conic_inverse as lcc_inverse
+from vicmap.projections import utm, utm_inverse
+from vicmap.transformers import get_transformer
 
 
 def test_grid_convergence_central_meridian_vicgrid():
@@ -67,6 +69,15 @@ def test_grid_convergence_known_vals_mga():
         assert abs(pt.grid_convergence - γ) < 1e-3
 
 
+def test_grid_convergence_matches_forward_mga():
+    for zn, e, n, _ in known_convergence_mga:
+        pt = MGAPoint(zone=zn, lat_band='H', E=e, N=n, grid=MGA94)
+        φ, λ = pt.invert()
+        _, _, _, m, γ = utm(φ, λ, ellipsoid=pt.datum.ellipsoid, grid=pt.grid)
+        assert abs(pt.grid_convergence - γ) < 1e-6
+        assert abs(pt.point_scale_factor - m) < 1e-8
+
+
 def test_grid_convergence_zone_invariance_mga():
     for _, e, n, _ in known_convergence_mga:
         pt54 = MGAPoint(zone=54, lat_band='H', E=e, N=n, grid=MGA20)
@@ -137,8 +148,9 @@ def test_transform_to_compatible_types():
 
 def test_transform_to_mgrs():
 
+    # MGRS is on GDA2020, so includes the ~1.5m datum shift from GDA94
     o = GeoPoint(dLat=-37, dLng=145, datum=GDA94)
-    assert o.transform_to(MGRS) == (55, "H", "CV", "22038", "03258")
+    assert o.transform_to(MGRS) == (55, "H", "CV", "22038", "03259")
 
 
 def test_known_vals_mgrs():
@@ -363,6 +375,54 @@ def test_distance_to_euclidian_v1km():
         assert p1.distance_to(p2) == delta
 
 
+@pytest.mark.parametrize("p1, p2", [
+    (MGAPoint(zone=55, lat_band='H', E=331000, N=5810000, grid=MGA20),
+     MGAPoint(zone=55, lat_band='H', E=334200, N=5812400, grid=MGA20)),
+    (VICPoint(E=2500000, N=2400000, grid=VICGRID94), VICPoint(E=2503000, N=2404000, grid=VICGRID94)),
+])
+def test_distance_to_line_scale(p1, p2):
+
+    ellipsoidal = GeoPoint(*p1.geographic, datum=p1.datum).distance_to(GeoPoint(*p2.geographic, datum=p2.datum))
+    assert abs(p1.distance_to(p2) - ellipsoidal) > 0.1
+    assert abs(p1.distance_to(p2, line_scale=True) - ellipsoidal) < 1e-5
+
+
+def test_distance_to_line_scale_zones():
+
+    p1 = MGAPoint(zone=55, lat_band='H', E=740000, N=5810000, grid=MGA20)
+    p2 = MGAPoint(zone=56, lat_band='H', E=260000, N=5810000, grid=MGA20)
+    with pytest.raises(AssertionError):
+        p1.distance_to(p2, line_scale=True)
+
+
+def test_distance_to_line_scale_other_kinds():
+
+    p1 = MGAPoint(zone=55, lat_band='H', E=740000, N=5810000, grid=MGA20)
+    # in zone 56, moved into zone 55 for the plane distance
+    p2 = GeoPoint(dLat=-37.8, dLng=150.2, datum=GDA20)
+    ellipsoidal = GeoPoint(*p1.geographic, datum=GDA20).distance_to(p2)
+    assert abs(p1.distance_to(p2, line_scale=True) - ellipsoidal) < 1e-3
+
+    with pytest.raises(AssertionError):
+        p1.distance_to(VICPoint(E=2500000, N=2400000, grid=VICGRID94), line_scale=True)
+
+
+def test_mga_rezone():
+
+    pt = MGAPoint(zone=55, lat_band='H', E=200000, N=5900000, grid=MGA20)
+    E, N = get_transformer(MGA20.crs(55), MGA20.crs(54)).transform(pt.E, pt.N)
+
+    other = pt.rezone(54)
+    assert other.zone == 54 and other.grid is MGA20
+    assert abs(other.E - E) < 1e-7 and abs(other.N - N) < 1e-7
+    assert abs(other.geographic[0] - pt.geographic[0]) < 1e-10
+
+    # west of 144 E, so transform_to the grid moves it into zone 54
+    assert pt.geographic[1] < 144
+    zone, lat_band, E2, N2 = pt.transform_to(MGA20)
+    assert (zone, lat_band, E2, N2) == (54, 'H', other.E, other.N)
+
+
 def test_distance_to_euclidian_uv1km():
 
     delta = 1000
@@ -390,3 +450,38 @@ def test_distance_to_all_types():
     for pt in pts:
         for other in pts:
             assert pt.distance_to(other) >= 0
+
+
+def test_derived_properties_computed_once():
+
+    pts = [
+        MGAPoint(zone=55, lat_band='H', E=700000, N=6200000, grid=MGA94),
+        VICPoint(E=2.6e6, N=2.6e6, grid=VICGRID94),
+    ]
+
+    for pt in pts:
+        with patch("vicmap.points.get_transformer", wraps=get_transformer) as from_crs, \
+                patch("vicmap.points.utm_inverse", wraps=utm_inverse) as inv_utm, \
+                patch("vicmap.points.lambert_conformal_conic_inverse", wraps=lcc_inverse) as inv_lcc:
+
+            for _ in range(3):
+                assert pt.magnetic_declination
+                assert pt.grid_convergence
+                assert pt.grid_magnetic_angle
+                assert pt.point_scale_factor
+                assert pt.invert()
+
+            # one inverse projection, and no PROJ transformation
+            assert from_crs.call_count == 0
+            assert inv_utm.call_count + inv_lcc.call_count == 1
+
+
+def test_crs_shared():
+
+    p1 = MGAPoint(zone=55, lat_band='H', E=700000, N=6200000, grid=MGA94)
+    p2 = MGAPoint(zone=55, lat_band='H', E=600000, N=6200000, grid=MGA94)
+    assert p1.crs is p2.crs is MGA94.crs(55)
+
+    v1 = VICPoint(E=2.6e6, N=2.6e6, grid=VICGRID94)
+    v2 = VICPoint(E=2.4e6, N=2.6e6, grid=VICGRID94)
+    assert v1.crs is v2.crs is VICGRID94.crs
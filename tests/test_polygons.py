@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from pyproj import Geod
+from vicmap.datums import GDA20, GDA94
+from vicmap.points import GeoPoint
+from vicmap.polygons import area_perimeter, authalic_radius, points_area_perimeter
+
+geod = Geod(ellps="GRS80")
+θ = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+lats = -37 + 0.5 * np.sin(θ) + 0.05 * np.sin(7 * θ)
+lngs = 145 + 0.7 * np.cos(θ)
+
+
+def test_authalic_radius():
+    # GRS80 authalic radius R_q
+    assert abs(authalic_radius(GDA20.ellipsoid) - 6371007.1810) < 1e-3
+
+
+def test_matches_geodesic_polygon():
+
+    area, perimeter = area_perimeter(lats, lngs)
+    expected_area, expected_perimeter = geod.polygon_area_perimeter(lngs, lats)
+    assert abs(area - abs(expected_area)) / abs(expected_area) < 1e-11
+    # vincenty is good to about 1e-8 relative on short east-west edges
+    assert abs(perimeter - expected_perimeter) / expected_perimeter < 1e-8
+
+
+@pytest.mark.parametrize("vertices", [4, 10, 100])
+def test_long_edges(vertices):
+
+    t = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    lat, lng = -30 + 2 * np.sin(t), 140 + 3 * np.cos(t)
+    area, _ = area_perimeter(lat, lng)
+    expected, _ = geod.polygon_area_perimeter(lng, lat)
+    assert abs(area - abs(expected)) / abs(expected) < 1e-6
+
+
+def test_orientation_and_closure():
+
+    area, perimeter = area_perimeter(lats, lngs)
+    reversed_area, reversed_perimeter = area_perimeter(lats[::-1], lngs[::-1])
+    closed_area, closed_perimeter = area_perimeter(np.append(lats, lats[0]), np.append(lngs, lngs[0]))
+    assert abs(reversed_area - area) < 1e-3 and abs(closed_area - area) < 1e-6
+    assert abs(reversed_perimeter - perimeter) < 1e-6 and closed_perimeter == perimeter
+
+
+def test_antimeridian():
+
+    area, _ = area_perimeter([-10, -10, -11, -11], [179.5, -179.5, -179.5, 179.5])
+    expected, _ = geod.polygon_area_perimeter([179.5, -179.5, -179.5, 179.5], [-10, -10, -11, -11])
+    assert abs(area - abs(expected)) / abs(expected) < 1e-6
+
+
+def test_points():
+
+    pts = [GeoPoint(lat, lng, datum=GDA20) for lat, lng in zip(lats[::20], lngs[::20])]
+    assert points_area_perimeter(pts) == area_perimeter(lats[::20], lngs[::20])
+
+    # GDA94 points are shifted ~1.5 m to GDA2020 first
+    pts94 = [GeoPoint(lat, lng, datum=GDA94) for lat, lng in zip(lats[::20], lngs[::20])]
+    area, perimeter = points_area_perimeter(pts94)
+    expected_area, expected_perimeter = area_perimeter(lats[::20], lngs[::20])
+    assert area != expected_area
+    assert abs(area - expected_area) / expected_area < 1e-7
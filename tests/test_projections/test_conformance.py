@@ -0,0 +1,17 @@
+import pytest
+from vicmap.conformance import CASES, compare
+
+"""
+CONFORMANCE WITH PROJ
+A coarse run of the conformance harness, the native projections
+must agree with PROJ to well under a millimetre everywhere sampled.
+"""
+
+
+@pytest.mark.parametrize("grid, zone", CASES)
+def test_conforms_with_proj(grid, zone):
+
+    report = compare(grid, zone, spacing=0.5)
+    assert report["E max"] < 1e-7 and report["N max"] < 1e-7
+    assert report["m max"] < 1e-3  # ppm
+    assert report["γ max"] < 1e-4  # arc seconds
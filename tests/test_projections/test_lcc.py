@@ -1,10 +1,12 @@
 import math
 
+import numpy as np
 import pytest
 from vicmap.datums import AGD66, GDA20, GDA94
 from vicmap.grids import MGA20, MGA94, VICGRID, VICGRID94
 from vicmap.points import GeoPoint, PlanePoint
 from vicmap.projections import lambert_conformal_conic as lcc
+from vicmap.projections import lambert_conformal_conic_inverse as lcc_inverse
 from vicmap.utils import dms_to_dd
 
 """
@@ -107,3 +109,63 @@ def test_known_vals_vic_total(lat, lng, E, N):
 
     e, n, _, _ = lcc(lat, lng, AGD66.ellipsoid, VICGRID)
     assert math.sqrt((e - E) ** 2 + (n - N) ** 2) <= TOL
+
+
+"""
+INVERSE / PLANE SIDE CONVERGENCE & SCALE
+"""
+
+
+@pytest.mark.parametrize("lat,lng,E,N", known_vals_gda94)
+def test_inverse_known_vals_vic94(lat, lng, E, N):
+
+    φ, λ, _, _ = lcc_inverse(E, N, GDA94.ellipsoid, VICGRID94)
+    assert abs(φ - lat) < 1e-5
+    assert abs(λ - lng) < 1e-5
+
+
+def test_inverse_round_trip():
+
+    for grid, datum in [(VICGRID94, GDA94), (VICGRID, AGD66)]:
+        for lat in np.linspace(-39, -34, 6):
+            for lng in np.linspace(141, 150, 6):
+                E, N, m, γ = lcc(lat, lng, datum.ellipsoid, grid)
+                _lat, _lng, _m, _γ = lcc_inverse(E, N, datum.ellipsoid, grid)
+
+                assert abs(_lat - lat) < 1e-10
+                assert abs(_lng - lng) < 1e-10
+                assert abs(_m - m) < 1e-12
+                assert abs(_γ - γ) < 1e-10
+
+
+def test_scale_factor_standard_parallels():
+
+    for grid, datum in [(VICGRID94, GDA94), (VICGRID, AGD66)]:
+        for φ in [grid.φ1, grid.φ2]:
+            _, _, m, _ = lcc(φ, 145, datum.ellipsoid, grid)
+            assert abs(m - 1) < 1e-12
+
+        _, _, m, _ = lcc(grid.φ0, 145, datum.ellipsoid, grid)
+        assert m < 1
+
+
+def test_inverse_arrays():
+
+    E = np.array([2.3e6, 2.6e6, 2.5e6])
+    N = np.array([2.4e6, 2.7e6, 2.5e6])
+    lats, lngs, ms, γs = lcc_inverse(E, N, GDA94.ellipsoid, VICGRID94)
+
+    assert lats.shape == lngs.shape == ms.shape == γs.shape == (3,)
+    for i in range(3):
+        lat, lng, m, γ = lcc_inverse(E[i], N[i], GDA94.ellipsoid, VICGRID94)
+        assert (lats[i], lngs[i], ms[i], γs[i]) == (lat, lng, m, γ)
+
+
+def test_cone_constants_cached():
+
+    cone = VICGRID94.cone(GDA94.ellipsoid)
+    assert VICGRID94.cone(GDA94.ellipsoid) is cone
+    assert VICGRID.cone(AGD66.ellipsoid) != cone
+
+    n, F, r0 = cone
+    assert abs(n + math.sin(math.radians(37))) < 1e-3
@@ -1,8 +1,9 @@
+import numpy as np
 import pytest
 from vicmap.datums import AGD66, GDA20, GDA94
 from vicmap.grids import MGA20, MGA94
 from vicmap.points import GeoPoint, PlanePoint
-from vicmap.projections import utm
+from vicmap.projections import utm, utm_inverse
 from vicmap.utils import dms_to_dd
 
 """
@@ -61,3 +62,43 @@ def test_mga_datum_invariance():
     z2, E2, N2, m2, γ2 = utm(lat, lng, ellipsoid=GDA94.ellipsoid, grid=MGA94)
 
     assert (z1, E1, N1, m1, γ1) == (z2, E2, N2, m2, γ2)
+
+
+def test_utm_inverse_known_vals():
+
+    for grid in [MGA94, MGA20]:
+
+        lat, lng, m, γ = utm_inverse(
+            53, 386352.397753, 7381850.768886, ellipsoid=GDA20.ellipsoid, grid=grid
+        )
+
+        assert abs(lat - dms_to_dd(-23, 40, 12.446020)) < 1e-9
+        assert abs(lng - dms_to_dd(133, 53, 7.84784)) < 1e-9
+        assert abs(m - 0.999759539) < 1e-8
+        assert abs(γ + 0.447481418) < 1e-8
+
+
+def test_utm_inverse_round_trip():
+
+    for lat in np.linspace(-40, -28, 7):
+        for lng in np.linspace(138.5, 155.5, 7):
+            z, E, N, m, γ = utm(lat, lng, ellipsoid=GDA20.ellipsoid, grid=MGA20)
+            _lat, _lng, _m, _γ = utm_inverse(z, E, N, ellipsoid=GDA20.ellipsoid, grid=MGA20)
+
+            assert abs(_lat - lat) < 1e-10
+            assert abs(_lng - lng) < 1e-10
+            assert abs(_m - m) < 1e-12
+            assert abs(_γ - γ) < 1e-10
+
+
+def test_utm_inverse_arrays():
+
+    zones = np.array([54, 55, 56])
+    E = np.array([600000, 400000, 300000])
+    N = np.array([6200000, 5700000, 6100000])
+    lats, lngs, ms, γs = utm_inverse(zones, E, N, ellipsoid=GDA20.ellipsoid, grid=MGA20)
+
+    assert lats.shape == lngs.shape == ms.shape == γs.shape == (3,)
+    for i in range(3):
+        lat, lng, m, γ = utm_inverse(zones[i], E[i], N[i], ellipsoid=GDA20.ellipsoid, grid=MGA20)
+        assert (lats[i], lngs[i], ms[i], γs[i]) == (lat, lng, m, γ)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from datetime import date
+
+from vicmap import bulk
+from vicmap.datums import GDA20
+from vicmap.grids import MGA94
+from vicmap.points import GeoPoint
+from vicmap.projections import utm
+from vicmap.server import CoordinateService, MicroBatcher
+
+
+def call(service, path, body):
+    return service.handle(path, json.dumps(body).encode())
+
+
+def test_endpoints():
+
+    async def main():
+        service = CoordinateService(max_wait=0.001)
+        _, fwd = await call(service, "/forward", {"lat": -37.8, "lng": 144.9, "grid": "MGA94"})
+        _, inv = await call(service, "/inverse", {"zone": fwd["zone"], "E": fwd["E"], "N": fwd["N"], "grid": "MGA94"})
+        _, enc = await call(service, "/mgrs/encode", {"zone": 55, "E": 322038, "N": 5803258, "precision": 3})
+        _, dec = await call(service, "/mgrs/decode", {"mgrs": "55HCU2203803258"})
+        _, dist = await call(service, "/distance", {"lat1": -37, "lng1": 145, "lat2": -33.9, "lng2": 151.2})
+        _, decl = await call(service, "/declination", {"lat": -37, "lng": 145, "date": "2020-06-01"})
+        return fwd, inv, enc, dec, dist, decl
+
+    fwd, inv, enc, dec, dist, decl = asyncio.run(main())
+
+    zone, E, N, _, _ = utm(-37.8, 144.9, ellipsoid=MGA94.datum.ellipsoid, grid=MGA94)
+    assert fwd["zone"] == zone and abs(fwd["E"] - E) < 1e-6 and abs(fwd["N"] - N) < 1e-6
+    assert abs(inv["lat"] + 37.8) < 1e-9 and abs(inv["lng"] - 144.9) < 1e-9
+    assert enc == {"mgrs": "55HCU220032"}
+    assert dec == {"zone": 55, "lat_band": "H", "E": 322038, "N": 5803258}
+    a, b = GeoPoint(dLat=-37, dLng=145, datum=GDA20), GeoPoint(dLat=-33.9, dLng=151.2, datum=GDA20)
+    assert abs(dist["distance"] - a.distance_to(b)) < 1e-6
+    assert abs(decl["declination"] - bulk.declination(-37, 145, date=date(2020, 6, 1))) < 1e-12
+
+
+def test_bad_requests():
+
+    async def main():
+        service = CoordinateService()
+        return [
+            await service.handle("/forward", b"{"),
+            await call(service, "/forward", {"lat": -37}),
+            await call(service, "/forward", {"lat": -37, "lng": 145, "grid": "VICGRID94"}),
+            await call(service, "/mgrs/decode", {"mgrs": "55HZZ1"}),
+            await call(service, "/inverse", {"zone": 55, "E": 1e9, "N": 5800000}),
+            await call(service, "/inverse", {"zone": 55, "E": 1e6, "N": 0}),
+            await service.handle("/forward", b'{"lat": NaN, "lng": 145}'),
+            await call(service, "/distance", {"lat1": -37, "lng1": 145, "lat2": -37, "lng2": 1e308}),
+            await call(service, "/nope", {}),
+        ]
+
+    statuses = [status for status, _ in asyncio.run(main())]
+    assert statuses == [400, 400, 400, 400, 400, 400, 400, 400, 404]
+
+
+def test_concurrent_requests_are_batched():
+
+    async def main():
+        service = CoordinateService(max_batch=50, max_wait=0.05)
+        bodies = [{"lat": -37 + i / 100, "lng": 145} for i in range(120)]
+        results = await asyncio.gather(*(call(service, "/forward", b) for b in bodies))
+        return service.stats, results
+
+    stats, results = asyncio.run(main())
+    assert stats["requests"] == 120 and stats["batches"] == 3
+
+    _, E, N, _, _ = bulk.to_mga([-37 + i / 100 for i in range(120)], [145] * 120)
+    assert all(r == 200 for r, _ in results)
+    assert [r["N"] for _, r in results] == N.tolist()
+
+
+def test_mgrs_encode_range():
+
+    async def main():
+        service = CoordinateService(max_wait=0.05)
+        bodies = [
+            {"zone": 55, "E": 322038, "N": 5803258},
+            {"zone": 55, "E": 899999, "N": 7400000},
+            {"zone": 54, "E": 322038, "N": 7450000},
+            {"zone": 55, "E": 899999.7, "N": 5803258},
+        ]
+        return await asyncio.gather(*(call(service, "/mgrs/encode", b) for b in bodies))
+
+    statuses = [status for status, _ in asyncio.run(main())]
+    assert statuses == [200, 400, 200, 400]
+
+
+def test_batcher_isolates_failures():
+
+    def kernel(items):
+        assert all(x >= 0 for x in items), "negative item"
+        return [x * 2 for x in items]
+
+    async def main():
+        batcher = MicroBatcher(kernel, max_batch=100, max_wait=0.01)
+        futures = [batcher.submit(x) for x in [1, -1, 3]]
+        return await asyncio.gather(*futures, return_exceptions=True), batcher.batches
+
+    (a, b, c), batches = asyncio.run(main())
+    assert batches == 1
+    assert a == 2 and c == 6
+    assert isinstance(b, AssertionError)
+
+
+def test_batcher_waits_at_most_max_wait():
+
+    async def main():
+        batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_batch=100, max_wait=0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await batcher.submit(21)
+        return result, loop.time() - start, batcher.batches
+
+    result, waited, batches = asyncio.run(main())
+    assert result == 42 and batches == 1
+    assert 0.01 <= waited < 0.5
+
+
+def test_http():
+
+    async def main():
+        server = await CoordinateService(max_wait=0.001).start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for body in [b'{"mgrs": "55HCU2203803258"}', b'{"mgrs": 1}']:
+            writer.write(
+                b"POST /mgrs/decode HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+            )
+            status = (await reader.readline()).split()[1]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.lower()] = value.strip()
+            payload = await reader.readexactly(int(headers["content-length"]))
+            responses.append((int(status), json.loads(payload)))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    (s1, r1), (s2, _) = asyncio.run(main())
+    assert s1 == 200 and r1["E"] == 322038
+    assert s2 == 400
+
+
+def test_http_malformed_content_length():
+
+    async def request(port, length):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /mgrs/decode HTTP/1.1\r\nContent-Length: %s\r\n\r\n{}" % length)
+        status = int((await reader.readline()).split()[1])
+        rest = await reader.read()  # the service closes the connection
+        writer.close()
+        return status, b"Connection: close" in rest
+
+    async def main():
+        server = await CoordinateService(max_wait=0.001, max_body=1024).start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        results = [await request(port, length) for length in [b"abc", b"-5", b"4096"]]
+        server.close()
+        await server.wait_closed()
+        return results
+
+    assert asyncio.run(main()) == [(400, True)] * 3
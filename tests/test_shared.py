@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from vicmap import bulk
+from vicmap.grids import MGA94
+
+# SharedBatch needs python >= 3.8
+shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+from vicmap.shared import SharedBatch  # noqa: E402
+
+rng = np.random.default_rng(3)
+lats = rng.uniform(-39, -28, 2000)
+lngs = rng.uniform(138.5, 155.5, 2000)
+
+
+def fail(dLat, dLng):
+    raise ValueError("worker failed")
+
+
+def unlinked(names):
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    return True
+
+
+def test_shared_map_matches_bulk():
+
+    expected = bulk.to_mga(lats, lngs, grid=MGA94)
+    with SharedBatch(lats, lngs) as batch:
+        result = batch.map(bulk.to_mga, workers=2, chunk_size=300, grid=MGA94)
+        for a, b in zip(result, expected):
+            assert a.dtype == b.dtype
+            assert np.array_equal(a, b)
+
+        # outputs of one map feed the next without leaving shared memory
+        zone, E, N, _, _ = result
+        dLat, dLng, _, _ = batch.map(bulk.from_mga, inputs=[zone, E, N], workers=2, grid=MGA94)
+        assert np.max(np.abs(dLat - lats)) < 1e-9
+
+        names = [shm.name for shm in batch.segments]
+
+    assert unlinked(names)
+
+
+def test_inputs_allocated_in_place():
+
+    with SharedBatch() as batch:
+        φ = batch.array(lats.shape)
+        λ = batch.array(lngs.shape)
+        φ[:], λ[:] = lats, lngs
+
+        zone, E, N, _, _ = batch.map(bulk.to_mga, inputs=[φ, λ], workers=2, grid=MGA94)
+        codes = batch.map(bulk.mgrs_encode, inputs=[zone, E, N], outputs=["<U15"], workers=2)
+
+        assert np.array_equal(E, bulk.to_mga(lats, lngs, grid=MGA94)[1])
+        assert list(codes) == list(bulk.mgrs_encode(zone, E, N))
+
+
+def test_cleanup_when_worker_fails():
+
+    with pytest.raises(ValueError):
+        with SharedBatch(lats, lngs) as batch:
+            names = [shm.name for shm in batch.segments]
+            batch.map(fail, outputs=["f8"], workers=2, chunk_size=500)
+
+    assert unlinked(names)
+    assert batch.segments == []
+
+
+def test_cleanup_when_an_input_fails(monkeypatch):
+
+    class Unreadable:
+        def __array__(self, *args, **kwargs):
+            raise ValueError("unreadable column")
+
+    names = []
+    array = SharedBatch.array
+
+    def recorded(self, shape, dtype=float):
+        arr = array(self, shape, dtype)
+        names.append(self.segments[-1].name)
+        return arr
+
+    monkeypatch.setattr(SharedBatch, "array", recorded)
+    with pytest.raises(ValueError):
+        SharedBatch(lats, Unreadable())
+    assert len(names) == 1 and unlinked(names)
+
+
+def test_spec_matches_by_identity():
+
+    with SharedBatch(lats) as batch:
+        (held,) = batch.inputs
+        assert batch.spec(held)[0] == batch.segments[0].name
+        with pytest.raises(AssertionError):
+            batch.spec(np.array(held))
+        with pytest.raises(AssertionError):
+            batch.spec(held[:10])
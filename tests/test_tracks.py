@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from vicmap import bulk
+from vicmap.datums import WGS84
+from vicmap.points import GeoPoint
+from vicmap.tracks import (cumulative_distances, read_csv, read_fixes, read_gpx,
+                           segment_distances, track_summary)
+
+rng = np.random.default_rng(3)
+lats = np.round(-37.8 + np.cumsum(rng.normal(0, 1e-4, 1000)), 9)
+lngs = np.round(145.0 + np.cumsum(rng.normal(0, 1e-4, 1000)), 9)
+
+
+def write_gpx(path, segments):
+    with open(path, "w") as file:
+        file.write('<?xml version="1.0"?>\n<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">\n<trk>\n')
+        for φ, λ in segments:
+            file.write("<trkseg>\n")
+            for lat, lng in zip(φ, λ):
+                file.write(f'<trkpt lat="{lat:.9f}" lon="{lng:.9f}"><ele>10</ele></trkpt>\n')
+            file.write("</trkseg>\n")
+        file.write("</trk>\n</gpx>\n")
+
+
+@pytest.fixture
+def csv_track(tmp_path):
+    path = tmp_path / "track.csv"
+    np.savetxt(path, np.column_stack([lats, lngs]), fmt="%.9f", delimiter=",", header="lat,lng")
+    return path
+
+
+def test_segment_distances_match_points(csv_track):
+
+    s = np.concatenate(list(segment_distances(read_csv(csv_track, skiprows=1, chunk_size=64))))
+    assert len(s) == 1000 and s[0] == 0
+    for i in range(1, 1000, 111):
+        expected = GeoPoint(lats[i - 1], lngs[i - 1], datum=WGS84).distance_to(GeoPoint(lats[i], lngs[i], datum=WGS84))
+        assert abs(s[i] - expected) < 1e-4
+
+
+def test_chunk_size_does_not_matter(csv_track):
+
+    whole = np.concatenate(list(cumulative_distances(read_csv(csv_track, skiprows=1, chunk_size=5000))))
+    chunked = np.concatenate(list(cumulative_distances(read_csv(csv_track, skiprows=1, chunk_size=7))))
+    assert np.allclose(whole, chunked, rtol=0, atol=1e-6)
+    expected = np.sum(bulk.distance(lats[:-1], lngs[:-1], lats[1:], lngs[1:], datum=WGS84))
+    assert abs(whole[-1] - expected) < 1e-6
+
+
+def test_gpx_segments(tmp_path):
+
+    path = tmp_path / "track.gpx"
+    write_gpx(path, [(lats[:400], lngs[:400]), (lats[600:], lngs[600:])])
+
+    chunks = list(read_gpx(path, chunk_size=128))
+    assert max(len(c[0]) for c in chunks) == 128
+    starts = np.concatenate([c[2] for c in chunks])
+    assert list(np.flatnonzero(starts)) == [0, 400]
+
+    summary = track_summary(read_fixes(path, chunk_size=128))
+    first = np.sum(bulk.distance(lats[:399], lngs[:399], lats[1:400], lngs[1:400], datum=WGS84))
+    second = np.sum(bulk.distance(lats[600:-1], lngs[600:-1], lats[601:], lngs[601:], datum=WGS84))
+    assert summary["fixes"] == 800 and summary["segments"] == 2
+    assert abs(summary["length"] - (first + second)) < 1e-6
+
+
+def test_csv_summary(csv_track):
+
+    summary = track_summary(read_fixes(csv_track, skiprows=1, chunk_size=100))
+    assert summary["fixes"] == 1000 and summary["segments"] == 1
+    assert summary["longest_step"] < summary["length"]
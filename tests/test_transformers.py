@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from vicmap import bulk
+from vicmap.datums import AGD66, GDA20, GDA94
+from vicmap.grids import MGA20, MGA94, VICGRID, VICGRID94
+from vicmap.points import GeoPoint, MGAPoint, VICPoint
+from vicmap.transformers import TransformerCache, transformer_cache
+
+
+def test_cached_per_thread():
+
+    cache = TransformerCache(maxsize=4)
+    t1 = cache.get(GDA94.crs, GDA20.crs)
+    assert cache.get(GDA94.crs, GDA20.crs) is t1
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(cache.get(GDA94.crs, GDA20.crs)))
+    thread.start()
+    thread.join()
+    assert other[0] is not t1
+
+
+def test_cache_bounded():
+
+    cache = TransformerCache(maxsize=2)
+    crs = [GDA94.crs, GDA20.crs, AGD66.crs, VICGRID94.crs]
+    for src in crs:
+        for dst in crs:
+            cache.get(src, dst)
+    assert len(cache.entries) == 2
+
+    cache.configure(1)
+    cache.get(GDA94.crs, GDA20.crs)
+    assert len(cache.entries) == 1
+
+
+def test_concurrent_transforms():
+
+    """
+    many threads transforming between every kind of point & destination
+    must give the same results as a single thread
+    """
+
+    rng = np.random.default_rng(11)
+    pts = [
+        GeoPoint(dLat=lat, dLng=lng, datum=datum)
+        for lat, lng in zip(rng.uniform(-38.5, -34.5, 10), rng.uniform(141.5, 149, 10))
+        for datum in [GDA94, GDA20]
+    ]
+    pts += [VICPoint(E=e, N=2.5e6, grid=VICGRID94) for e in np.linspace(2.2e6, 2.9e6, 5)]
+    pts += [VICPoint(E=e, N=4.5e6, grid=VICGRID) for e in np.linspace(2.2e6, 2.9e6, 5)]
+    pts += [MGAPoint(55, "H", e, 5.9e6, grid=grid) for e in [3e5, 5e5, 7e5] for grid in [MGA20, MGA94]]
+    destinations = [GDA94, GDA20, AGD66, VICGRID94, VICGRID, MGA94, MGA20]
+
+    jobs = [(pt, dst) for pt in pts for dst in destinations]
+    expected = [pt.transform_to(dst) for pt, dst in jobs]
+
+    def run(job):
+        pt, dst = job
+        return pt.transform_to(dst)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for _ in range(5):
+            assert list(pool.map(run, jobs)) == expected
+
+    lats = rng.uniform(-38.5, -34.5, 1000)
+    lngs = rng.uniform(141.5, 149, 1000)
+    x, y = bulk.transform(lats, lngs, GDA94, VICGRID94)
+
+    def run_bulk(i):
+        return bulk.transform(lats[i::16], lngs[i::16], GDA94, VICGRID94)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for i, (xi, yi) in enumerate(pool.map(run_bulk, range(16))):
+            assert np.array_equal(xi, x[i::16]) and np.array_equal(yi, y[i::16])
+
+
+def test_transform_to_reuses_transformers():
+
+    pt = GeoPoint(dLat=-37, dLng=145, datum=GDA94)
+    pt.transform_to(VICGRID94)
+    size = len(transformer_cache.entries)
+    for _ in range(10):
+        pt.transform_to(VICGRID94)
+    assert len(transformer_cache.entries) == size
@@ -1,12 +1,16 @@
-from math import radians
+from math import cos, cosh, radians, sin, sinh
 
+import numpy as np
 import pytest
 from vicmap.utils import (
     conformal_latitude,
     dms_to_dd,
     gauss_schreiber,
     grid_convergence,
+    inverse_krueger_coefficients,
     krueger_coefficients,
+    krueger_series,
+    negated,
     point_scale_factor,
     pq_coefficients,
     rectifying_radius,
@@ -33,6 +37,27 @@ def test_krueger_coefficients():
     assert abs(α[16] - 1.210785086483e-22) < 1e-30
 
 
+def test_inverse_krueger_coefficients():
+    n = 1.679220395e-03
+    β = inverse_krueger_coefficients(n)
+    assert abs(β[2] - 8.377321640579e-04) < 1e-11
+    assert abs(β[4] - 5.905870152220e-08) < 1e-15
+    assert abs(β[6] - 1.673482665344e-10) < 1e-17
+    assert abs(β[8] - 2.164798110491e-13) < 1e-20
+
+
+def test_krueger_coefficients_order():
+    n = 1.679220395e-03
+    α, α4 = krueger_coefficients(n), krueger_coefficients(n, order=4)
+    assert sorted(α4) == [2, 4, 6, 8]
+    # truncation at n^4 leaves differences of order n^5
+    for k in α4:
+        assert abs(α4[k] - α[k]) < 2 * n ** 5
+    assert sorted(inverse_krueger_coefficients(n, order=6)) == [2, 4, 6, 8, 10, 12]
+    with pytest.raises(AssertionError):
+        krueger_coefficients(n, order=9)
+
+
 def test_conformal_latitude():
     t, σ, _t, _φ = conformal_latitude(-0.413121596, 0.081819191043)
 
@@ -75,6 +100,30 @@ def test_pq_coefficients():
     assert abs(p - 1.001141754741e00) < 1e-8
 
 
+def test_krueger_series_matches_term_sums():
+    α = krueger_coefficients(1.679220395e-03)
+    β = negated(inverse_krueger_coefficients(1.679220395e-03))
+
+    def terms(c, ε, Nu):
+        rs = range(1, 9)
+        return (
+            ε + sum(c[2 * r] * sin(2 * r * ε) * cosh(2 * r * Nu) for r in rs),
+            Nu + sum(c[2 * r] * cos(2 * r * ε) * sinh(2 * r * Nu) for r in rs),
+            -sum(2 * r * c[2 * r] * sin(2 * r * ε) * sinh(2 * r * Nu) for r in rs),
+            1 + sum(2 * r * c[2 * r] * cos(2 * r * ε) * cosh(2 * r * Nu) for r in rs),
+        )
+
+    rng = np.random.default_rng(0)
+    εs, Nus = rng.uniform(-1.2, 1.2, 50), rng.uniform(-0.1, 0.1, 50)
+    for c in [α, β]:
+        arrays = krueger_series(c, εs, Nus)
+        for i, (ε, Nu) in enumerate(zip(εs, Nus)):
+            expected = terms(c, float(ε), float(Nu))
+            scalar = krueger_series(c, float(ε), float(Nu))
+            for e, s, a in zip(expected, scalar, arrays):
+                assert abs(s - e) < 1e-15 and abs(a[i] - e) < 1e-15
+
+
 def test_grid_convergence():
     q = -4.398179750e-05
     p = 1.001141755e00
@@ -0,0 +1,76 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from geomag.geomag import GeoMag
+from vicmap.wmm import WorldMagneticModel, decimal_year, default_coefficient_file
+
+wmm = WorldMagneticModel()
+reference = GeoMag(wmm.path)
+
+FEET = 3.2808399
+
+
+@pytest.mark.parametrize(
+    "d", [date(2015, 1, 1), date(2017, 7, 2), date(2019, 12, 31)]
+)
+def test_matches_geomag(d):
+
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(-89, 89, 50)
+    lngs = rng.uniform(-180, 180, 50)
+    hs = rng.uniform(0, 1e5, 50)
+
+    dec, dip, ti = wmm.evaluate(lats, lngs, hs, decimal_year(d))
+
+    for i in range(50):
+        mag = reference.GeoMag(lats[i], lngs[i], hs[i] * FEET, d)
+        assert abs(dec[i] - mag.dec) < 1e-9
+        assert abs(dip[i] - mag.dip) < 1e-9
+        assert abs(ti[i] - mag.ti) < 1e-6
+
+
+def test_known_vals():
+
+    # NOAA test values for WMM2015
+    if wmm.model != "WMM-2015":
+        pytest.skip(f"test values are for WMM-2015, not {wmm.model}")
+
+    d1, d2 = decimal_year(date(2015, 1, 1)), decimal_year(date(2017, 7, 2))
+    known = [
+        (d1, 0, 80, 0, -3.85),
+        (d1, 0, 0, 120, 0.57),
+        (d1, 0, -80, 240 - 360, 69.81),
+        (d2, 100000, 80, 0, -3.17),
+        (d2, 100000, 0, 120, 0.32),
+        (d2, 100000, -80, 240 - 360, 69.00),
+    ]
+    for year, h, lat, lng, dec in known:
+        assert abs(wmm.declination(lat, lng, h, year) - dec) < 0.01
+
+
+def test_scalar_and_broadcast():
+
+    dec, dip, ti = wmm.evaluate(-37, 145, 0, 2020.0)
+    assert isinstance(dec, float) and isinstance(ti, float)
+
+    lats = np.linspace(-40, -28, 12).reshape(3, 4)
+    out = wmm.declination(lats, 145, 0, 2020.0)
+    assert out.shape == (3, 4)
+    assert abs(out[0, 0] - wmm.declination(-40, 145, 0, 2020.0)) < 1e-12
+
+
+def test_poles():
+
+    d = date(2016, 1, 1)
+    for lat in [-90, 90]:
+        mag = reference.GeoMag(lat, 30, 0, d)
+        assert abs(wmm.declination(lat, 30, 0, decimal_year(d)) - mag.dec) < 1e-9
+
+
+def test_coefficients_ship_with_package(tmp_path, monkeypatch):
+
+    monkeypatch.chdir(tmp_path)
+    path = default_coefficient_file()
+    assert path.exists() and path.parent.parent.name == "vicmap"
+    assert WorldMagneticModel().epoch == 2015.0
@@ -1,6 +1,8 @@
 from .datums import AGD66, AGD84, GDA20, GDA94, WGS84
 from .ellipsoids import ANS, CLARKE, GRS67, GRS80, WGS84Ell, reference_ellipsoids
 from .grids import MGA20, MGA94, MGRS, VICGRID, VICGRID94
+from .instrumentation import (LatencyHistograms, add_tracer, enable_stats, remove_tracer,
+                              reset_stats, stats)
 from .points import GeoPoint, MGAPoint, MGRSPoint, VICPoint
 from .projections import lambert_conformal_conic, utm
 
@@ -28,4 +30,10 @@ __all__ = [
     reference_ellipsoids,
     lambert_conformal_conic,
     utm,
+    enable_stats,
+    reset_stats,
+    stats,
+    add_tracer,
+    remove_tracer,
+    LatencyHistograms,
 ]
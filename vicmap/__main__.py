@@ -0,0 +1,26 @@
+import argparse
+
+from vicmap.server import serve
+
+"""
+    python -m vicmap serve [--host HOST] [--port PORT] [--max-batch N] [--max-wait MS]
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vicmap")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server = commands.add_parser("serve", help="run the coordinate conversion service")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8080)
+    server.add_argument("--max-batch", type=int, default=512, help="largest micro-batch")
+    server.add_argument("--max-wait", type=float, default=2, help="longest wait for a batch to fill (ms)")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, max_batch=args.max_batch, max_wait=args.max_wait / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from vicmap.datums import GDA20, Datum
+from vicmap.grids import MGA20, MGRS, MGAGrid
+from vicmap.instrumentation import count, timed
+from vicmap.magnetic import magnetic_model
+from vicmap.projections import lambert_conformal_conic_inverse, utm_array, utm_inverse, utm_rezone
+from vicmap.transformers import get_transformer, native_shift
+from vicmap.wmm import decimal_year
+
+"""
+Bulk conversions over numpy arrays of coordinates, and an engine
+that distributes them over a pool of worker processes in chunks.
+"""
+
+
+@timed("bulk.to_mga", size=0)
+def to_mga(dLat, dLng, grid=MGA20, zone=None, order=8):
+    """
+    project arrays of (dLat, dLng) in the grid's datum to MGA,
+    with the Krueger series truncated at order (see utils.SERIES_ORDERS)
+    returns
+        zone, E, N, m, γ arrays
+    """
+    return utm_array(dLat, dLng, ellipsoid=grid.datum.ellipsoid, grid=grid, zone=zone, order=order)
+
+
+@timed("bulk.from_mga", size=1)
+def from_mga(zone, E, N, grid=MGA20, order=8):
+    """
+    invert arrays of MGA (zone, E, N) to the grid's datum,
+    with the series truncated at order
+    returns
+        dLat, dLng, m, γ arrays
+    """
+    return utm_inverse(zone, E, N, ellipsoid=grid.datum.ellipsoid, grid=grid, order=order)
+
+
+def get_crs(system, zone=None):
+    if isinstance(system, MGAGrid):
+        assert zone is not None, f"zone required for {system.code}"
+        return system.crs(zone)
+    return system.crs
+
+
+@timed("bulk.rezone", size=1)
+def rezone(zone, E, N, to_zone, grid=MGA20, order=8):
+    """
+    re-express arrays of MGA (zone, E, N) in to_zone (scalar or array),
+    natively through the conformal sphere (see projections.utm_rezone)
+    returns
+        E, N arrays
+    """
+    return utm_rezone(zone, E, N, to_zone, ellipsoid=grid.datum.ellipsoid, grid=grid, order=order)
+
+
+@timed("bulk.transform", size=0)
+def transform(x, y, source, destination, source_zone=None, destination_zone=None):
+    """
+    datum shift / reprojection of coordinate arrays through PROJ
+    accepts
+        x, y: coordinates in the axis order of source,
+            (dLat, dLng) for datums and (E, N) for grids
+        source, destination: Datum or Grid
+        source_zone, destination_zone: zones for MGA grids
+    returns
+        x, y arrays in the axis order of destination
+    Datum shifts with a built in transformation (GDA94 <-> GDA20, NTv2 grids
+    in use) between datums & MGA grids are computed natively,
+    see vicmap.transformers.native_shift, as are changes of MGA zone.
+    Positions outside of the NTv2 grids in use fall back to PROJ.
+    """
+    if isinstance(source, MGAGrid) and destination is source:
+        assert None not in (source_zone, destination_zone), f"zones required for {source.code}"
+        return rezone(source_zone, x, y, destination_zone, grid=source)
+
+    src = source if isinstance(source, Datum) else source.datum
+    dst = destination if isinstance(destination, Datum) else destination.datum
+    shift = native_shift(src, dst)
+    native = (Datum, MGAGrid)
+    if shift is not None and isinstance(source, native) and isinstance(destination, native):
+        if isinstance(source, MGAGrid):
+            x, y, _, _ = from_mga(source_zone, x, y, grid=source)
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        dLat, dLng = shift(x, y)
+        # outside of the NTv2 grids in use
+        outside = np.isnan(dLat) | np.isnan(dLng)
+        if np.any(outside):
+            dLat, dLng = np.array(dLat), np.array(dLng)
+            transformer = get_transformer(src.crs, dst.crs)
+            dLat[outside], dLng[outside] = transformer.transform(x[outside], y[outside])
+        if isinstance(destination, MGAGrid):
+            assert destination_zone is not None, f"zone required for {destination.code}"
+            _, E, N, _, _ = to_mga(dLat, dLng, grid=destination, zone=destination_zone)
+            return E, N
+        return dLat, dLng
+
+    transformer = get_transformer(
+        get_crs(source, source_zone), get_crs(destination, destination_zone)
+    )
+    return transformer.transform(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+
+
+def mgrs_lookup(table):
+    """ 100km square index -> letter, first match wins as in MGRSPoint.get_usi """
+    lookup = {}
+    for code, (lb, ub) in table.items():
+        lookup.setdefault(int(lb // 1e5), code)
+    idx = np.full(max(lookup) + 1, "", dtype="<U1")
+    for i, code in lookup.items():
+        idx[i] = code
+    return idx
+
+
+@timed("bulk.mgrs_encode", size=1)
+def mgrs_encode(zone, E, N, lat_band=None, precision=5, grid=MGRS):
+    """
+    encode arrays of MGA coords as MGRS references, e.g. 55HCV2203803258
+    accepts
+        zone, E, N: MGA coordinates (arrays or scalars)
+        lat_band: latitude band letter(s), computed from latitude if omitted
+        precision: figures per easting / northing
+    returns
+        array of MGRS strings
+    """
+    assert 1 <= precision <= 5, f"invalid MGRS precision: {precision}"
+    zone, E, N = np.broadcast_arrays(*(np.asarray(x) for x in (zone, E, N)))
+    E, N = np.round(E).astype(int), np.round(N).astype(int)
+
+    if lat_band is None:
+        dLat, _, _, _ = from_mga(zone, E, N, grid=grid)
+        bands = np.array(list(grid.latitude_bands))
+        edges = np.array([lb for lb, _ in grid.latitude_bands.values()])
+        lat_band = bands[np.searchsorted(edges, dLat, side="left") - 1]
+    lat_band = np.broadcast_to(lat_band, zone.shape)
+
+    usi = np.empty(zone.shape, dtype="<U2")
+    for zn in np.unique(zone):
+        assert zn in [54, 55, 56], f"invalid MGRS zone: {zn}"
+        sel = zone == zn
+        cols = mgrs_lookup(getattr(grid, f"cols{zn}"))
+        rows = mgrs_lookup(grid.getrows(zn))
+        usi[sel] = np.char.add(cols[E[sel] // 100000], rows[N[sel] // 100000])
+
+    scale = 10 ** (5 - precision)
+    x = np.char.zfill((E % 100000 // scale).astype(str), precision)
+    y = np.char.zfill((N % 100000 // scale).astype(str), precision)
+
+    out = np.char.add(zone.astype(str), lat_band)
+    for part in [usi, x, y]:
+        out = np.char.add(out, part)
+    return out
+
+
+@timed("bulk.mgrs_decode", size=0)
+def mgrs_decode(refs, grid=MGRS):
+    """
+    decode arrays of MGRS references, e.g. 55HCV2203803258, to MGA
+    accepts
+        refs: MGRS strings with 1 - 5 figure eastings / northings
+    returns
+        zone, lat_band, E, N arrays
+    """
+    refs = np.char.upper(np.char.replace(np.asarray(refs, dtype=str), " ", ""))
+    zone = np.char.ljust(refs, 2).astype("<U2").astype(int)
+    lat_band = np.array([r[2:3] for r in refs.flat], dtype="<U1").reshape(refs.shape)
+    digits = np.char.str_len(refs) - 5
+    assert np.all(digits % 2 == 0) and np.all((2 <= digits) & (digits <= 10)), "invalid MGRS reference"
+    precision = digits // 2
+
+    E, N = np.empty(refs.shape), np.empty(refs.shape)
+    for zn in np.unique(zone):
+        assert zn in [54, 55, 56], f"invalid MGRS zone: {zn}"
+        cols, rows = getattr(grid, f"cols{zn}"), grid.getrows(zn)
+        for i in zip(*np.nonzero(zone == zn)):
+            ref, p = str(refs[i]), int(precision[i])
+            assert ref[3] in cols and ref[4] in rows, f"invalid MGRS usi: {ref[3:5]}"
+            scale = 10 ** (5 - p)
+            E[i] = cols[ref[3]][0] + int(ref[5 : 5 + p]) * scale
+            N[i] = rows[ref[4]][0] + int(ref[5 + p :]) * scale
+    return zone, lat_band, E, N
+
+
+@timed("bulk.distance", size=0)
+def distance(dLat1, dLng1, dLat2, dLng2, datum=GDA20, tol=1e-12, max_iter=16):
+    """
+    Vincenty's inverse formula over arrays of point pairs,
+    as GeoPoint.distance_to, iterating until every pair converges.
+    returns
+        s: ellipsoidal arc distances (meters)
+    """
+    a, b, f, _, _, _ = datum.ellipsoid.constants
+    φ1, λ1, φ2, λ2 = np.broadcast_arrays(
+        *(np.radians(np.asarray(x, dtype=float)) for x in (dLat1, dLng1, dLat2, dLng2))
+    )
+    U1, U2 = np.arctan((1 - f) * np.tan(φ1)), np.arctan((1 - f) * np.tan(φ2))
+    sU1, cU1, sU2, cU2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+
+    L = λ2 - λ1
+    λ = L.copy()
+    # converged pairs keep their λ, so each result is independent of
+    # the other pairs in the batch
+    converged = np.zeros(L.shape, dtype=bool)
+    for iteration in range(1, max_iter + 1):
+        sin_σ = np.hypot(cU2 * np.sin(λ), cU1 * sU2 - sU1 * cU2 * np.cos(λ))
+        same = sin_σ == 0
+        sin_σ = np.where(same, 1, sin_σ)
+        cos_σ = sU1 * sU2 + cU1 * cU2 * np.cos(λ)
+        σ = np.arctan2(sin_σ, cos_σ)
+
+        sin_α = cU1 * cU2 * np.sin(λ) / sin_σ
+        cos_sq_α = 1 - sin_α ** 2
+        # equatorial lines have cos_sq_α = 0
+        cos_2σ_m = np.where(cos_sq_α == 0, 0, cos_σ - 2 * sU1 * sU2 / np.where(cos_sq_α == 0, 1, cos_sq_α))
+        C = f * cos_sq_α * (4 + f * (4 - 3 * cos_sq_α)) / 16
+
+        t = σ + C * sin_σ * (cos_2σ_m + C * cos_σ * (-1 + 2 * cos_2σ_m ** 2))
+        λ_new = L + (1 - C) * f * sin_α * t
+        converged |= np.abs(λ_new - λ) <= tol
+        λ = np.where(converged, λ, λ_new)
+        if np.all(converged):
+            break
+    count("vincenty.iterations", iteration)
+
+    u2 = cos_sq_α * ((a ** 2 - b ** 2) / b ** 2)
+    A = 1 + (u2 / 16384) * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = (u2 / 1024) * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    t = cos_2σ_m + 0.25 * B * (cos_σ * (-1 + 2 * cos_2σ_m ** 2))
+    t -= (B ** 2 / 24) * cos_2σ_m * (-3 + 4 * sin_σ ** 2) * (-3 + 4 * cos_2σ_m ** 2)
+    s = b * A * (σ - B * sin_σ * t)
+    return np.where(same, 0, s)
+
+
+def point_scale_factor(E, N, grid=MGA20, zone=None):
+    """
+    point scale factors m at arrays of grid coordinates, straight
+    from the inverse projection. MGA coordinates need their zone.
+    """
+    ellipsoid = grid.datum.ellipsoid
+    if isinstance(grid, MGAGrid):
+        assert zone is not None, "zone required for MGA coordinates"
+        return utm_inverse(zone, E, N, ellipsoid=ellipsoid, grid=grid)[2]
+    return lambert_conformal_conic_inverse(E, N, ellipsoid=ellipsoid, grid=grid)[2]
+
+
+def line_scale_factor(E1, N1, E2, N2, grid=MGA20, zone=None):
+    """
+    line scale factors k of arrays of grid lines, by Simpson's rule
+    over the point scale factors at the ends and midpoint:
+        k = (m1 + 4 mm + m2) / 6
+    See: GDA2020 Technical Manual, section 5.3
+    """
+    E1, N1, E2, N2 = np.broadcast_arrays(*(np.asarray(c, dtype=float) for c in (E1, N1, E2, N2)))
+    ends = [(E1, N1), ((E1 + E2) / 2, (N1 + N2) / 2), (E2, N2)]
+    m1, mm, m2 = (point_scale_factor(E, N, grid=grid, zone=zone) for E, N in ends)
+    return (m1 + 4 * mm + m2) / 6
+
+
+@timed("bulk.grid_distance", size=0)
+def grid_distance(E1, N1, E2, N2, grid=MGA20, zone=None, line_scale=True):
+    """
+    distances along arrays of grid lines (E1, N1) -> (E2, N2). With
+    line_scale the plane distance is divided by the line scale factor,
+    giving the ellipsoidal distance at plane-math cost: within a few
+    micrometres for lines up to 5 km, 0.04 mm at 20 km and 6 mm at 100 km.
+    returns
+        s: distances (meters)
+    """
+    L = np.hypot(np.subtract(E2, E1), np.subtract(N2, N1))
+    if not line_scale:
+        return L
+    return L / line_scale_factor(E1, N1, E2, N2, grid=grid, zone=zone)
+
+
+@timed("bulk.declination", size=0)
+def declination(dLat, dLng, z=0, date=None):
+    """
+    magnetic declination (degrees, East >0) over arrays,
+    evaluated directly from the magnetic model.
+    accepts
+        z: heights above the ellipsoid (m)
+        date: a date, or array of dates. Defaults to today.
+    """
+    year = None
+    if date is not None:
+        year = np.vectorize(decimal_year, otypes=[float])(date)
+    return magnetic_model().declination(dLat, dLng, z, year)
+
+
+def read_columns(path, usecols=None, dtype=None):
+    """
+    memory mapped columns of a binary file, read in place by the OS
+    rather than parsed.
+    accepts
+        path: a .npy file of a 2d array (rows, columns) or a structured
+            array, or a raw file of dtype records
+        usecols: column indices, or field names of structured arrays,
+            None for all
+        dtype: record dtype of raw files, e.g.
+            [("lat", "<f8"), ("lng", "<f8"), ("h", "<f4")]
+    returns
+        tuple of column views
+    """
+    if str(path).endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+    else:
+        assert dtype is not None, f"dtype required for raw file {path}"
+        data = np.memmap(path, dtype=dtype, mode="r")
+    if data.dtype.names:
+        names = data.dtype.names
+        usecols = names if usecols is None else usecols
+        return tuple(data[c if isinstance(c, str) else names[c]] for c in usecols)
+    assert data.ndim == 2, f"{path} is neither 2d nor structured"
+    usecols = range(data.shape[1]) if usecols is None else usecols
+    return tuple(data[:, c] for c in usecols)
+
+
+def create_records(path, dtype, rows):
+    """
+    a memory mapped array of rows records to write results into,
+    a .npy file, or a raw file of records for other suffixes
+    """
+    if str(path).endswith(".npy"):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(rows,))
+    return np.memmap(path, dtype=dtype, mode="w+", shape=(rows,))
+
+
+def concatenate(results):
+    """ join chunk results, which are arrays or tuples of arrays """
+    if isinstance(results[0], tuple):
+        return tuple(np.concatenate(r) for r in zip(*results))
+    return np.concatenate(results)
+
+
+class ParallelEngine:
+    def __init__(self, workers=None, chunk_size=100000):
+        """
+        distributes bulk conversions over a ProcessPoolExecutor.
+        accepts
+            workers: number of worker processes, defaults to cpu count.
+                1 runs chunks in this process.
+            chunk_size: points per chunk sent to a worker
+        Use as a context manager to keep the pool alive across calls.
+        """
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.pool = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+    def run(self, func, chunks, **kwargs):
+        """
+        apply func to each chunk of argument arrays, yielding results
+        in order. At most 2 chunks per worker are in flight.
+        """
+        if self.workers == 1:
+            for args in chunks:
+                yield func(*args, **kwargs)
+            return
+
+        if self.pool is None:
+            with self:
+                yield from self.run(func, chunks, **kwargs)
+            return
+
+        pending = deque()
+        for args in chunks:
+            pending.append(self.pool.submit(func, *args, **kwargs))
+            if len(pending) >= 2 * self.workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def map(self, func, *arrays, **kwargs):
+        """
+        apply a bulk function (e.g. to_mga, from_mga, transform, mgrs_encode)
+        across equal length arrays, reassembling results in order.
+        """
+        arrays = np.broadcast_arrays(*(np.asarray(a) for a in arrays))
+        size = arrays[0].shape[0]
+        chunks = (
+            tuple(a[i : i + self.chunk_size] for a in arrays)
+            for i in range(0, size, self.chunk_size)
+        )
+        return concatenate(list(self.run(func, chunks, **kwargs)))
+
+    def map_csv(self, func, src, dst, usecols=(0, 1), delimiter=",", skiprows=0, fmt="%.6f", **kwargs):
+        """
+        stream a delimited text file through func chunk by chunk,
+        writing result columns to dst in input order.
+        """
+
+        def chunks(file):
+            for _ in range(skiprows):
+                next(file)
+            while True:
+                lines = list(islice(file, self.chunk_size))
+                if not lines:
+                    return
+                data = np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2)
+                yield tuple(data.T)
+
+        with open(src) as infile, open(dst, "w") as outfile:
+            for result in self.run(func, chunks(infile), **kwargs):
+                columns = result if isinstance(result, tuple) else (result,)
+                np.savetxt(outfile, np.column_stack(columns), fmt=fmt, delimiter=delimiter)
+
+    def map_npy(self, func, src, dst, usecols=None, dtype=None, names=None, **kwargs):
+        """
+        stream a binary file of columns (see read_columns) through func
+        chunk by chunk, writing the result columns into the fields of a
+        memory mapped structured array at dst (.npy, or raw records).
+        accepts
+            names: field names of the result columns, default f0, f1, ...
+        Fields take the dtypes of the first chunk's results.
+        returns
+            the result records, memory mapped
+        """
+        columns = read_columns(src, usecols=usecols, dtype=dtype)
+        rows = len(columns[0])
+        assert rows, f"no rows in {src}"
+        chunks = (tuple(c[i : i + self.chunk_size] for c in columns) for i in range(0, rows, self.chunk_size))
+
+        out, start = None, 0
+        for result in self.run(func, chunks, **kwargs):
+            result = result if isinstance(result, tuple) else (result,)
+            if out is None:
+                fields = names or [f"f{i}" for i in range(len(result))]
+                out = create_records(dst, [(name, np.asarray(r).dtype) for name, r in zip(fields, result)], rows)
+            stop = start + len(result[0])
+            for name, r in zip(out.dtype.names, result):
+                assert np.can_cast(np.asarray(r).dtype, out.dtype[name]), f"{name} is wider than in the first chunk"
+                out[name][start:stop] = r
+            start = stop
+        out.flush()
+        return out
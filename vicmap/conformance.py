@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+from pyproj import Proj, Transformer
+
+from vicmap.grids import MGA20, MGA94, VICGRID, VICGRID94
+from vicmap.projections import lambert_conformal_conic, utm_array
+
+"""
+Conformance of the native projections with PROJ.
+Samples a dense lat/lng grid over MGA zones 54 - 56 and over Victoria
+for VICGRID & VICGRID94, and compares vicmap's E, N, grid convergence γ
+and point scale factor m with pyproj. See benchmarks/conformance.py for
+the report.
+PROJ's m & γ are numerical derivatives of the projection, good to about
+1e-10, so smaller differences in m & γ are PROJ's rather than vicmap's.
+"""
+
+# (south, north, west, east) of the sampled areas
+VICTORIA = (-39.2, -33.9, 140.9, 150.0)
+# MGA zones 54 - 56 over the latitudes of mainland Australia & Tasmania
+MGA_ZONES = {zone: (-43.7, -9.0, 132 + (zone - 54) * 6, 138 + (zone - 54) * 6) for zone in (54, 55, 56)}
+
+CASES = [(MGA20, zone) for zone in MGA_ZONES] + [(MGA94, 55), (VICGRID, None), (VICGRID94, None)]
+
+
+def sample(bounds, spacing):
+    """ lat/lng of a regular grid over bounds """
+    south, north, west, east = bounds
+    lats, lngs = np.meshgrid(np.arange(south, north, spacing), np.arange(west, east, spacing))
+    return lats.ravel(), lngs.ravel()
+
+
+def native(grid, zone, lats, lngs):
+    """ vicmap's E, N, m, γ: utm_array for MGA, lambert_conformal_conic point by point """
+    ellipsoid = grid.datum.ellipsoid
+    if zone is not None:
+        _, E, N, m, γ = utm_array(lats, lngs, ellipsoid, grid, zone=zone)
+        return E, N, m, γ
+    return np.array([lambert_conformal_conic(lat, lng, ellipsoid, grid) for lat, lng in zip(lats, lngs)]).T
+
+
+def reference(grid, zone, lats, lngs):
+    """
+    PROJ's E, N, m, γ. PROJ measures convergence from grid north to
+    true north, the opposite sense to vicmap.
+    """
+    crs = grid.crs if zone is None else grid.crs(zone)
+    E, N = Transformer.from_crs(grid.datum.crs, crs, always_xy=True).transform(lngs, lats)
+    factors = Proj(crs).get_factors(lngs, lats)
+    return E, N, np.asarray(factors.meridional_scale), -np.asarray(factors.meridian_convergence)
+
+
+def throughput(func, *args):
+    """ result and points per second """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, len(args[-1]) / (time.perf_counter() - start)
+
+
+def compare(grid, zone, spacing=0.05):
+    """
+    differences of the native projection from PROJ
+    returns
+        dict of points, max & rms differences of E, N (m), m (ppm),
+        γ (arc seconds), and pts/s of each implementation
+    """
+    bounds = VICTORIA if zone is None else MGA_ZONES[zone]
+    lats, lngs = sample(bounds, spacing)
+    ours, native_rate = throughput(native, grid, zone, lats, lngs)
+    proj, proj_rate = throughput(reference, grid, zone, lats, lngs)
+
+    scales = {"E": 1, "N": 1, "m": 1e6, "γ": 3600}
+    report = {"points": len(lats), "native pts/s": native_rate, "proj pts/s": proj_rate}
+    for (name, scale), a, b in zip(scales.items(), ours, proj):
+        d = (np.asarray(a) - np.asarray(b)) * scale
+        report[f"{name} max"] = np.max(np.abs(d))
+        report[f"{name} rms"] = np.sqrt(np.mean(d ** 2))
+    return report
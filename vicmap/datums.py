@@ -21,6 +21,10 @@ class Datum:
         self.code = code
         self.name = name
 
+    def __reduce__(self):
+        """ pickle by code, so other processes use their module level datums """
+        return (get_datum, (self.code,))
+
 
 # supported datums
 WGS84 = Datum(
@@ -56,3 +60,7 @@ AGD66 = Datum(
 )
 
 __all_datums__ = [GDA94, GDA20, WGS84, AGD84, AGD66]
+
+
+def get_datum(code):
+    return next(d for d in __all_datums__ if d.code == code)
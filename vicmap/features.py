@@ -0,0 +1,251 @@
+import json
+import re
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from vicmap.bulk import get_crs, transform
+from vicmap.datums import WGS84, Datum
+
+"""
+Streaming reprojection of GeoJSON FeatureCollections.
+The file is parsed feature by feature, never as a whole document, and
+the positions of groups of features are reprojected together with
+bulk.transform before the features are written out, so memory is
+bounded by the largest feature (or batch_size positions) however large
+the collection.
+    reproject("parcels.geojson", "parcels_mga.geojson", GDA20, MGA20, destination_zone=55)
+Positions are (x, y[, z]) in GeoJSON axis order, i.e. (dLng, dLat) for
+datums and (E, N) for grids. Heights are passed through unchanged.
+"""
+
+WHITESPACE = re.compile(r"\s*")
+XY = itemgetter(0, 1)
+decoder = json.JSONDecoder()
+
+# nesting of positions in the coordinates of each geometry type
+DEPTHS = {
+    "Point": 0,
+    "MultiPoint": 1,
+    "LineString": 1,
+    "MultiLineString": 2,
+    "Polygon": 2,
+    "MultiPolygon": 3,
+}
+
+
+class TextBuffer:
+    def __init__(self, file, block_size=1 << 20):
+        """
+        a window over a text file, from which JSON values are decoded
+        one at a time. Holds the value being decoded and one block.
+        """
+        self.file = file
+        self.block_size = block_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """
+        drop the decoded text and read at least as much again as is
+        left, so a value spanning many blocks is decoded in linear time
+        """
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        block = self.file.read(max(self.block_size, len(self.text)))
+        self.eof = not block
+        self.text += block
+
+    def peek(self, expected):
+        """ the next non whitespace character, which must be one of expected """
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                break
+            assert not self.eof, "unexpected end of GeoJSON"
+            self.more()
+        char = self.text[self.pos]
+        assert char in expected, f"expected one of {expected!r}, found {char!r}"
+        return char
+
+    def expect(self, expected):
+        """ consume the next non whitespace character """
+        char = self.peek(expected)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """ the next JSON value """
+        self.peek('{["-0123456789tfn')
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+                # a number may continue in the next block
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def read_features(path, members=None, block_size=1 << 20):
+    """
+    features of a GeoJSON FeatureCollection, one at a time.
+    accepts
+        members: dict filled with the collection's other top level
+            members (e.g. "crs", "name") as they are read
+        block_size: characters read at a time
+    """
+    with open(path, encoding="utf-8") as file:
+        text = TextBuffer(file, block_size)
+        text.expect("{")
+        if text.peek('"}') == "}":
+            return
+        while True:
+            key = text.decode()
+            text.expect(":")
+            if key == "features":
+                text.expect("[")
+                if text.peek("{]") == "{":
+                    while True:
+                        yield text.decode()
+                        if text.expect(",]") == "]":
+                            break
+                else:
+                    text.expect("]")
+            else:
+                value = text.decode()
+                if key == "type":
+                    assert value == "FeatureCollection", f"not a FeatureCollection: {value}"
+                if members is not None:
+                    members[key] = value
+            if text.expect(",}") == "}":
+                return
+
+
+def write_features(path, features, members=None):
+    """
+    write features as a GeoJSON FeatureCollection, one at a time.
+    members are written after the features, so they may be filled in
+    while the features are generated, e.g. by read_features.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('{"type": "FeatureCollection", "features": [')
+        for i, feature in enumerate(features):
+            file.write(",\n" if i else "\n")
+            file.write(json.dumps(feature))
+        file.write("\n]")
+        for key, value in (members or {}).items():
+            if key not in ("type", "features"):
+                file.write(f", {json.dumps(key)}: {json.dumps(value)}")
+        file.write("}\n")
+
+
+def positions(geometry, out):
+    """ append the positions (lists) of a geometry of any type, or null, to out """
+    if geometry is None:
+        return out
+    geometry.pop("bbox", None)
+    if geometry["type"] == "GeometryCollection":
+        for g in geometry["geometries"]:
+            positions(g, out)
+        return out
+    depth = DEPTHS[geometry["type"]]
+    coordinates = geometry["coordinates"]
+    if depth == 0:
+        out.append(coordinates)
+    elif depth == 1:
+        out.extend(coordinates)
+    elif depth == 2:
+        for part in coordinates:
+            out.extend(part)
+    else:
+        for polygon in coordinates:
+            for ring in polygon:
+                out.extend(ring)
+    return out
+
+
+def reproject_positions(points, source, destination, source_zone=None, destination_zone=None, precision=None):
+    """
+    reproject a list of positions in place, in one bulk.transform.
+    precision: decimal places of the reprojected coordinates, None for all
+    """
+    if not points:
+        return
+    xy = np.fromiter(chain.from_iterable(map(XY, points)), dtype=float, count=2 * len(points))
+    x, y = xy[0::2], xy[1::2]
+    if isinstance(source, Datum):
+        x, y = y, x
+    x, y = transform(x, y, source, destination, source_zone=source_zone, destination_zone=destination_zone)
+    if isinstance(destination, Datum):
+        x, y = y, x
+    if precision is not None:
+        x, y = np.round(x, precision), np.round(y, precision)
+    for p, x_, y_ in zip(points, x.tolist(), y.tolist()):
+        p[0] = x_
+        p[1] = y_
+
+
+def reproject_features(
+    features, source, destination, source_zone=None, destination_zone=None, batch_size=65536, precision=None
+):
+    """
+    reproject the geometries of features, yielding each feature once the
+    batch it falls in is reprojected. Batches close at batch_size
+    positions. Stale bounding boxes are dropped.
+    """
+    kwargs = dict(source_zone=source_zone, destination_zone=destination_zone, precision=precision)
+    batch, points = [], []
+    for feature in features:
+        feature.pop("bbox", None)
+        positions(feature.get("geometry"), points)
+        batch.append(feature)
+        if len(points) >= batch_size:
+            reproject_positions(points, source, destination, **kwargs)
+            yield from batch
+            batch, points = [], []
+    reproject_positions(points, source, destination, **kwargs)
+    yield from batch
+
+
+def reproject(
+    source_path,
+    destination_path,
+    source,
+    destination,
+    source_zone=None,
+    destination_zone=None,
+    batch_size=65536,
+    precision=None,
+    block_size=1 << 20,
+):
+    """
+    reproject a GeoJSON FeatureCollection file between datums & grids,
+    streaming it feature by feature.
+    accepts
+        source, destination: Datum or Grid
+        source_zone, destination_zone: zones for MGA grids
+        batch_size: positions reprojected together
+        precision: decimal places of the written coordinates, None for all
+    The collection's "bbox" is dropped and its "crs" names the destination,
+    or is dropped for WGS84.
+    """
+    members = {}
+
+    def collection():
+        features = read_features(source_path, members, block_size=block_size)
+        yield from reproject_features(
+            features, source, destination, source_zone, destination_zone, batch_size, precision
+        )
+        members.pop("bbox", None)
+        members.pop("crs", None)
+        if destination is not WGS84:
+            epsg = get_crs(destination, destination_zone).to_epsg()
+            members["crs"] = {"type": "name", "properties": {"name": f"EPSG:{epsg}"}}
+
+    write_features(destination_path, collection(), members)
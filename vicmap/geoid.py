@@ -0,0 +1,158 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+"""
+Geoid separation grids (e.g. AUSGeoid2020) relating ellipsoidal
+heights h to AHD heights H:
+    H = h - N
+See: docs/Brown2018_Article_AUSGeoid2020CombinedGravimetri.pdf
+Grids distributed as text or NTv2 binary are converted once to a .npy
+raster (plus a .json sidecar of its extent), which is memory mapped on
+load. Processes sharing a grid share its pages through the OS page cache,
+and grids are pickled by path so workers map the file rather than
+receiving a copy.
+"""
+
+
+class GeoidGrid:
+    def __init__(self, values, s_lat, w_lng, lat_inc, lng_inc, path=None):
+        """
+        regular lat/lng raster of geoid separation.
+        accepts
+            values: N (m) at each node, shape (rows, cols),
+                rows south to north, columns west to east
+            s_lat, w_lng: latitude & longitude of the south west node (degrees)
+            lat_inc, lng_inc: node spacing (degrees)
+            path: the .npy file values are mapped from, if any
+        """
+        self.values = values
+        self.s_lat, self.w_lng = s_lat, w_lng
+        self.lat_inc, self.lng_inc = lat_inc, lng_inc
+        self.rows, self.cols = values.shape
+        self.path = path
+
+    def __reduce__(self):
+        """ workers re-map a saved grid rather than unpickling a copy """
+        if self.path is not None:
+            return (GeoidGrid.load, (self.path,))
+        return (GeoidGrid, (np.asarray(self.values), self.s_lat, self.w_lng, self.lat_inc, self.lng_inc))
+
+    @classmethod
+    def from_text(cls, path, usecols=(0, 1, 2), skiprows=0, delimiter=None):
+        """
+        read a regular grid from delimited text rows of (dLat, dLng, N),
+        in any order.
+        """
+        φ, λ, N = np.loadtxt(path, usecols=usecols, skiprows=skiprows, delimiter=delimiter, unpack=True)
+        lats, lngs = np.unique(φ), np.unique(λ)
+        assert len(lats) * len(lngs) == len(N), "text geoid is not a complete regular grid"
+
+        values = np.empty((len(lats), len(lngs)), dtype=np.float32)
+        values[np.searchsorted(lats, φ), np.searchsorted(lngs, λ)] = N
+        return cls(values, lats[0], lngs[0], np.diff(lats).mean(), np.diff(lngs).mean())
+
+    @classmethod
+    def from_gsb(cls, path):
+        """
+        read a geoid distributed in NTv2 (.gsb) form. N is the first
+        (latitude shift) field of the single top level sub-grid.
+        """
+        from vicmap.ntv2 import NTv2Grid
+
+        top = [s for s in NTv2Grid(path).subgrids if s.parent is None]
+        assert len(top) == 1, "geoid files have a single top level grid"
+        sub = top[0]
+        # NTv2 columns run east to west with longitudes positive west
+        values = np.array(sub.shifts[:, ::-1, 0], dtype=np.float32)
+        return cls(values, sub.s_lat / 3600, -sub.w_lng / 3600, sub.lat_inc / 3600, sub.lng_inc / 3600)
+
+    def save(self, path):
+        """ write values to path (.npy) and the extent to a .json sidecar """
+        path = Path(path).with_suffix(".npy")
+        np.save(path, np.asarray(self.values, dtype=np.float32))
+        extent = {
+            "s_lat": self.s_lat,
+            "w_lng": self.w_lng,
+            "lat_inc": self.lat_inc,
+            "lng_inc": self.lng_inc,
+        }
+        path.with_suffix(".json").write_text(json.dumps({k: float(v) for k, v in extent.items()}))
+
+    @classmethod
+    def load(cls, path):
+        """ memory map a grid written by save """
+        path = Path(path).with_suffix(".npy")
+        extent = json.loads(path.with_suffix(".json").read_text())
+        return cls(np.load(path, mmap_mode="r"), path=path, **extent)
+
+    @property
+    def bounds(self):
+        return (
+            self.s_lat,
+            self.s_lat + (self.rows - 1) * self.lat_inc,
+            self.w_lng,
+            self.w_lng + (self.cols - 1) * self.lng_inc,
+        )
+
+    def contains(self, dLat, dLng):
+        south, north, west, east = self.bounds
+        return (south <= dLat) & (dLat <= north) & (west <= dLng) & (dLng <= east)
+
+    def separation(self, dLat, dLng):
+        """
+        bilinear interpolation of geoid separation N (m) for scalars
+        or arrays of decimal latitude and longitude.
+        """
+        φ = np.asarray(dLat, dtype=float)
+        λ = np.asarray(dLng, dtype=float)
+        assert np.all(self.contains(φ, λ)), "position outside of geoid grid"
+
+        y = (φ - self.s_lat) / self.lat_inc
+        x = (λ - self.w_lng) / self.lng_inc
+        i = np.clip(y.astype(int), 0, self.rows - 2)
+        j = np.clip(x.astype(int), 0, self.cols - 2)
+        u, v = y - i, x - j
+
+        n = self.values
+        N = (
+            (1 - u) * (1 - v) * n[i, j]
+            + (1 - u) * v * n[i, j + 1]
+            + u * (1 - v) * n[i + 1, j]
+            + u * v * n[i + 1, j + 1]
+        )
+        return N if N.ndim else float(N)
+
+    def to_ahd(self, dLat, dLng, h):
+        """ AHD height H = h - N from ellipsoidal height h """
+        return np.subtract(h, self.separation(dLat, dLng))
+
+    def to_ellipsoidal(self, dLat, dLng, H):
+        """ ellipsoidal height h = H + N from AHD height H """
+        return np.add(H, self.separation(dLat, dLng))
+
+
+geoid_grid = None
+
+
+def use_geoid(grid):
+    """
+    relate ellipsoidal & AHD heights of points with a GeoidGrid
+    (or path to a saved grid). Pass None to stop.
+    """
+    global geoid_grid
+    if grid is not None and not isinstance(grid, GeoidGrid):
+        grid = GeoidGrid.load(grid)
+    geoid_grid = grid
+
+
+def geoid_covers(dLat, dLng):
+    """ whether a geoid is in use and covers the position """
+    return geoid_grid is not None and bool(np.all(geoid_grid.contains(dLat, dLng)))
+
+
+def geoid_separation(dLat, dLng):
+    """ N (m) from the geoid in use """
+    assert geoid_grid is not None, "no geoid in use, see use_geoid"
+    return geoid_grid.separation(dLat, dLng)
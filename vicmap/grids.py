@@ -3,10 +3,17 @@ import math
 from pyproj import CRS
 
 from vicmap.datums import AGD66, GDA20, GDA94
+from vicmap.instrumentation import count, timed
+from vicmap.utils import lcc_cone_constants
+
+
+crs_from_epsg = timed("crs.lookup")(CRS.from_epsg)
 
 
 class Grid:
-    pass
+    def __reduce__(self):
+        """ pickle by code, so other processes use their module level grids """
+        return (get_grid, (self.code,))
 
 
 class MGAGrid(Grid):
@@ -34,6 +41,7 @@ class MGAGrid(Grid):
         self.m0 = 0.9996
         self.zw = 6
         self.cm1 = -177
+        self._crs = {}
 
     def epsg_code(self, zone):
         """
@@ -44,7 +52,12 @@ class MGAGrid(Grid):
         return int(f"{self.base_code}{zone}")
 
     def crs(self, zone):
-        return CRS.from_epsg(self.epsg_code(zone))
+        """ crs of a zone, constructed once per zone """
+        if zone not in self._crs:
+            self._crs[zone] = crs_from_epsg(self.epsg_code(zone))
+        else:
+            count("crs.hit")
+        return self._crs[zone]
 
     @property
     def cms(self):
@@ -75,6 +88,7 @@ class MGAGrid(Grid):
 
 
 class MGAGrid20(MGAGrid):
+    base_code = 78  # epsg: GDA2020 / MGA zone z is 78{z}
     datum = GDA20
     name = "Map Grid of Australia (2020)"
     code = "MGA20"
@@ -255,10 +269,27 @@ class VICGRID(Grid):
         self.λ0 = 145
         self.φ0 = -37
         self.r0 = 8472630.5
+        self._cones = {}
+        self._crs = None
 
     @property
     def crs(self):
-        return CRS.from_epsg(self.epsg_code)
+        if self._crs is None:
+            self._crs = crs_from_epsg(self.epsg_code)
+        else:
+            count("crs.hit")
+        return self._crs
+
+    def cone(self, ellipsoid):
+        """
+        lambert cone constants (n, F, r0) of this grid on ellipsoid,
+        computed once per ellipsoid.
+        """
+        if ellipsoid.code not in self._cones:
+            a, _, _, e, _, _ = ellipsoid.constants
+            φ1, φ2, _, φ0 = (math.radians(x) for x in self.constants[:4])
+            self._cones[ellipsoid.code] = lcc_cone_constants(φ1, φ2, φ0, a, e)
+        return self._cones[ellipsoid.code]
 
     @property
     def constants(self):
@@ -292,6 +323,8 @@ class VICGRID94(VICGRID):
         self.λ0 = 145
         self.φ0 = -37
         self.r0 = 8472630.5
+        self._cones = {}
+        self._crs = None
 
 
 
@@ -303,3 +336,7 @@ VICGRID94 = VICGRID94()
 MGRS = MGRSGrid()
 
 __all_grids__ = [MGA94, MGA20, VICGRID, VICGRID94, MGRS]
+
+
+def get_grid(code):
+    return next(g for g in __all_grids__ if g.code == code)
@@ -0,0 +1,107 @@
+import numpy as np
+
+"""
+Helmert transformations between geocentric datums.
+See: GDA2020 Technical Manual (docs/), section 3.
+GDA94 and GDA2020 share the GRS80 ellipsoid and differ only by a small
+translation, rotation and scale, so the datum change is a single affine
+map of geocentric (X, Y, Z) coordinates, applied here to whole arrays
+without going through PROJ.
+"""
+
+# arc seconds to radians
+SEC = np.pi / (180 * 3600)
+
+
+class Helmert:
+    def __init__(self, tx, ty, tz, sc, rx, ry, rz, rates=None, epoch=None):
+        """
+        conformal 7 parameter helmert transformation,
+        with the coordinate frame rotation convention of the technical manual:
+            X' = T + (1 + sc) R X
+        accepts
+            tx, ty, tz: translations (m)
+            sc: scale (ppm)
+            rx, ry, rz: rotations (arc seconds)
+            rates: rates of change of (tx, ty, tz, sc, rx, ry, rz) per year,
+                for a 14 parameter (time dependent) transformation
+            epoch: reference epoch of the parameters (decimal year)
+        """
+        assert (rates is None) == (epoch is None), "rates require a reference epoch"
+        self.params = np.array([tx, ty, tz, sc, rx, ry, rz], dtype=float)
+        self.rates = None if rates is None else np.array(rates, dtype=float)
+        self.epoch = epoch
+
+    def at(self, epoch=None):
+        """
+        parameters at an epoch (decimal year)
+        returns
+            T: translation vector (m)
+            s: scale (unitless)
+            R: rotation matrix
+        """
+        params = self.params
+        if self.rates is not None:
+            assert epoch is not None, "epoch required for a time dependent transformation"
+            params = params + self.rates * (epoch - self.epoch)
+
+        tx, ty, tz, sc, rx, ry, rz = params
+        rx, ry, rz = rx * SEC, ry * SEC, rz * SEC
+        R = np.array([[1, rz, -ry], [-rz, 1, rx], [ry, -rx, 1]])
+        return np.array([tx, ty, tz]), sc * 1e-6, R
+
+    def transform(self, X, Y, Z, epoch=None, inverse=False):
+        """
+        transform geocentric coordinates (scalars or arrays).
+        The inverse is exact, rather than the sign reversed parameters.
+        returns
+            X, Y, Z (m)
+        """
+        T, s, R = self.at(epoch)
+        X, Y, Z = np.broadcast_arrays(*(np.asarray(c, dtype=float) for c in (X, Y, Z)))
+        xyz = np.stack([X.ravel(), Y.ravel(), Z.ravel()])
+        if inverse:
+            out = np.linalg.solve(R, xyz - T[:, None]) / (1 + s)
+        else:
+            out = T[:, None] + (1 + s) * (R @ xyz)
+        return tuple(c.reshape(X.shape) for c in out)
+
+
+# GDA2020 Technical Manual, table 3.1
+GDA94_TO_GDA20 = Helmert(
+    tx=0.06155, ty=-0.01087, tz=-0.04019,
+    sc=-0.009994,
+    rx=-0.0394924, ry=-0.0327221, rz=-0.0328979,
+)
+
+# GDA2020 Technical Manual, table 3.3: a plate motion model,
+# parameters are zero at the reference epoch 2020.0
+ITRF2014_TO_GDA20 = Helmert(
+    tx=0, ty=0, tz=0, sc=0, rx=0, ry=0, rz=0,
+    rates=(0, 0, 0, 0, 0.00150379, 0.00118346, 0.00120716),
+    epoch=2020.0,
+)
+
+# (source, destination) datum codes: (transformation, inverse)
+transformations = {
+    ("GDA94", "GDA20"): (GDA94_TO_GDA20, False),
+    ("GDA20", "GDA94"): (GDA94_TO_GDA20, True),
+}
+
+
+def helmert_supported(source, destination):
+    """ whether a datum pair has a built in helmert transformation """
+    return (source.code, destination.code) in transformations
+
+
+def datum_shift(dLat, dLng, source, destination, h=0):
+    """
+    geodetic coordinates (scalars or arrays) in source to destination datum.
+    returns
+        dLat, dLng (decimal degrees), h (m)
+    """
+    assert helmert_supported(source, destination), f"no transformation: {source.code} -> {destination.code}"
+    helmert, inverse = transformations[(source.code, destination.code)]
+    X, Y, Z = source.ellipsoid.to_geocentric(dLat, dLng, h)
+    X, Y, Z = helmert.transform(X, Y, Z, inverse=inverse)
+    return destination.ellipsoid.from_geocentric(X, Y, Z)
@@ -0,0 +1,228 @@
+import json
+import math
+import threading
+from collections import deque
+from functools import wraps
+from time import perf_counter
+
+import numpy as np
+
+"""
+Opt-in counters & timers for the hot paths: transformer constructions,
+CRS lookups, transform_to, projections, Vincenty iterations, declination
+and NSW map index loads.
+    vicmap.enable_stats()
+    ...
+    vicmap.stats()        # {"utm": {"count": 1200, "time": 0.031}, ...}
+    vicmap.reset_stats()
+Tracers are callbacks receiving (operation, batch size, seconds) for each
+call of the public entry points, e.g. a LatencyHistograms collector.
+    histograms = LatencyHistograms()
+    vicmap.add_tracer(histograms)
+    ...
+    histograms.dump("latency.json")
+Both are off by default, when an instrumented call costs one check of a
+module global.
+"""
+
+# collecting stats
+enabled = False
+# callbacks (operation, size, seconds)
+tracers = []
+# either of the above
+active = False
+
+# name: [count, seconds]
+counters = {}
+lock = threading.Lock()
+
+
+def enable_stats(on=True):
+    """ start (or with on=False, stop) collecting stats """
+    global enabled, active
+    enabled = on
+    active = enabled or bool(tracers)
+
+
+def add_tracer(tracer):
+    """ call tracer(operation, size, seconds) after each instrumented call """
+    global active
+    tracers.append(tracer)
+    active = True
+
+
+def remove_tracer(tracer):
+    global active
+    tracers.remove(tracer)
+    active = enabled or bool(tracers)
+
+
+def reset_stats():
+    with lock:
+        counters.clear()
+
+
+def stats():
+    """
+    snapshot of the stats collected since the last reset.
+    returns
+        {name: {"count": calls or events, "time": total seconds}}
+        time is 0 for events that are only counted, e.g. cache hits
+    """
+    with lock:
+        return {name: {"count": c, "time": t} for name, (c, t) in sorted(counters.items())}
+
+
+def record(name, seconds=0.0, n=1):
+    with lock:
+        entry = counters.setdefault(name, [0, 0.0])
+        entry[0] += n
+        entry[1] += seconds
+
+
+def count(name, n=1):
+    """ count n events, e.g. cache hits or iterations """
+    if enabled:
+        record(name, n=n)
+
+
+def timed(name, size=None):
+    """
+    decorator counting & timing every call of a function as name.
+    accepts
+        size: index of the positional argument whose length is the batch
+            size reported to tracers, None for single point operations
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not active:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            seconds = perf_counter() - start
+            if enabled:
+                record(name, seconds)
+            if tracers:
+                n = 1 if size is None or size >= len(args) else np.size(args[size])
+                for tracer in tracers:
+                    tracer(name, n, seconds)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class LatencyHistogram:
+    def __init__(self, significant_figures=2):
+        """
+        HDR style histogram of latencies: buckets are linear within each
+        power of two, so every recorded value keeps its significant figures
+        from nanoseconds to hours in a few hundred buckets.
+        accepts
+            significant_figures: precision of recorded values
+        computes
+            buckets: {lower bound (ns): count}
+        """
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.buckets = {}
+        self.count = 0
+        self.items = 0
+        self.total = 0
+
+    def lower(self, ns):
+        """ lower bounds (ns) of the buckets of an array of values (ns) """
+        # frexp's exponent is the bit length of integers
+        shift = np.maximum(np.frexp(ns)[1] - self.sub_bits, 0)
+        return (ns >> shift) << shift
+
+    def width(self, lower):
+        return 1 << max(lower.bit_length() - self.sub_bits, 0)
+
+    def record(self, seconds, items=1):
+        """ record a latency, or an array of latencies (seconds) """
+        ns = np.maximum(np.asarray(seconds, dtype=float) * 1e9, 1).astype(np.int64).ravel()
+        for lower, n in zip(*np.unique(self.lower(ns), return_counts=True)):
+            self.buckets[int(lower)] = self.buckets.get(int(lower), 0) + int(n)
+        self.count += len(ns)
+        self.items += int(np.sum(np.broadcast_to(items, ns.shape)))
+        self.total += int(np.sum(ns))
+
+    def percentile(self, q):
+        """ value (ns) at or below which q percent of recorded values lie """
+        target, seen = q / 100 * self.count, 0
+        for lower in sorted(self.buckets):
+            seen += self.buckets[lower]
+            if seen >= target:
+                # the middle of the bucket
+                return lower + self.width(lower) // 2
+        return None
+
+    def to_dict(self):
+        bounds = sorted(self.buckets)
+        return {
+            "count": self.count,
+            "items": self.items,
+            "min_ns": bounds[0] if bounds else None,
+            "max_ns": bounds[-1] + self.width(bounds[-1]) - 1 if bounds else None,
+            "mean_ns": self.total / self.count if self.count else None,
+            "percentiles_ns": {str(q): self.percentile(q) for q in (50, 90, 99, 99.9)},
+            "buckets": [[lower, self.buckets[lower]] for lower in bounds],
+        }
+
+
+class LatencyHistograms:
+    def __init__(self, significant_figures=2, flush_every=4096):
+        """
+        a tracer collecting a LatencyHistogram per operation.
+        Calls are queued and binned in vectorised batches of flush_every,
+        keeping the cost per traced call to an append.
+        """
+        self.significant_figures = significant_figures
+        self.flush_every = flush_every
+        self.histograms = {}
+        # operation: (sizes, seconds) of queued calls. deque appends & pops
+        # are atomic, so threads need no lock to queue
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, operation, size, seconds):
+        queues = self.pending.get(operation)
+        if queues is None:
+            queues = self.pending.setdefault(operation, (deque(), deque()))
+        # sizes first, so every queued latency has its size
+        queues[0].append(size)
+        queues[1].append(seconds)
+        if len(queues[1]) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """ bin the queued calls """
+        with self.lock:
+            for operation, (sizes, seconds) in list(self.pending.items()):
+                n = len(seconds)
+                if n == 0:
+                    continue
+                if operation not in self.histograms:
+                    self.histograms[operation] = LatencyHistogram(self.significant_figures)
+                self.histograms[operation].record(
+                    np.array([seconds.popleft() for _ in range(n)], dtype=float),
+                    np.array([sizes.popleft() for _ in range(n)], dtype=np.int64),
+                )
+
+    def to_dict(self):
+        self.flush()
+        with self.lock:
+            return {name: h.to_dict() for name, h in sorted(self.histograms.items())}
+
+    def dump(self, path):
+        """ write the histograms to path as JSON """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    def reset(self):
+        self.flush()
+        with self.lock:
+            self.histograms.clear()
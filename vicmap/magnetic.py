@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+from datetime import date as datetime
+
+import numpy as np
+
+from vicmap.instrumentation import timed
+from vicmap.wmm import WorldMagneticModel, decimal_year
+
+"""
+Magnetic declination lookups.
+Declination varies slowly with position and time, so repeated lookups
+at (nearly) the same place on the same day are served from a bounded
+LRU cache rather than re-evaluating the magnetic model. For bulk work
+a precomputed DeclinationGrid can be interpolated instead.
+"""
+
+# lat/lng bounds covering MGA zones 54 - 56 over VIC/NSW
+MGA_BOUNDS = (-42, -22, 138, 156)
+
+wmm = None
+
+
+def magnetic_model():
+    """ the World Magnetic Model, loaded once on first use """
+    global wmm
+    if wmm is None:
+        wmm = WorldMagneticModel()
+    return wmm
+
+
+def model_declination(dLat, dLng, z, date):
+    """
+    exact declination (degrees, East >0) for scalars or arrays
+    accepts
+        z: height above the ellipsoid (m)
+    """
+    return magnetic_model().declination(dLat, dLng, z, decimal_year(date))
+
+
+class DeclinationCache:
+    def __init__(self, precision=4, z_precision=0, maxsize=4096):
+        """
+        bounded LRU cache in front of the magnetic model.
+        accepts
+            precision: decimal places lat/lng are rounded to for the key
+                (4 d.p. ~ 11m, well below the spatial variation of declination)
+            z_precision: decimal places height is rounded to for the key
+            maxsize: maximum number of cached entries before eviction
+        """
+        self.precision = precision
+        self.z_precision = z_precision
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, dLat, dLng, z, date):
+        return (
+            round(dLat, self.precision),
+            round(dLng, self.precision),
+            round(z, self.z_precision),
+            date,
+        )
+
+    def declination(self, dLat, dLng, z=0, date=None):
+        """
+        gives the magnetic declination (degrees, East >0) at a position
+        accepts
+            dLat, dLng: decimal latitude and longitude
+            z: height above the ellipsoid (m)
+            date: date of evaluation, defaults to today
+        """
+        date = date or datetime.today()
+        key = self.key(dLat, dLng, z, date)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        value = model_declination(key[0], key[1], key[2], date)
+
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def configure(self, precision=None, z_precision=None, maxsize=None):
+        """
+        change the key precision or eviction size.
+        Changing the precision invalidates all cached entries.
+        """
+        with self._lock:
+            if precision is not None and precision != self.precision:
+                self.precision = precision
+                self._entries.clear()
+            if z_precision is not None and z_precision != self.z_precision:
+                self.z_precision = z_precision
+                self._entries.clear()
+            if maxsize is not None:
+                assert maxsize > 0, f"invalid cache size: {maxsize}"
+                self.maxsize = maxsize
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def info(self):
+        """ hits, misses, current size and maximum size of the cache """
+        return (self.hits, self.misses, len(self._entries), self.maxsize)
+
+
+class DeclinationGrid:
+    def __init__(self, lats, lngs, values, date, z=0):
+        """
+        regular lat/lng raster of declination for a single epoch.
+        accepts
+            lats: increasing grid latitudes (degrees)
+            lngs: increasing grid longitudes (degrees)
+            values: declination (degrees) at each node, shape (len(lats), len(lngs))
+            date: epoch the raster was evaluated at
+            z: height (m) the raster was evaluated at
+        """
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.date = date
+        self.z = z
+        assert self.values.shape == (len(self.lats), len(self.lngs)), "grid shape mismatch"
+
+    @classmethod
+    def build(cls, date=None, resolution=0.25, bounds=MGA_BOUNDS, z=0):
+        """
+        evaluate the magnetic model at every node of a regular raster.
+        accepts
+            date: epoch of the raster, defaults to today
+            resolution: node spacing (degrees)
+            bounds: (south, north, west, east) in degrees
+        """
+        date = date or datetime.today()
+        south, north, west, east = bounds
+        lats = np.linspace(south, north, int(round((north - south) / resolution)) + 1)
+        lngs = np.linspace(west, east, int(round((east - west) / resolution)) + 1)
+        φ, λ = np.meshgrid(lats, lngs, indexing="ij")
+        return cls(lats, lngs, model_declination(φ, λ, z, date), date, z)
+
+    def save(self, path):
+        np.savez(
+            path,
+            lats=self.lats,
+            lngs=self.lngs,
+            values=self.values,
+            date=self.date.toordinal(),
+            z=self.z,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            date = datetime.fromordinal(int(data["date"]))
+            return cls(data["lats"], data["lngs"], data["values"], date, float(data["z"]))
+
+    @property
+    def bounds(self):
+        return (self.lats[0], self.lats[-1], self.lngs[0], self.lngs[-1])
+
+    def contains(self, dLat, dLng):
+        south, north, west, east = self.bounds
+        return (south <= dLat) & (dLat <= north) & (west <= dLng) & (dLng <= east)
+
+    def interpolate(self, dLat, dLng):
+        """
+        bilinear interpolation of declination for scalars or arrays
+        of decimal latitude and longitude.
+        """
+        φ = np.asarray(dLat, dtype=float)
+        λ = np.asarray(dLng, dtype=float)
+        assert np.all(self.contains(φ, λ)), "position outside of declination grid"
+
+        i = np.clip(np.searchsorted(self.lats, φ, side="right") - 1, 0, len(self.lats) - 2)
+        j = np.clip(np.searchsorted(self.lngs, λ, side="right") - 1, 0, len(self.lngs) - 2)
+
+        u = (φ - self.lats[i]) / (self.lats[i + 1] - self.lats[i])
+        v = (λ - self.lngs[j]) / (self.lngs[j + 1] - self.lngs[j])
+
+        d = (
+            (1 - u) * (1 - v) * self.values[i, j]
+            + (1 - u) * v * self.values[i, j + 1]
+            + u * (1 - v) * self.values[i + 1, j]
+            + u * v * self.values[i + 1, j + 1]
+        )
+        return d if d.ndim else float(d)
+
+    def max_error(self):
+        """
+        maximum absolute interpolation error (degrees) against the exact
+        model, sampled at cell centres where bilinear error peaks.
+        """
+        φc = (self.lats[:-1] + self.lats[1:]) / 2
+        λc = (self.lngs[:-1] + self.lngs[1:]) / 2
+        φ, λ = np.meshgrid(φc, λc, indexing="ij")
+        approx = self.interpolate(φ, λ)
+        exact = model_declination(φ, λ, self.z, self.date)
+        return float(np.max(np.abs(approx - exact)))
+
+
+declination_cache = DeclinationCache()
+declination_grid = None
+
+
+@timed("declination")
+def declination(dLat, dLng, z=0, date=None):
+    """
+    magnetic declination (degrees, East >0). Interpolated from the
+    active declination grid when one is in use and covers the position,
+    otherwise a cached evaluation of the magnetic model.
+    """
+    if declination_grid is not None and declination_grid.contains(dLat, dLng):
+        return declination_grid.interpolate(dLat, dLng)
+    return declination_cache.declination(dLat, dLng, z, date)
+
+
+def use_declination_grid(grid):
+    """
+    serve declination from a DeclinationGrid (or path to a saved grid).
+    Pass None to return to the exact model. Note the grid's epoch is
+    used in place of the requested date.
+    """
+    global declination_grid
+    if grid is not None and not isinstance(grid, DeclinationGrid):
+        grid = DeclinationGrid.load(grid)
+    declination_grid = grid
+
+
+def configure_declination_cache(precision=None, z_precision=None, maxsize=None):
+    declination_cache.configure(
+        precision=precision, z_precision=z_precision, maxsize=maxsize
+    )
@@ -0,0 +1,230 @@
+import numpy as np
+
+"""
+NTv2 grid shift files (.gsb), e.g. the ICSM A66 / A84 national
+transformation grids from AGD66 / AGD84 to GDA94.
+See: https://www.icsm.gov.au/datum/gda-transformation-products-and-tools
+The file is memory mapped, so only the nodes around the points being
+shifted are paged in. Each sub-grid is a regular raster of latitude &
+longitude shifts (arc seconds), with nested denser sub-grids. A point
+is shifted with the densest sub-grid containing it.
+Note NTv2 longitudes and longitude shifts are positive west.
+"""
+
+# every header record is an 8 byte name and an 8 byte value
+RECORD = 16
+
+
+class SubGrid:
+    def __init__(self, name, parent, s_lat, n_lat, e_lng, w_lng, lat_inc, lng_inc, shifts):
+        """
+        a single raster of shifts.
+        accepts
+            name, parent: sub-grid names, parent is None for top level grids
+            s_lat, n_lat: southern & northern limits (arc seconds)
+            e_lng, w_lng: eastern & western limits (arc seconds, positive west)
+            lat_inc, lng_inc: node spacing (arc seconds)
+            shifts: (rows, cols, 4) array of latitude shift, longitude shift,
+                latitude accuracy, longitude accuracy. Rows run south to north,
+                columns east to west.
+        """
+        self.name = name
+        self.parent = parent
+        self.s_lat, self.n_lat = s_lat, n_lat
+        self.e_lng, self.w_lng = e_lng, w_lng
+        self.lat_inc, self.lng_inc = lat_inc, lng_inc
+        self.shifts = shifts
+        self.rows, self.cols = shifts.shape[:2]
+
+    def contains(self, lat, lng):
+        """ accepts arc seconds, longitude positive west """
+        return (
+            (self.s_lat <= lat) & (lat <= self.n_lat) & (self.e_lng <= lng) & (lng <= self.w_lng)
+        )
+
+    def interpolate(self, lat, lng):
+        """
+        bilinear interpolation of the latitude & longitude shifts
+        (arc seconds, longitude positive west) at points inside the sub-grid.
+        """
+        x = (lng - self.e_lng) / self.lng_inc
+        y = (lat - self.s_lat) / self.lat_inc
+        i = np.clip(np.floor(x).astype(int), 0, self.cols - 2)
+        j = np.clip(np.floor(y).astype(int), 0, self.rows - 2)
+        u, v = (x - i)[:, None], (y - j)[:, None]
+
+        s = self.shifts
+        d = (
+            (1 - u) * (1 - v) * s[j, i, :2]
+            + u * (1 - v) * s[j, i + 1, :2]
+            + (1 - u) * v * s[j + 1, i, :2]
+            + u * v * s[j + 1, i + 1, :2]
+        )
+        return d[:, 0], d[:, 1]
+
+
+class NTv2Grid:
+    def __init__(self, path):
+        """
+        memory map an NTv2 grid shift file & index its sub-grids.
+        computes
+            system_f, system_t: names of the source & target systems
+            subgrids: sub-grids ordered so parents precede their children
+        """
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+
+        # the first record is NUM_OREC = 11, which gives the byte order
+        little = int(self.data[8:12].view("<i4")[0]) == 11
+        self.endian = "<" if little else ">"
+
+        overview = self.header(0, 11)
+        self.system_f = self.read_str(overview["SYSTEM_F"])
+        self.system_t = self.read_str(overview["SYSTEM_T"])
+        units = self.read_str(overview["GS_TYPE"])
+        assert units == "SECONDS", f"unsupported units: {units}"
+
+        subgrids, offset = [], 11 * RECORD
+        for _ in range(self.read_int(overview["NUM_FILE"])):
+            header = self.header(offset, 11)
+            count = self.read_int(header["GS_COUNT"])
+            offset += 11 * RECORD
+
+            s_lat, n_lat, e_lng, w_lng, lat_inc, lng_inc = (
+                self.read_float(header[key])
+                for key in ["S_LAT", "N_LAT", "E_LONG", "W_LONG", "LAT_INC", "LONG_INC"]
+            )
+            rows = int(round((n_lat - s_lat) / lat_inc)) + 1
+            cols = int(round((w_lng - e_lng) / lng_inc)) + 1
+            name, parent = self.read_str(header["SUB_NAME"]), self.read_str(header["PARENT"])
+            assert rows * cols == count, f"sub-grid {name} has {count} nodes, expected {rows * cols}"
+
+            shifts = self.data[offset : offset + count * RECORD].view(f"{self.endian}f4").reshape(rows, cols, 4)
+            subgrids.append(
+                SubGrid(
+                    name,
+                    None if parent.upper() == "NONE" else parent,
+                    s_lat, n_lat, e_lng, w_lng, lat_inc, lng_inc, shifts,
+                )
+            )
+            offset += count * RECORD
+
+        self.subgrids = self.ordered(subgrids)
+
+    def header(self, offset, records):
+        """ raw header values keyed by record name """
+        raw = self.data[offset : offset + records * RECORD].tobytes()
+        return {
+            raw[i : i + 8].decode("ascii").strip(): raw[i + 8 : i + 16]
+            for i in range(0, len(raw), RECORD)
+        }
+
+    def read_int(self, value):
+        return int(np.frombuffer(value[:4], dtype=f"{self.endian}i4")[0])
+
+    def read_float(self, value):
+        return float(np.frombuffer(value, dtype=f"{self.endian}f8")[0])
+
+    def read_str(self, value):
+        return value.decode("ascii").strip()
+
+    @staticmethod
+    def ordered(subgrids):
+        """ parents before children """
+        names = {s.name: s for s in subgrids}
+
+        def depth(s):
+            return 0 if s.parent is None else 1 + depth(names[s.parent])
+
+        return sorted(subgrids, key=depth)
+
+    def locate(self, lat, lng):
+        """
+        index of the densest sub-grid containing each point, -1 if none.
+        accepts arc seconds, longitude positive west
+        """
+        idx = np.full(lat.shape, -1)
+        index = {s.name: k for k, s in enumerate(self.subgrids)}
+        for k, sub in enumerate(self.subgrids):
+            parent = -1 if sub.parent is None else index[sub.parent]
+            idx[(idx == parent) & sub.contains(lat, lng)] = k
+        return idx
+
+    def contains(self, dLat, dLng):
+        lat, lng = self.seconds(dLat, dLng)
+        return (self.locate(lat, lng) >= 0).reshape(np.shape(dLat))
+
+    def seconds(self, dLat, dLng):
+        lat = np.asarray(dLat, dtype=float).ravel() * 3600
+        lng = -np.asarray(dLng, dtype=float).ravel() * 3600
+        return lat, lng
+
+    def shift(self, dLat, dLng, strict=True):
+        """
+        shifts (decimal degrees, longitude positive east) at scalars or arrays
+        of decimal latitude and longitude.
+        strict: assert every position is covered, otherwise shifts outside
+            of the grid are NaN
+        """
+        shape = np.shape(dLat)
+        lat, lng = self.seconds(dLat, dLng)
+        idx = self.locate(lat, lng)
+        assert not strict or np.all(idx >= 0), "position outside of grid shift file"
+
+        dφ, dλ = np.full(lat.shape, np.nan), np.full(lat.shape, np.nan)
+        for k in np.unique(idx[idx >= 0]):
+            sel = idx == k
+            dφ[sel], dλ[sel] = self.subgrids[k].interpolate(lat[sel], lng[sel])
+        return (dφ / 3600).reshape(shape), (-dλ / 3600).reshape(shape)
+
+    def forward(self, dLat, dLng, strict=True):
+        """ source (e.g. AGD66) to target (e.g. GDA94) coordinates """
+        dφ, dλ = self.shift(dLat, dLng, strict)
+        return np.add(dLat, dφ), np.add(dLng, dλ)
+
+    def inverse(self, dLat, dLng, iterations=4, strict=True):
+        """
+        target to source coordinates, iterating on the shift at the
+        source position. Converges to well below a micrometre.
+        """
+        φ, λ = np.asarray(dLat, dtype=float), np.asarray(dLng, dtype=float)
+        φ0, λ0 = φ, λ
+        for _ in range(iterations):
+            dφ, dλ = self.shift(φ0, λ0, strict)
+            φ0, λ0 = φ - dφ, λ - dλ
+        return φ0, λ0
+
+
+# (source, destination) datum codes: grid
+grids = {}
+
+
+def use_ntv2_grid(grid, source, destination):
+    """
+    shift between two datums with an NTv2Grid (or path to a .gsb file),
+    e.g. use_ntv2_grid("A66_National_13.09.01.gsb", AGD66, GDA94).
+    Pass None to return to PROJ.
+    """
+    if grid is not None and not isinstance(grid, NTv2Grid):
+        grid = NTv2Grid(grid)
+    grids.pop((source.code, destination.code), None)
+    if grid is not None:
+        grids[(source.code, destination.code)] = grid
+
+
+def ntv2_supported(source, destination):
+    """ whether a grid is in use between two datums, in either direction """
+    return (source.code, destination.code) in grids or (destination.code, source.code) in grids
+
+
+def ntv2_shift(dLat, dLng, source, destination):
+    """
+    coordinates (scalars or arrays) in source to destination datum
+    with the grid in use between them.
+    returns
+        dLat, dLng, NaN outside of the grid
+    """
+    assert ntv2_supported(source, destination), f"no grid: {source.code} -> {destination.code}"
+    if (source.code, destination.code) in grids:
+        return grids[(source.code, destination.code)].forward(dLat, dLng, strict=False)
+    return grids[(destination.code, source.code)].inverse(dLat, dLng, strict=False)
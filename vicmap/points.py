@@ -2,17 +2,23 @@ import math
 from datetime import date as datetime
 from math import radians, sqrt
 
-from geomag import declination
-from pyproj import CRS, Transformer
-
+from vicmap.bulk import line_scale_factor
 from vicmap.datums import AGD66, GDA94, WGS84, Datum
 from vicmap.grids import (MGA20, MGA94, MGRS, VICGRID, VICGRID94, Grid,
                           MGAGrid, MGRSGrid)
-from vicmap.projections import lambert_conformal_conic, utm
-from vicmap.utils import ellipsoidal_distance, load_nsw_map_numbers
+from vicmap.geoid import geoid_covers, geoid_separation
+from vicmap.instrumentation import timed
+from vicmap.magnetic import declination
+from vicmap.projections import (lambert_conformal_conic,
+                                lambert_conformal_conic_inverse, utm,
+                                utm_inverse, utm_rezone)
+from vicmap.transformers import get_transformer, native_shift
+from vicmap.utils import (ellipsoidal_distance, load_nsw_map_numbers,
+                          memoized_property)
 
 
 class Point:
+    @timed("transform_to")
     def transform_to(self, other):
         """
         Give the coordinates of this point in another coordinate system.
@@ -24,24 +30,29 @@ class Point:
             other, Grid
         ), "please provide a valid destination datum or grid"
 
-        coords = self.proj_coords[-2:]
+        destination = other if isinstance(other, Datum) else other.datum
+        shift = native_shift(self.datum, destination)
+        if shift is not None:
+            coords = self._native_transform(other, destination, shift)
+            if coords is not None:
+                return coords
 
-        # transform to wgs84 to get latitude band
-        to_wgs = Transformer.from_crs(self.crs, WGS84.crs)
-        dLat, dLng = to_wgs.transform(*coords)
-        lat_band = MGRS.get_latitude_band(dLat)
+        coords = self.proj_coords[-2:]
 
         if isinstance(other, MGAGrid):
-            # work out zone
+            # transform to wgs84 to get latitude band & zone
+            to_wgs = get_transformer(self.crs, WGS84.crs)
+            dLat, dLng = to_wgs.transform(*coords)
+            lat_band = MGRS.get_latitude_band(dLat)
             zone = other.get_zone(dLng)
             other_crs = other.crs(zone)
         else:
             other_crs = other.crs
             zone = None
 
-        if other_crs == self.crs:
+        if other_crs is self.crs or other_crs == self.crs:
             return self.proj_coords
-        transformer = Transformer.from_crs(self.crs, other_crs)
+        transformer = get_transformer(self.crs, other_crs)
         new = transformer.transform(*coords)
 
         if isinstance(other, MGRSGrid):
@@ -55,6 +66,73 @@ class Point:
 
         return (zone, *new) if zone else new
 
+    def _native_transform(self, other, datum, shift):
+        """
+        datum shift with a built in transformation (see native_shift),
+        projecting onto the destination grid natively.
+        returns None outside of the grids in use, for PROJ to transform
+        """
+        φ, λ = shift(*self.geographic)
+        φ, λ = float(φ), float(λ)
+        if math.isnan(φ) or math.isnan(λ):
+            return None
+        if isinstance(other, Datum):
+            return (φ, λ)
+
+        if isinstance(other, MGAGrid):
+            zone, E, N, _, _ = utm(φ, λ, ellipsoid=datum.ellipsoid, grid=other)
+            lat_band = MGRS.get_latitude_band(φ)
+            if isinstance(other, MGRSGrid):
+                pt = MGRSPoint.from_mga(zone=zone, lat_band=lat_band, E=E, N=N)
+                return pt.display_coords
+            return (zone, lat_band, E, N)
+
+        E, N, _, _ = lambert_conformal_conic(φ, λ, ellipsoid=datum.ellipsoid, grid=other)
+        return (E, N)
+
+    def set_heights(self, h=None, H=None):
+        """
+        accepts
+            h: ellipsoidal height (m)
+            H: AHD height (m)
+        either height is derived from the other through the geoid in use,
+        see vicmap.geoid.use_geoid
+        """
+        assert h is None or H is None, "specify an ellipsoidal or AHD height, not both"
+        self._h, self._H = h, H
+
+    @property
+    def ellipsoidal_height(self):
+        """ h (m), height above the ellipsoid """
+        if self._h is None and self._H is not None:
+            return float(self._H + geoid_separation(*self.geographic))
+        return self._h
+
+    @property
+    def ahd_height(self):
+        """ H (m), height above the Australian Height Datum """
+        if self._H is None and self._h is not None:
+            return float(self._h - geoid_separation(*self.geographic))
+        return self._H
+
+    def height_above_ellipsoid(self):
+        """ h where it is known or can be derived, otherwise 0 """
+        if self._h is None and self._H is not None and geoid_covers(*self.geographic):
+            return self.ellipsoidal_height
+        return self._h or 0
+
+    def _declination(self, dLat, dLng):
+        """
+        declination at (dLat, dLng), reused across properties of this
+        point until the date or height changes. The height is part of the
+        key, as set_heights or use_geoid may change it.
+        """
+        z = self.height_above_ellipsoid()
+        date = datetime.today()
+        if not self._decl or self._decl[0] != (date, z):
+            self._decl = ((date, z), declination(dLat, dLng, z, date))
+        return self._decl[1]
+
     @property
     def grid_magnetic_angle(self):
         """
@@ -67,7 +145,7 @@ class Point:
 
 
 class GeoPoint(Point):
-    def __init__(self, dLat, dLng, datum=WGS84):
+    def __init__(self, dLat, dLng, datum=WGS84, h=None, H=None):
 
         assert -90 < dLat < 90, f"invalid latitude: {dLat}"
         assert -180 < dLng < 180, f"invalid longitude: {dLng}"
@@ -75,6 +153,9 @@ class GeoPoint(Point):
         self.dLat = dLat
         self.dLng = dLng
         self.datum = datum
+        self.set_heights(h, H)
+
+        self._decl = None
 
     @property
     def rLat(self):
@@ -96,15 +177,17 @@ class GeoPoint(Point):
     def crs(self):
         return self.datum.crs
 
+    @property
+    def geographic(self):
+        return (self.dLat, self.dLng)
+
     @property
     def magnetic_declination(self):
         """
         The horizontal angle at a place between true north and
         magnetic north. Varies with location and time.
         """
-        z = 0  # TODO: compute height using AHD/DTM
-        date = datetime.today()
-        return declination(self.dLat, self.dLng, z, date)
+        return self._declination(self.dLat, self.dLng)
 
     @property
     def grid_convergence(self):
@@ -117,6 +200,7 @@ class GeoPoint(Point):
         """
         return 0
 
+    @timed("distance_to")
     def distance_to(self, other):
         """
         Vincenty's inverse formula along an ellipsoidal geodesic
@@ -152,23 +236,28 @@ class GeoPoint(Point):
 
 
 class PlanePoint(Point):
-    def __init__(self, u, v, grid):
+    def __init__(self, u, v, grid, h=None, H=None):
         self.u = u - grid.E0
         self.v = v - grid.N0
         self.grid = grid
         self.datum = grid.datum
+        self.set_heights(h, H)
 
-        self.φ = None
-        self.λ = None
+        self._decl = None
 
     def invert(self):
         """
         Transform a pair of u, v coords in the plane
         to a pair of (φ, λ) coords on the ellipsoid.
+        Shares the one inverse projection of grid_factors.
         """
-        if not self.φ or self.λ:
-            self.φ, self.λ = self.transform_to(other=self.datum)
-        return (self.φ, self.λ)
+        return self.geographic
+
+    @property
+    def geographic(self):
+        """ (φ, λ) from the inverse projection """
+        φ, λ, _, _ = self.grid_factors
+        return (φ, λ)
 
     @property
     def magnetic_declination(self):
@@ -176,16 +265,17 @@ class PlanePoint(Point):
         The horizontal angle at a place between true north and
         magnetic north. Varies with location and time.
         """
-        (φ, λ) = self.invert()
-        z = 0  # TODO: compute height using AHD/DTM
-        date = datetime.today()
-        return declination(φ, λ, z, date)
+        (φ, λ) = self.geographic
+        return self._declination(φ, λ)
 
-    def distance_to(self, other):
+    @timed("distance_to")
+    def distance_to(self, other, line_scale=False):
         """
         Euclidian distance in the plane
         accepts:
             - other : instance of Point
+            - line_scale : reduce the grid distance to the ellipsoid
+                with the line scale factor (see bulk.grid_distance)
         returns
             - s : euclidian distance (meters)
         """
@@ -194,12 +284,32 @@ class PlanePoint(Point):
         if isinstance(other, PlanePoint):
             x2, y2 = other.E, other.N
         else:
-            new = other.transform_to(self.grid)
-            x2, y2 = new[-2:]
+            x2, y2 = self._grid_coords(other)
 
         s = sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+        if line_scale:
+            s /= self._line_scale_factor(other, x2, y2)
         return s
 
+    def _grid_coords(self, other):
+        """ (E, N) of a point of another kind in this point's grid """
+        return other.transform_to(self.grid)[-2:]
+
+    def _line_scale_factor(self, other, E, N):
+        """
+        line scale factor from this point to (E, N) in this grid & zone.
+        Plane points must already be in this grid & zone, other points
+        were moved into it by _grid_coords.
+        """
+        zone = getattr(self, "zone", None)
+        if isinstance(other, PlanePoint):
+            same = other.grid is self.grid or (
+                isinstance(other.grid, MGAGrid) and isinstance(self.grid, MGAGrid) and other.grid.datum is self.datum
+            )
+            assert same, f"line scale factor needs both points in one grid: {self.grid.code}, {other.grid.code}"
+            assert getattr(other, "zone", None) == zone, "line scale factor needs both points in one zone"
+        return float(line_scale_factor(self.E, self.N, E, N, grid=self.grid, zone=zone))
+
     @property
     def E(self):
         return self.u + self.grid.E0
@@ -221,15 +331,28 @@ class PlanePoint(Point):
 
 
 class VICPoint(PlanePoint):
-    def __init__(self, E, N, grid):
+    def __init__(self, E, N, grid, h=None, H=None):
 
         assert grid in [VICGRID, VICGRID94], f"invalid grid: {grid.code}"
         assert 2.1e6 <= E <= 3e6, f"easting out of bounds: {E}"
         d = 2e6 if grid == VICGRID else 0
         assert 2.2e6 + d <= N <= 2.9e6 + d, f"northing out of bounds: {N}"
 
-        super().__init__(u=E, v=N, grid=grid)
-        self.crs = CRS.from_epsg(grid.epsg_code)
+        super().__init__(u=E, v=N, grid=grid, h=h, H=H)
+
+    @memoized_property
+    def crs(self):
+        return self.grid.crs
+
+    @memoized_property
+    def grid_factors(self):
+        """
+        (φ, λ, m, γ) from the inverse projection of (E, N),
+        shared by grid_convergence & point_scale_factor.
+        """
+        return lambert_conformal_conic_inverse(
+            self.E, self.N, self.datum.ellipsoid, self.grid
+        )
 
     @property
     def grid_convergence(self):
@@ -239,34 +362,82 @@ class VICPoint(PlanePoint):
         the central meridian.
         returns
             γ: grid convergence degrees, East >0, West <0
+        Computed directly from the polar angle of (E, N) on the cone.
         """
-        (φ, λ) = self.invert()
-        _, _, _, γ = lambert_conformal_conic(φ, λ, self.datum.ellipsoid, self.grid)
+        _, _, _, γ = self.grid_factors
         return γ
 
+    @property
+    def point_scale_factor(self):
+        """
+        ratio of a small grid distance to the corresponding
+        ellipsoidal distance at this point.
+        """
+        _, _, m, _ = self.grid_factors
+        return m
+
     def __repr__(self):
         return f"<VicPt_({self.E},{self.N})_{self.grid.code}>"
 
 
 class MGAPoint(PlanePoint):
-    def __init__(self, zone, lat_band, E, N, grid):
+    def __init__(self, zone, lat_band, E, N, grid, h=None, H=None):
 
         assert 100000 <= E <= 800000, f"invalid easting: {E}"
         assert 5500000 <= N <= 7500000, f"invalid northing: {N}"
         assert zone in [54, 55, 56], f"invalid zone: {zone}"
         assert grid in [MGA20, MGA94, MGRS], f"invalid MGA grid: {grid.code}"
 
-        super().__init__(u=E, v=N, grid=grid)
+        super().__init__(u=E, v=N, grid=grid, h=h, H=H)
         self.zone = zone
         self.lat_band = lat_band
 
-    @property
+    @memoized_property
     def crs(self):
         """
         MGA crs depends upon zone
         """
         return self.grid.crs(self.zone)
 
+    @memoized_property
+    def grid_factors(self):
+        """
+        (φ, λ, m, γ) from the inverse projection of (E, N),
+        shared by grid_convergence & point_scale_factor.
+        """
+        return utm_inverse(
+            self.zone, self.E, self.N, ellipsoid=self.datum.ellipsoid, grid=self.grid
+        )
+
+    def transform_to(self, other):
+        """
+        as Point.transform_to, changes of zone within this point's MGA
+        grid are computed natively (see rezone).
+        """
+        if other is self.grid and not isinstance(other, MGRSGrid):
+            zone = other.get_zone(self.geographic[1])
+            if zone != self.zone:
+                pt = self.rezone(zone)
+                return (pt.zone, pt.lat_band, pt.E, pt.N)
+        return super().transform_to(other)
+
+    def _grid_coords(self, other):
+        """ (E, N) of a point of another kind in this point's grid & zone """
+        grid = MGA20 if isinstance(self.grid, MGRSGrid) else self.grid
+        zone, _, E, N = other.transform_to(grid)
+        if zone != self.zone:
+            E, N = utm_rezone(zone, E, N, self.zone, ellipsoid=self.datum.ellipsoid, grid=grid)
+        return float(E), float(N)
+
+    @timed("rezone")
+    def rezone(self, zone):
+        """
+        this point in another zone of its grid (e.g. across the 54/55 or
+        55/56 boundary), without a detour through PROJ.
+        """
+        E, N = utm_rezone(self.zone, self.E, self.N, zone, ellipsoid=self.datum.ellipsoid, grid=self.grid)
+        return MGAPoint(zone, self.lat_band, float(E), float(N), grid=self.grid, h=self._h, H=self._H)
+
     @property
     def display_coords(self):
         return (self.zone, self.E, self.N)
@@ -283,11 +454,20 @@ class MGAPoint(PlanePoint):
         the central meridian.
         returns
             γ: grid convergence degrees, East >0, West <0
+        Computed directly from (E, N) with the inverse Krueger series.
         """
-        (φ, λ) = self.invert()
-        _, _, _, _, γ = utm(φ, λ, ellipsoid=self.datum.ellipsoid, grid=self.grid)
+        _, _, _, γ = self.grid_factors
         return γ
 
+    @property
+    def point_scale_factor(self):
+        """
+        ratio of a small grid distance to the corresponding
+        ellipsoidal distance at this point.
+        """
+        _, _, m, _ = self.grid_factors
+        return m
+
     @classmethod
     def from_brennan(cls, GR6, map, grid=MGA94):
         """
@@ -350,6 +530,7 @@ class MGRSPoint(MGAPoint):
 
     grid = MGRS
 
+    @timed("mgrs.decode")
     def __init__(self, zone, lat_band, usi, x, y, precision=5):
         """
         MGRS : MGA with
@@ -411,11 +592,14 @@ class MGRSPoint(MGAPoint):
         pt = cls(zone=zone, usi=usi, x=GR6[0:3] + "00", y=GR6[3:6] + "00", precision=5, lat_band=lat_band)
         return pt
 
-    def distance_to(self, other):
+    @timed("distance_to")
+    def distance_to(self, other, line_scale=False):
         """
         Euclidian distance in the plane
         accepts:
             - other : instance of Point
+            - line_scale : reduce the grid distance to the ellipsoid
+                with the line scale factor
         returns
             - s : euclidian distance (meters)
         """
@@ -426,13 +610,16 @@ class MGRSPoint(MGAPoint):
         else:
             zone, lat_band, usi, e, n = other.transform_to(self.grid)
             GR6 = e[0:3] + n[0:3]
-            pt = MGRSPoint.from_6FIG(zone, lat_band, usi, GR6)
-            x2, y2 = pt.E, pt.N
+            other = MGRSPoint.from_6FIG(zone, lat_band, usi, GR6)
+            x2, y2 = other.E, other.N
 
         s = sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+        if line_scale:
+            s /= self._line_scale_factor(other, x2, y2)
         return s
 
     @classmethod
+    @timed("mgrs.encode")
     def from_mga(cls, zone, lat_band, E, N, precision=5):
         """
         Allow user to create from mga coords
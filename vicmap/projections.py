@@ -7,18 +7,25 @@ ln = math.log
 
 from math import asinh, atan, atanh, cos, cosh, degrees, radians, sin, sinh, sqrt, tan
 
+import numpy as np
+
+from vicmap.instrumentation import timed
 from vicmap.utils import (
     conformal_latitude,
     gauss_schreiber,
+    geographic_latitude,
     grid_convergence,
+    inverse_gauss_schreiber,
+    inverse_krueger_coefficients,
     krueger_coefficients,
+    krueger_series,
+    negated,
     point_scale_factor,
-    pq_coefficients,
     rectifying_radius,
-    transverse_mercator,
 )
 
 
+@timed("lcc")
 def lambert_conformal_conic(dLat, dLng, ellipsoid, grid):
     """
     Perform a transformation from geographic to grid coordinates
@@ -37,9 +44,6 @@ def lambert_conformal_conic(dLat, dLng, ellipsoid, grid):
     """
 
     # Helper functions
-    def Q(φ):
-        return π / 4 - φ / 2
-
     def T(φ):
         lhs = (1 - sin(φ)) / (1 + sin(φ))
         rhs = (1 + e * sin(φ)) / (1 - e * sin(φ))
@@ -50,11 +54,6 @@ def lambert_conformal_conic(dLat, dLng, ellipsoid, grid):
         bottom = 1 - e2 * sin(φ) ** 2
         return a / sqrt(bottom)
 
-    def M(φ):
-        top = cos(φ)
-        bottom = 1 - e ** 2 * sin(φ) ** 2
-        return top / sqrt(bottom)
-
     φ1, φ2, λ0, φ0, E0, N0 = grid.constants
 
     for phi in [dLat, φ1, φ2, φ0]:
@@ -67,43 +66,33 @@ def lambert_conformal_conic(dLat, dLng, ellipsoid, grid):
     λ = radians(dLng)
 
     λ0 = radians(λ0)
-    φ0 = radians(φ0)
-
-    φ1 = radians(φ1)
-    φ2 = radians(φ2)
 
     a, _, f, e, e2, n = ellipsoid.constants
 
-    m1 = M(φ1)
-    m2 = M(φ2)
-    q1 = Q(φ1)
-    t1 = T(φ1)
-    t2 = T(φ2)
-    t0 = T(φ0)
+    # Step 2: cone constants, cached on the grid
+    n, F, r0 = grid.cone(ellipsoid)
     t = T(φ)
     v = V(φ)
 
-    n = (ln(m1) - ln(m2)) / (ln(t1) - ln(t2))
-    F = m1 / (n * (t1 ** n))
-
-    # Step 2: determine polar coords
+    # Step 3: determine polar coords
     rCoeff = -1 if n < 0 else 1
-    r0 = rCoeff * a * F * (t0 ** n)
+    r0 = rCoeff * r0
     r = rCoeff * a * F * (t ** n)
     θ = rCoeff * n * (λ - λ0)
 
-    # Step 3: determine easting and northing wrt true origin
+    # Step 4: determine easting and northing wrt true origin
     X = r * sin(θ)
     Y = r * cos(θ) - r0
 
-    # Step 4: point scale factor (m) and grid convergence (γ)
-    m = -(r * n) / v * cos(φ)
+    # Step 5: point scale factor (m) and grid convergence (γ)
+    m = (rCoeff * r * n) / (v * cos(φ))
     γ = θ
 
     return X + E0, Y + N0, m, math.degrees(γ)
 
 
-def utm(dLat, dLng, ellipsoid, grid):
+@timed("utm")
+def utm(dLat, dLng, ellipsoid, grid, order=8):
     """
     Perform a UTM projection from ellipsoid to grid
     using the Krueger n-series equations, up to order 8.
@@ -115,6 +104,8 @@ def utm(dLat, dLng, ellipsoid, grid):
         dLng: longitude in decimal degrees (-180, 180]
         ellipsoidal: reference ellipsoid containing ellipsoidal constants
         grid: plane specification containing grid constants
+        order: order of the series (1 - 8), lower orders are faster
+            but less accurate, see utils.SERIES_ORDERS
     returns:
         z: zone
         E: UTM easting (m) relative to false origin
@@ -139,8 +130,8 @@ def utm(dLat, dLng, ellipsoid, grid):
     # Step 2: Compute rectifying radius A
     A = rectifying_radius(a, n)
 
-    # Step 3: krueger coefficients for r = 1, 2, ..., 8
-    α = krueger_coefficients(n)
+    # Step 3: krueger coefficients for r = 1, 2, ..., order
+    α = krueger_coefficients(n, order)
 
     # Step 4 - conformal latitude _φ
     t, σ, _t, _φ = conformal_latitude(rLat, e)
@@ -151,8 +142,8 @@ def utm(dLat, dLng, ellipsoid, grid):
     # Step 6 - Gauss-Schreiber
     _ε, _Nu = gauss_schreiber(_t, ω, a)
 
-    # Step 7 - TM ratios
-    ε, Nu = transverse_mercator(_Nu, _ε, α)
+    # Step 7 & 10 - TM ratios and q & p, in one pass of the series
+    ε, Nu, q, p = krueger_series(α, _ε, _Nu)
 
     # Step 8 - TM coords
     X = A * Nu
@@ -162,9 +153,6 @@ def utm(dLat, dLng, ellipsoid, grid):
     easting = grid.m0 * X + grid.E0
     northing = grid.m0 * Y + grid.N0
 
-    # Step 10 - q & p
-    q, p = pq_coefficients(α, _ε, _Nu)
-
     # Step 11 - Point scale factor m
     m = point_scale_factor(rLat, A, a, q, p, t, _t, e2, ω, m0)
 
@@ -172,3 +160,234 @@ def utm(dLat, dLng, ellipsoid, grid):
     γ = grid_convergence(q, p, _t, ω, dLat)
 
     return zn, easting, northing, m, math.degrees(γ)
+
+
+@timed("utm_inverse", size=1)
+def utm_inverse(zone, E, N, ellipsoid, grid, order=8):
+    """
+    Perform an inverse UTM projection from grid to ellipsoid
+    using the inverse Krueger n-series equations, up to order 8.
+    See: https://www.icsm.gov.au/sites/default/files/GDA2020TechnicalManualV1.1.1.pdf
+    Grid convergence and point scale factor come directly from the
+    plane coordinates. Works for scalars and numpy arrays.
+    Accepts:
+        zone: zone of the grid coordinates
+        E: UTM easting (m) relative to false origin
+        N: UTM northing (m) relative to false origin
+        ellipsoidal: reference ellipsoid containing ellipsoidal constants
+        grid: plane specification containing grid constants
+        order: order of the series (1 - 8)
+    returns:
+        dLat: latitude in decimal degrees
+        dLng: longitude in decimal degrees
+        m: point scale factor
+        γ: grid convergence
+    """
+
+    # Step 1: Compute ellipsiodal constants
+    a, _, f, e, e2, n = ellipsoid.constants
+
+    # Step 2: rectifying radius A and inverse krueger coefficients
+    A = rectifying_radius(a, n)
+    β = inverse_krueger_coefficients(n, order)
+
+    # Step 3: TM ratios from grid coords
+    Nu = (np.asarray(E, dtype=float) - grid.E0) / (grid.m0 * A)
+    ε = (np.asarray(N, dtype=float) - grid.N0) / (grid.m0 * A)
+
+    # Step 4: gauss-schreiber ratios and q' & p', in one pass of the series
+    _ε, _Nu, q, p = krueger_series(negated(β), ε, Nu)
+
+    # Step 5: conformal latitude & longitude difference
+    _t, ω = inverse_gauss_schreiber(_ε, _Nu)
+
+    # Step 6: geographic latitude by newton-raphson
+    t = geographic_latitude(_t, e)
+    rLat = np.arctan(t)
+
+    # Step 7: point scale factor m
+    m = (
+        grid.m0
+        * (A / a)
+        / np.sqrt(q ** 2 + p ** 2)
+        * np.sqrt(1 + t ** 2)
+        * np.sqrt(1 - e2 * np.sin(rLat) ** 2)
+        / np.sqrt(_t ** 2 + np.cos(ω) ** 2)
+    )
+
+    # Step 8: grid convergence γ, East >0 in the southern hemisphere
+    γ = -(np.arctan2(q, p) + np.arctan(_t * np.tan(ω) / np.sqrt(1 + _t ** 2)))
+
+    cm = grid.cm1 + (np.asarray(zone) - 1) * grid.zw
+    return np.degrees(rLat), cm + np.degrees(ω), m, np.degrees(γ)
+
+
+@timed("lcc_inverse", size=0)
+def lambert_conformal_conic_inverse(E, N, ellipsoid, grid):
+    """
+    Perform an inverse lambert conformal conic projection from
+    grid to ellipsoid. Grid convergence comes straight from the polar
+    angle of the plane coordinates, γ = n(λ - λ0).
+    See: https://pubs.usgs.gov/pp/1395/report.pdf (15-9 - 15-11, 7-9)
+    Works for scalars and numpy arrays.
+    Accepts:
+        E: easting (m) relative to false origin
+        N: northing (m) relative to false origin
+        ellipsoidal: reference ellipsoid containing ellipsoidal constants
+        grid: plane specification containing grid constants
+    returns:
+        dLat: latitude in decimal degrees
+        dLng: longitude in decimal degrees
+        m: point scale factor
+        γ: grid convergence
+    """
+
+    _, _, λ0, _, E0, N0 = grid.constants
+    a, _, f, e, e2, _ = ellipsoid.constants
+
+    # Step 1: cone constants, cached on the grid
+    n, F, r0 = grid.cone(ellipsoid)
+    rCoeff = -1 if n < 0 else 1
+
+    # Step 2: polar coords about the cone apex
+    X = np.asarray(E, dtype=float) - E0
+    Y = np.asarray(N, dtype=float) - N0 + rCoeff * r0
+    r = np.sqrt(X ** 2 + Y ** 2)
+    θ = np.arctan2(X, Y)
+
+    # Step 3: grid convergence & longitude
+    γ = θ
+    λ = radians(λ0) + θ / (rCoeff * n)
+
+    # Step 4: latitude by fixed point iteration
+    t = (r / (rCoeff * a * F)) ** (1 / n)
+    φ = π / 2 - 2 * np.arctan(t)
+    for _ in range(10):
+        esin = e * np.sin(φ)
+        φ_new = π / 2 - 2 * np.arctan(t * ((1 - esin) / (1 + esin)) ** (e / 2))
+        if np.all(np.abs(φ_new - φ) < 1e-14):
+            φ = φ_new
+            break
+        φ = φ_new
+
+    # Step 5: point scale factor
+    v = a / np.sqrt(1 - e2 * np.sin(φ) ** 2)
+    m = (r * rCoeff * n) / (v * np.cos(φ))
+
+    return np.degrees(φ), np.degrees(λ), m, np.degrees(γ)
+
+
+@timed("utm_array", size=0)
+def utm_array(dLat, dLng, ellipsoid, grid, zone=None, order=8):
+    """
+    Vectorised UTM projection from ellipsoid to grid, the array
+    counterpart of utm using the same Krueger n-series.
+    Accepts:
+        dLat: latitudes in decimal degrees
+        dLng: longitudes in decimal degrees
+        ellipsoidal: reference ellipsoid containing ellipsoidal constants
+        grid: plane specification containing grid constants
+        zone: force projection into this zone (scalar or array),
+            defaults to the zone containing each point
+        order: order of the series (1 - 8)
+    returns:
+        z: zones
+        E: UTM eastings (m) relative to false origin
+        N: UTM northings (m) relative to false origin
+        m: point scale factors
+        γ: grid convergences
+    """
+
+    dLat = np.asarray(dLat, dtype=float)
+    dLng = np.asarray(dLng, dtype=float)
+
+    if zone is None:
+        zone = np.floor((dLng - grid.z0_edge) / grid.zw).astype(int)
+    zone = np.broadcast_to(zone, dLng.shape)
+    cm = grid.cm1 + (zone - 1) * grid.zw
+
+    # Step 1: Compute ellipsiodal constants
+    a, _, f, e, e2, n = ellipsoid.constants
+
+    # Step 2 & 3: rectifying radius A & krueger coefficients
+    A = rectifying_radius(a, n)
+    α = krueger_coefficients(n, order)
+
+    # Step 4 - conformal latitude
+    rLat = np.radians(dLat)
+    t = np.tan(rLat)
+    σ = np.sinh(e * np.arctanh(e * t / np.sqrt(1 + t ** 2)))
+    _t = t * np.sqrt(1 + σ ** 2) - σ * np.sqrt(1 + t ** 2)
+
+    # Step 5 - longitude difference
+    ω = np.radians(dLng - cm)
+
+    # Step 6 - Gauss-Schreiber
+    _ε = np.arctan2(_t, np.cos(ω))
+    _Nu = np.arcsinh(np.sin(ω) / np.sqrt(_t ** 2 + np.cos(ω) ** 2))
+
+    # Step 7 & 10 - TM ratios and q & p, in one pass of the series
+    ε, Nu, q, p = krueger_series(α, _ε, _Nu)
+
+    # Step 8 & 9 - MGA coordinates (E, N)
+    easting = grid.m0 * A * Nu + grid.E0
+    northing = grid.m0 * A * ε + grid.N0
+
+    # Step 11 - Point scale factor m
+    m = (
+        grid.m0
+        * (A / a)
+        * np.sqrt(q ** 2 + p ** 2)
+        * np.sqrt(1 + t ** 2)
+        * np.sqrt(1 - e2 * np.sin(rLat) ** 2)
+        / np.sqrt(_t ** 2 + np.cos(ω) ** 2)
+    )
+
+    # Step 12 - Grid convergence γ, East >0 in the southern hemisphere
+    γ = np.arctan2(q, p) - np.arctan(_t * np.tan(ω) / np.sqrt(1 + _t ** 2))
+
+    return zone, easting, northing, m, np.degrees(γ)
+
+
+@timed("utm_rezone", size=1)
+def utm_rezone(zone, E, N, to_zone, ellipsoid, grid, order=8):
+    """
+    Re-express UTM coordinates in another zone without leaving the
+    conformal sphere: inverse Krueger series to the conformal latitude
+    & longitude difference, shift the longitude difference to the new
+    central meridian, then the forward series. Skips the geographic
+    latitude iteration of utm_inverse. Works for scalars and numpy arrays.
+    Accepts:
+        zone: zone of the grid coordinates
+        E: UTM easting (m) relative to false origin
+        N: UTM northing (m) relative to false origin
+        to_zone: the zone to re-express the coordinates in
+        ellipsoidal: reference ellipsoid containing ellipsoidal constants
+        grid: plane specification containing grid constants
+        order: order of the series (1 - 8)
+    returns:
+        E: UTM easting (m) in to_zone
+        N: UTM northing (m) in to_zone
+    """
+
+    # Step 1: rectifying radius A & krueger coefficients
+    a, _, f, e, e2, n = ellipsoid.constants
+    A = rectifying_radius(a, n)
+    α = krueger_coefficients(n, order)
+    β = inverse_krueger_coefficients(n, order)
+
+    # Step 2: TM ratios from grid coords, to gauss-schreiber ratios
+    Nu = (np.asarray(E, dtype=float) - grid.E0) / (grid.m0 * A)
+    ε = (np.asarray(N, dtype=float) - grid.N0) / (grid.m0 * A)
+    _ε, _Nu, _, _ = krueger_series(negated(β), ε, Nu)
+
+    # Step 3: conformal latitude & longitude difference from the new central meridian
+    _t, ω = inverse_gauss_schreiber(_ε, _Nu)
+    ω = ω + np.radians((np.asarray(zone) - np.asarray(to_zone)) * grid.zw)
+
+    # Step 4: Gauss-Schreiber & TM ratios about the new central meridian
+    _ε = np.arctan2(_t, np.cos(ω))
+    _Nu = np.arcsinh(np.sin(ω) / np.sqrt(_t ** 2 + np.cos(ω) ** 2))
+    ε, Nu, _, _ = krueger_series(α, _ε, _Nu)
+
+    return grid.m0 * A * Nu + grid.E0, grid.m0 * A * ε + grid.N0
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import math
+from datetime import date as datetime
+from functools import partial
+
+import numpy as np
+
+from vicmap import bulk
+from vicmap.datums import get_datum
+from vicmap.grids import MGRS, MGAGrid, get_grid
+
+"""
+Coordinate conversion service on stdlib asyncio.
+    python -m vicmap serve --port 8080
+Each request converts a single point, e.g.
+    POST /forward {"lat": -37.8, "lng": 144.9, "grid": "MGA20"}
+Concurrent requests to the same endpoint (with the same options) are
+collected into micro-batches, which are run through the vectorised
+bulk kernels off the event loop. A batch is dispatched when it reaches
+max_batch requests or when its oldest request has waited max_wait seconds.
+"""
+
+
+class BadRequest(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, kernel, max_batch=512, max_wait=0.002):
+        """
+        collects single items into batches for a vectorised kernel.
+        accepts
+            kernel: callable taking a list of items, returning a list of results
+            max_batch: dispatch once this many items are waiting
+            max_wait: longest an item waits for a batch to fill (seconds)
+        """
+        self.kernel = kernel
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []
+        self.timer = None
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        """ queue an item, returns a future for its result """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            self.batches += 1
+            self.items += len(batch)
+            asyncio.ensure_future(self.run(batch))
+
+    def run_each(self, items):
+        """ kernel results of items run singly, or the exception of each failure """
+        results = []
+        for item in items:
+            try:
+                results.extend(self.kernel([item]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def run(self, batch):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        try:
+            results = await loop.run_in_executor(None, self.kernel, items)
+        except Exception as e:
+            # re-run the items one by one, so only the bad ones fail
+            results = [e] if len(items) == 1 else await loop.run_in_executor(None, self.run_each, items)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # client went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def field(body, name, kind=float, default=None):
+    """ a typed field of a request body """
+    value = body.get(name, default)
+    if value is None:
+        raise BadRequest(f"missing field: {name}")
+    try:
+        value = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise BadRequest(f"invalid {name}: {value}")
+    if kind is float and not math.isfinite(value):
+        raise BadRequest(f"invalid {name}: {value}")
+    return value
+
+
+def in_range(result):
+    """ whether every number of a kernel result is finite, and any position valid """
+    if not all(math.isfinite(v) for v in result.values() if isinstance(v, float)):
+        return False
+    return -90 <= result.get("lat", 0) <= 90 and -180 <= result.get("lng", 0) <= 180
+
+
+def columns(items):
+    return [np.asarray(col) for col in zip(*items)]
+
+
+def mga_grid(body):
+    code = field(body, "grid", str, "MGA20")
+    try:
+        grid = get_grid(code)
+    except StopIteration:
+        raise BadRequest(f"unknown grid: {code}")
+    if not isinstance(grid, MGAGrid):
+        raise BadRequest(f"grid must be an MGA grid: {code}")
+    return grid
+
+
+def parse_forward(body):
+    lat, lng = field(body, "lat"), field(body, "lng")
+    if not (-80 <= lat <= 84 and -180 <= lng <= 180):
+        raise BadRequest(f"invalid position: {lat}, {lng}")
+    return mga_grid(body).code, (lat, lng)
+
+
+def forward(code, items):
+    zone, E, N, m, γ = bulk.to_mga(*columns(items), grid=get_grid(code))
+    return [
+        {"zone": z, "E": e, "N": n, "scale_factor": k, "convergence": c}
+        for z, e, n, k, c in zip(zone.tolist(), E.tolist(), N.tolist(), m.tolist(), γ.tolist())
+    ]
+
+
+def parse_inverse(body):
+    zone = field(body, "zone", int)
+    if not 1 <= zone <= 60:
+        raise BadRequest(f"invalid zone: {zone}")
+    E, N = field(body, "E"), field(body, "N")
+    # false easting 500km, false northing 10000km
+    if not (0 <= E <= 1000000 and 0 <= N <= 10000000):
+        raise BadRequest(f"invalid MGA coordinates: {E}, {N}")
+    return mga_grid(body).code, (zone, E, N)
+
+
+def inverse(code, items):
+    dLat, dLng, m, γ = bulk.from_mga(*columns(items), grid=get_grid(code))
+    return [
+        {"lat": φ, "lng": λ, "scale_factor": k, "convergence": c}
+        for φ, λ, k, c in zip(dLat.tolist(), dLng.tolist(), m.tolist(), γ.tolist())
+    ]
+
+
+def table_range(table):
+    """ (lower, upper) bound (m) of an MGRS column or row table """
+    return min(lb for lb, _ in table.values()), max(ub for _, ub in table.values())
+
+
+def parse_mgrs_encode(body):
+    zone, precision = field(body, "zone", int), field(body, "precision", int, 5)
+    E, N = field(body, "E"), field(body, "N")
+    if zone not in [54, 55, 56]:
+        raise BadRequest(f"invalid MGRS zone: {zone}")
+    if not 1 <= precision <= 5:
+        raise BadRequest(f"invalid MGRS precision: {precision}")
+    (e0, e1), (n0, n1) = table_range(getattr(MGRS, f"cols{zone}")), table_range(MGRS.getrows(zone))
+    # encoded from E & N rounded to the metre
+    if not (e0 <= round(E) < e1 and n0 <= round(N) < n1):
+        raise BadRequest(f"invalid MGRS coordinates: {E}, {N}")
+    return precision, (zone, E, N)
+
+
+def mgrs_encode(precision, items):
+    return [{"mgrs": ref} for ref in bulk.mgrs_encode(*columns(items), precision=precision).tolist()]
+
+
+def parse_mgrs_decode(body):
+    ref = field(body, "mgrs", str)
+    try:
+        bulk.mgrs_decode([ref])
+    except (AssertionError, ValueError):
+        raise BadRequest(f"invalid MGRS reference: {ref}")
+    return None, ref
+
+
+def mgrs_decode(_, items):
+    zone, lat_band, E, N = bulk.mgrs_decode(items)
+    return [
+        {"zone": z, "lat_band": b, "E": e, "N": n}
+        for z, b, e, n in zip(zone.tolist(), lat_band.tolist(), E.tolist(), N.tolist())
+    ]
+
+
+def parse_distance(body):
+    code = field(body, "datum", str, "GDA20")
+    try:
+        datum = get_datum(code)
+    except StopIteration:
+        raise BadRequest(f"unknown datum: {code}")
+    lat1, lng1, lat2, lng2 = (field(body, name) for name in ["lat1", "lng1", "lat2", "lng2"])
+    for lat, lng in [(lat1, lng1), (lat2, lng2)]:
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise BadRequest(f"invalid position: {lat}, {lng}")
+    return datum.code, (lat1, lng1, lat2, lng2)
+
+
+def distance(code, items):
+    s = bulk.distance(*columns(items), datum=get_datum(code))
+    return [{"distance": d} for d in s.tolist()]
+
+
+def parse_declination(body):
+    try:
+        date = datetime.fromisoformat(body["date"]) if "date" in body else datetime.today()
+    except (TypeError, ValueError):
+        raise BadRequest(f"invalid date: {body['date']}")
+    lat, lng = field(body, "lat"), field(body, "lng")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise BadRequest(f"invalid position: {lat}, {lng}")
+    return None, (lat, lng, field(body, "z", float, 0), date)
+
+
+def declination(_, items):
+    dLat, dLng, z, dates = zip(*items)
+    decl = bulk.declination(dLat, dLng, np.asarray(z), np.array(dates, dtype=object))
+    return [{"declination": d} for d in np.atleast_1d(decl).tolist()]
+
+
+# path: (request parser -> (options, item), batch kernel(options, items))
+ENDPOINTS = {
+    "/forward": (parse_forward, forward),
+    "/inverse": (parse_inverse, inverse),
+    "/mgrs/encode": (parse_mgrs_encode, mgrs_encode),
+    "/mgrs/decode": (parse_mgrs_decode, mgrs_decode),
+    "/distance": (parse_distance, distance),
+    "/declination": (parse_declination, declination),
+}
+
+
+class CoordinateService:
+    def __init__(self, max_batch=512, max_wait=0.002, max_body=65536):
+        """
+        routes requests to a micro-batcher per (endpoint, options).
+        accepts
+            max_batch: largest batch run through a kernel
+            max_wait: longest a request waits for its batch to fill (seconds)
+            max_body: largest request body accepted (bytes)
+        """
+        assert max_batch >= 1, f"invalid batch size: {max_batch}"
+        assert max_wait >= 0, f"invalid max wait: {max_wait}"
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_body = max_body
+        self.batchers = {}
+
+    async def handle(self, path, body):
+        """
+        answer one request.
+        returns
+            (status, response body)
+        """
+        if path == "/stats":
+            return 200, self.stats
+        if path not in ENDPOINTS:
+            return 404, {"error": f"unknown endpoint: {path}"}
+
+        parse, kernel = ENDPOINTS[path]
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise BadRequest("request body must be a JSON object")
+            options, item = parse(request)
+        except (BadRequest, ValueError) as e:
+            return 400, {"error": str(e)}
+
+        key = (path, options)
+        if key not in self.batchers:
+            self.batchers[key] = MicroBatcher(partial(kernel, options), self.max_batch, self.max_wait)
+        try:
+            result = await self.batchers[key].submit(item)
+        except Exception as e:
+            return 500, {"error": str(e)}
+        if not in_range(result):
+            return 400, {"error": f"position out of range: {item}"}
+        return 200, result
+
+    @property
+    def stats(self):
+        batches = sum(b.batches for b in self.batchers.values())
+        items = sum(b.items for b in self.batchers.values())
+        return {
+            "requests": items,
+            "batches": batches,
+            "mean_batch": items / batches if batches else 0,
+            "max_batch": self.max_batch,
+            "max_wait": self.max_wait,
+        }
+
+    async def connection(self, reader, writer):
+        """ serve HTTP/1.1 requests on a keep-alive connection """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    _, path, version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if 0 <= length <= self.max_body:
+                    body = await reader.readexactly(length) if length else b""
+                    status, response = await self.handle(path, body)
+                else:
+                    # the body can't be skipped, so the connection is closed after answering
+                    status, response = 400, {"error": f"invalid content-length: {headers['content-length']}"}
+                    headers["connection"] = "close"
+
+                try:
+                    payload = json.dumps(response, allow_nan=False).encode()
+                except ValueError as e:
+                    status, payload = 500, json.dumps({"error": str(e)}).encode()
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.connection, host, port)
+
+
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def serve(host="127.0.0.1", port=8080, max_batch=512, max_wait=0.002):
+    """ run the service until interrupted """
+
+    async def main():
+        server = await CoordinateService(max_batch, max_wait).start(host, port)
+        print(f"vicmap serving on http://{host}:{port} (batches of <= {max_batch}, wait <= {max_wait * 1000:g}ms)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    raise ImportError("vicmap.shared requires python >= 3.8 (multiprocessing.shared_memory)")
+
+"""
+Zero-copy transport for parallel bulk conversions.
+Input and output columns live in shared memory segments: workers are sent
+only segment names and a row range, read their inputs in place and write
+results straight into the output columns. Requires python >= 3.8.
+"""
+
+
+def attach(spec):
+    """
+    map a shared array described by (name, shape, dtype) into this process.
+    Returns the segment & array, the owning SharedBatch unlinks the segment.
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def process_rows(func, inputs, outputs, start, stop, kwargs):
+    """ worker: apply func to rows [start, stop) of the shared inputs in place """
+    segments, arrays = [], []
+    try:
+        for spec in inputs + outputs:
+            shm, arr = attach(spec)
+            segments.append(shm)
+            arrays.append(arr)
+        ins, outs = arrays[: len(inputs)], arrays[len(inputs) :]
+
+        result = func(*(a[start:stop] for a in ins), **kwargs)
+        result = result if isinstance(result, tuple) else (result,)
+        for out, res in zip(outs, result):
+            out[start:stop] = res
+        del ins, outs, arrays, result
+    finally:
+        for shm in segments:
+            shm.close()
+    return stop - start
+
+
+class SharedBatch:
+    def __init__(self, *arrays):
+        """
+        a set of coordinate columns held in shared memory.
+        accepts
+            arrays: equal length input columns, copied once into shared memory.
+                Use SharedBatch() and batch.array() to allocate and fill
+                inputs in place instead.
+        Use as a context manager, all segments are unlinked on exit,
+        including when a worker fails.
+        """
+        self.segments = []
+        # (array, spec) pairs, matched by identity. Holding the arrays
+        # keeps their ids from being reused by other arrays
+        self.specs = []
+        try:
+            self.inputs = [self.copy(a) for a in arrays]
+        except BaseException:
+            self.close()
+            raise
+
+    def array(self, shape, dtype=float):
+        """ allocate an array backed by a new shared memory segment """
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self.segments.append(shm)
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.specs.append((arr, (shm.name, arr.shape, dtype.str)))
+        return arr
+
+    def copy(self, a):
+        a = np.asarray(a)
+        arr = self.array(a.shape, a.dtype)
+        arr[...] = a
+        return arr
+
+    def spec(self, arr):
+        spec = next((spec for a, spec in self.specs if a is arr), None)
+        assert spec is not None, "array is not held by this batch"
+        return spec
+
+    def map(self, func, inputs=None, outputs=None, workers=None, chunk_size=100000, **kwargs):
+        """
+        run a bulk function (e.g. bulk.to_mga, bulk.from_mga) over the batch.
+        accepts
+            inputs: shared input columns, defaults to the arrays the batch was created with
+            outputs: dtypes of the output columns, inferred from the first row if omitted
+            workers: worker processes, defaults to cpu count
+            chunk_size: rows per task
+        returns
+            output columns, backed by shared memory until the batch is closed
+        """
+        inputs = self.inputs if inputs is None else inputs
+        size = len(inputs[0])
+        assert all(len(a) == size for a in inputs), "input columns differ in length"
+
+        if outputs is None:
+            probe = func(*(a[:1] for a in inputs), **kwargs)
+            probe = probe if isinstance(probe, tuple) else (probe,)
+            outputs = [np.asarray(p).dtype for p in probe]
+        outs = [self.array((size,), dtype) for dtype in outputs]
+
+        in_specs = [self.spec(a) for a in inputs]
+        out_specs = [self.spec(a) for a in outs]
+        with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+            futures = [
+                pool.submit(process_rows, func, in_specs, out_specs, i, min(i + chunk_size, size), kwargs)
+                for i in range(0, size, chunk_size)
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+
+        return outs[0] if len(outs) == 1 else tuple(outs)
+
+    def close(self):
+        """ release & unlink every segment held by the batch """
+        self.inputs = []
+        self.specs = []
+        for shm in self.segments:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # views still exported, the segment is unlinked regardless
+            shm.unlink()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
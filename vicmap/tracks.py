@@ -0,0 +1,135 @@
+from itertools import islice
+from xml.parsers import expat
+
+import numpy as np
+
+from vicmap.bulk import distance
+from vicmap.datums import WGS84
+
+"""
+Streaming track lengths.
+Fixes are read from GPX or delimited text in chunks of a bounded size and
+measured with the vectorised Vincenty of bulk.distance. The last fix of
+each chunk is carried into the next, so memory stays constant however
+long the track.
+    for segments in segment_distances(read_fixes("trip.gpx")):
+        ...
+    track_summary(read_fixes("trip.csv", skiprows=1))
+Chunks are (lats, lngs, starts): starts marks fixes which begin a new
+track segment (e.g. a GPX <trkseg>), with no distance from the fix before.
+"""
+
+
+def read_csv(path, usecols=(0, 1), delimiter=",", skiprows=0, chunk_size=100000):
+    """
+    fixes of (dLat, dLng) from delimited text, chunk by chunk.
+    every row belongs to one segment.
+    """
+    with open(path) as file:
+        for _ in range(skiprows):
+            next(file)
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                return
+            lats, lngs = np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2).T
+            yield lats, lngs, np.zeros(len(lats), dtype=bool)
+
+
+def read_gpx(path, chunk_size=100000, block_size=1 << 20):
+    """
+    track points (<trkpt lat= lon=>) of a GPX file, chunk by chunk.
+    The file is fed to an expat parser block by block, without building
+    a document tree.
+    """
+    lats, lngs, starts = [], [], []
+    new_segment = True
+
+    def start(name, attrs):
+        nonlocal new_segment
+        tag = name.rpartition(":")[2]
+        if tag == "trkpt":
+            lats.append(attrs["lat"])
+            lngs.append(attrs["lon"])
+            starts.append(new_segment)
+            new_segment = False
+        elif tag == "trkseg":
+            new_segment = True
+
+    def chunk(size):
+        out = (
+            np.array(lats[:size], dtype=float),
+            np.array(lngs[:size], dtype=float),
+            np.array(starts[:size], dtype=bool),
+        )
+        del lats[:size], lngs[:size], starts[:size]
+        return out
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            parser.Parse(block, False)
+            while len(lats) >= chunk_size:
+                yield chunk(chunk_size)
+    parser.Parse(b"", True)
+    if lats:
+        yield chunk(len(lats))
+
+
+def read_fixes(path, **kwargs):
+    """ read_gpx for .gpx files, otherwise read_csv """
+    if str(path).lower().endswith(".gpx"):
+        return read_gpx(path, **kwargs)
+    return read_csv(path, **kwargs)
+
+
+def segment_distances(chunks, datum=WGS84):
+    """
+    distance (m) to each fix from the fix before it, 0 at the start
+    of each segment. Yields an array per chunk.
+    """
+    last = None
+    for lats, lngs, starts in chunks:
+        if not len(lats):
+            continue
+        if last is None:
+            last = (lats[0], lngs[0])
+        φ1 = np.concatenate([[last[0]], lats[:-1]])
+        λ1 = np.concatenate([[last[1]], lngs[:-1]])
+        s = distance(φ1, λ1, lats, lngs, datum=datum)
+        yield np.where(starts, 0, s)
+        last = (lats[-1], lngs[-1])
+
+
+def cumulative_distances(chunks, datum=WGS84):
+    """ distance (m) along the track to each fix, an array per chunk """
+    total = 0.0
+    for s in segment_distances(chunks, datum=datum):
+        cumulative = total + np.cumsum(s)
+        total = cumulative[-1]
+        yield cumulative
+
+
+def track_summary(chunks, datum=WGS84):
+    """
+    totals of a whole track
+    returns
+        {"fixes": count, "segments": count, "length": m, "longest_step": m}
+    """
+    fixes, segments, length, longest = 0, 0, 0.0, 0.0
+
+    def counted():
+        nonlocal fixes, segments
+        for lats, lngs, starts in chunks:
+            if fixes == 0 and len(lats):
+                # the first fix starts a segment, marked or not
+                segments += int(not starts[0])
+            fixes += len(lats)
+            segments += int(np.sum(starts))
+            yield lats, lngs, starts
+
+    for s in segment_distances(counted(), datum=datum):
+        length += float(np.sum(s))
+        longest = max(longest, float(np.max(s)))
+    return {"fixes": fixes, "segments": segments, "length": length, "longest_step": longest}
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+from pyproj import Transformer
+
+from vicmap.datums import get_datum
+from vicmap.helmert import datum_shift, helmert_supported
+from vicmap.instrumentation import count, timed
+from vicmap.ntv2 import ntv2_shift, ntv2_supported
+
+"""
+pyproj Transformers are not safe to share between threads, and are
+slow to construct. Each thread keeps its own bounded LRU of transformers
+keyed on the (source, destination) CRS pair.
+"""
+
+
+construct = timed("transformer.construct")(Transformer.from_crs)
+
+
+class TransformerCache:
+    def __init__(self, maxsize=32):
+        """
+        accepts
+            maxsize: maximum transformers cached per thread
+        """
+        self.maxsize = maxsize
+        self._local = threading.local()
+
+    @property
+    def entries(self):
+        """ this thread's cache """
+        if not hasattr(self._local, "entries"):
+            self._local.entries = OrderedDict()
+        return self._local.entries
+
+    def get(self, source, destination):
+        """
+        a transformer from source to destination CRS for the calling thread.
+        CRS objects are keyed by identity, the datums & grids share theirs.
+        """
+        entries = self.entries
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+        key = (id(source), id(destination))
+        if key in entries:
+            entries.move_to_end(key)
+            count("transformer.hit")
+            return entries[key][2]
+
+        transformer = construct(source, destination)
+        # hold the CRS objects so their ids stay unique while cached
+        entries[key] = (source, destination, transformer)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return transformer
+
+    def configure(self, maxsize):
+        """ change the per-thread size, applied by each thread on its next lookup """
+        assert maxsize > 0, f"invalid cache size: {maxsize}"
+        self.maxsize = maxsize
+
+    def clear(self):
+        """ clear the calling thread's cache """
+        self.entries.clear()
+
+
+transformer_cache = TransformerCache()
+
+
+def get_transformer(source, destination):
+    return transformer_cache.get(source, destination)
+
+
+def configure_transformer_cache(maxsize):
+    transformer_cache.configure(maxsize)
+
+
+def native_shift(source, destination):
+    """
+    the built in datum shift between two datums, used in place of PROJ:
+    the GDA94 <-> GDA20 helmert transformation, any NTv2 grids in use,
+    and grids to GDA94 chained with the helmert transformation to GDA20.
+    returns
+        a function (dLat, dLng) -> (dLat, dLng) over scalars or arrays,
+        or None if PROJ should be used. Positions outside of an NTv2 grid
+        are NaN, for the caller to transform with PROJ.
+    """
+
+    def helmert(src, dst):
+        return lambda dLat, dLng: datum_shift(dLat, dLng, src, dst)[:2]
+
+    def ntv2(src, dst):
+        return lambda dLat, dLng: ntv2_shift(dLat, dLng, src, dst)
+
+    def chain(first, second):
+        return lambda dLat, dLng: second(*first(dLat, dLng))
+
+    if helmert_supported(source, destination):
+        return helmert(source, destination)
+    if ntv2_supported(source, destination):
+        return ntv2(source, destination)
+
+    gda94 = get_datum("GDA94")
+    if ntv2_supported(source, gda94) and helmert_supported(gda94, destination):
+        return chain(ntv2(source, gda94), helmert(gda94, destination))
+    if helmert_supported(source, gda94) and ntv2_supported(gda94, destination):
+        return chain(helmert(source, gda94), ntv2(gda94, destination))
+    return None
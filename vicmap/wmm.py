@@ -0,0 +1,193 @@
+from datetime import date as datetime
+from pathlib import Path
+
+import numpy as np
+
+"""
+Vectorised World Magnetic Model.
+See: https://www.ngdc.noaa.gov/geomag/WMM/DoDWMM.shtml
+A numpy port of the NOAA geomag algorithm: the spherical harmonic
+expansion is evaluated for whole arrays of positions at once, with the
+recursion run over degree n only.
+"""
+
+# WGS84 semi-axes and geomagnetic reference radius (km)
+a = 6378.137
+b = 6356.7523142
+re = 6371.2
+
+# points evaluated per pass, bounds the (n, m, points) working arrays
+CHUNK = 4096
+
+
+def default_coefficient_file():
+    """ the WMM2015 coefficients shipped with vicmap (vicmap/data/WMM.COF) """
+    return Path(__file__).parent / "data" / "WMM.COF"
+
+
+def decimal_year(date):
+    """ decimal year of a date, as used by the WMM """
+    return date.year + (date - datetime(date.year, 1, 1)).days / 365.0
+
+
+class WorldMagneticModel:
+    def __init__(self, path=None):
+        """
+        loads a WMM coefficient file once.
+        accepts
+            path: path to a NOAA WMM.COF file
+        computes
+            epoch: base epoch of the model (decimal year)
+            g, h: Schmidt normalised Gauss coefficients, indexed [n, m]
+            gd, hd: secular variation of g, h (nT / year)
+        """
+        self.path = path or default_coefficient_file()
+        self.maxord = 12
+
+        size = self.maxord + 1
+        g, h, gd, hd = (np.zeros((size, size)) for _ in range(4))
+        with open(self.path) as file:
+            for line in file:
+                vals = line.split()
+                if len(vals) == 3:
+                    self.epoch = float(vals[0])
+                    self.model = vals[1]
+                elif len(vals) == 6:
+                    n, m = int(vals[0]), int(vals[1])
+                    g[n, m], h[n, m], gd[n, m], hd[n, m] = map(float, vals[2:])
+
+        # convert Schmidt normalised coefficients to unnormalised
+        snorm = np.zeros((size, size))
+        snorm[0, 0] = 1
+        self.k = np.zeros((size, size))
+        for n in range(1, size):
+            snorm[n, 0] = snorm[n - 1, 0] * (2 * n - 1) / n
+            for m in range(0, n + 1):
+                if n > 1:
+                    self.k[n, m] = ((n - 1) ** 2 - m ** 2) / ((2 * n - 1) * (2 * n - 3))
+                if m > 0:
+                    j = 2 if m == 1 else 1
+                    snorm[n, m] = snorm[n, m - 1] * np.sqrt((n - m + 1) * j / (n + m))
+
+        self.g, self.h = snorm * g, snorm * h
+        self.gd, self.hd = snorm * gd, snorm * hd
+
+        # (n, m) index pairs of the lower triangle, n >= 1
+        self.n, self.m = np.tril_indices(size)
+        self.n, self.m = self.n[1:], self.m[1:]
+
+    def evaluate(self, dLat, dLng, h=0, year=None):
+        """
+        geomagnetic field elements for scalars or arrays.
+        accepts
+            dLat, dLng: geodetic (WGS84) decimal latitude and longitude
+            h: height above the ellipsoid (m)
+            year: decimal year (see decimal_year), defaults to today
+        returns
+            dec: declination (degrees, East >0)
+            dip: inclination (degrees, down >0)
+            ti: total intensity (nT)
+        """
+        year = decimal_year(datetime.today()) if year is None else year
+        φ, λ, h, year = np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (dLat, dLng, h, year))
+        )
+        shape = φ.shape
+        φ, λ, h, year = (x.ravel() for x in (φ, λ, h, year))
+
+        out = np.empty((3, φ.size))
+        for i in range(0, φ.size, CHUNK):
+            s = slice(i, i + CHUNK)
+            out[:, s] = self._evaluate(φ[s], λ[s], h[s], year[s])
+
+        dec, dip, ti = (x.reshape(shape) for x in out)
+        if not shape:
+            return float(dec), float(dip), float(ti)
+        return dec, dip, ti
+
+    def declination(self, dLat, dLng, h=0, year=None):
+        return self.evaluate(dLat, dLng, h, year)[0]
+
+    def _evaluate(self, dLat, dLng, h, year):
+        size = self.maxord + 1
+        alt = h / 1000
+        dt = year - self.epoch
+
+        rLat = np.radians(dLat)
+        rLng = np.radians(dLng)
+        srlat, crlat = np.sin(rLat), np.cos(rLat)
+        srlat2, crlat2 = srlat ** 2, crlat ** 2
+
+        # convert from geodetic to spherical coordinates
+        a2, b2 = a ** 2, b ** 2
+        c2 = a2 - b2
+        q = np.sqrt(a2 - c2 * srlat2)
+        q1 = alt * q
+        q2 = ((q1 + a2) / (q1 + b2)) ** 2
+        ct = srlat / np.sqrt(q2 * crlat2 + srlat2)
+        st = np.sqrt(1 - ct ** 2)
+        a4 = a2 ** 2
+        c4 = a4 - b2 ** 2
+        r = np.sqrt(alt ** 2 + 2 * q1 + (a4 - c4 * srlat2) / q ** 2)
+        d = np.sqrt(a2 * crlat2 + b2 * srlat2)
+        ca = (alt + d) / r
+        sa = c2 * crlat * srlat / (r * d)
+
+        # sin(mλ), cos(mλ) for m = 0 .. maxord
+        mλ = np.arange(size)[:, None] * rLng
+        sp, cp = np.sin(mλ), np.cos(mλ)
+
+        # unnormalised associated legendre functions & derivatives, [n, m, pts]
+        p = np.zeros((size, size, dLat.size))
+        dp = np.zeros_like(p)
+        pp = np.zeros((size, dLat.size))
+        p[0, 0] = 1
+        pp[0] = 1
+        for n in range(1, size):
+            p[n, :n] = ct * p[n - 1, :n] - self.k[n, :n, None] * p[n - 2, :n]
+            dp[n, :n] = (
+                ct * dp[n - 1, :n] - st * p[n - 1, :n] - self.k[n, :n, None] * dp[n - 2, :n]
+            )
+            p[n, n] = st * p[n - 1, n - 1]
+            dp[n, n] = st * dp[n - 1, n - 1] + ct * p[n - 1, n - 1]
+            pp[n] = pp[n - 1] if n == 1 else ct * pp[n - 1] - self.k[n, 1] * pp[n - 2]
+
+        # terms of the expansion, flattened over the (n, m) triangle
+        n, m = self.n, self.m
+        ar_n = np.empty((size, r.size))
+        ar_n[0] = (re / r) ** 2
+        for i in range(1, size):
+            ar_n[i] = ar_n[i - 1] * re / r
+        ar = ar_n[n]
+        par = ar * p[n, m]
+        dpar = ar * dp[n, m]
+        c, s = cp[m], sp[m]
+        pc, ps, dpc, dps = par * c, par * s, dpar * c, dpar * s
+
+        # accumulate with time adjusted gauss coefficients g + dt * gd
+        g, h, gd, hd = self.g[n, m], self.h[n, m], self.gd[n, m], self.hd[n, m]
+        bt = -(g @ dpc + h @ dps + dt * (gd @ dpc + hd @ dps))
+        bp = (m * g) @ ps - (m * h) @ pc + dt * ((m * gd) @ ps - (m * hd) @ pc)
+        br = ((n + 1) * g) @ pc + ((n + 1) * h) @ ps
+        br += dt * (((n + 1) * gd) @ pc + ((n + 1) * hd) @ ps)
+
+        # special case: north/south geographic poles
+        pole = st == 0
+        if np.any(pole):
+            tg = self.g[:, 1, None] + dt * self.gd[:, 1, None]
+            th = self.h[:, 1, None] + dt * self.hd[:, 1, None]
+            bpp = np.sum((tg * sp[1] - th * cp[1]) * ar_n * pp, axis=0)
+            bp = np.where(pole, bpp, bp / np.where(pole, 1, st))
+        else:
+            bp = bp / st
+
+        # rotate magnetic vector components from spherical to geodetic
+        bx = -bt * ca - br * sa
+        by = bp
+        bz = bt * sa - br * ca
+
+        bh = np.sqrt(bx ** 2 + by ** 2)
+        ti = np.sqrt(bh ** 2 + bz ** 2)
+        dec = np.degrees(np.arctan2(by, bx))
+        dip = np.degrees(np.arctan2(bz, bh))
+        return dec, dip, ti